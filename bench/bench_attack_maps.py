@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Attack Map Benchmark
+Plays seeded random games and compares keeping the attack maps up to date incrementally
+(the extra cost of make_move over a board without maps) against rebuilding them from scratch
+every ply, then times the check and threat queries as map lookups and as board scans.
+The incremental maps are checked against a full recomputation after every ply.
+
+Usage:
+    python bench/bench_attack_maps.py [--games 20] [--plies 300] [--seed 1]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from move import Move
+
+class ScanBoard(Board):
+    """Board without attack maps, answering the queries by scanning the board"""
+
+    def _update_attacks(self, sq, old, new):
+        pass
+
+def random_game(rng, plies):
+    """Moves of a random game of up to plies plies, checking the maps after every ply"""
+    board = Board()
+    moves = []
+    for ply in range(plies):
+        codes = board.legal_codes(board.next_player)
+        if not codes:
+            break
+        move = Move.from_code(rng.choice(codes))
+        board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+        if board.attacks != board.recompute_attacks():
+            raise AssertionError(f'attack maps out of step after ply {ply + 1}')
+        moves.append(move)
+    return moves
+
+def replay(board_class, moves):
+    """Seconds spent in make_move replaying moves"""
+    board = board_class()
+    elapsed = 0.0
+    for move in moves:
+        piece = board.squares[move.initial.row][move.initial.col].piece
+        start = time.perf_counter()
+        board.make_move(piece, move)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def positions(moves):
+    """Boards of every position of the game, for the query timings"""
+    board = Board()
+    boards = []
+    for move in moves:
+        board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+        boards.append(Board.from_fen(board.to_fen()))
+    return boards
+
+def scan_in_check(board, color):
+    """in_check as it was before the maps: every opponent piece tried against the king"""
+    king_row, king_col = board.king_squares[color]
+    opponent = 'black' if color == 'white' else 'white'
+    return any(board.can_attack_king(piece, row, col, king_row, king_col)
+               for (row, col), piece in board.piece_squares[opponent].items())
+
+def timed(function, boards):
+    start = time.perf_counter()
+    for board in boards:
+        function(board)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incremental attack maps against full recomputation')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--plies', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    games = [random_game(rng, args.plies) for _ in range(args.games)]
+    plies = sum(len(moves) for moves in games)
+    print(f"{args.games} random games, {plies} plies, maps matched the full recomputation after every ply")
+
+    # upkeep per ply: incremental updates inside make_move against rebuilding the maps
+    with_maps = min(sum(replay(Board, moves) for moves in games) for _ in range(3))
+    without_maps = min(sum(replay(ScanBoard, moves) for moves in games) for _ in range(3))
+    boards = [board for moves in games for board in positions(moves)]
+    full = min(timed(Board.recompute_attacks, boards) for _ in range(3))
+    print(f"{'upkeep per ply':<32}{'us':>8}")
+    print(f"{'  incremental (make_move delta)':<32}{(with_maps - without_maps) / plies * 1e6:>8.1f}")
+    print(f"{'  full recomputation':<32}{full / len(boards) * 1e6:>8.1f}")
+
+    # queries per position: map lookups against scanning the board
+    def castling_squares(board, query):
+        color = board.next_player
+        row = 7 if color == 'white' else 0
+        return [query(board, row, col, color) for col in range(2, 7)]
+
+    queries = [
+        ('in_check', lambda board: board.in_check(board.next_player),
+                     lambda board: scan_in_check(board, board.next_player)),
+        ('castling squares (5)', lambda board: castling_squares(board, Board.square_under_attack),
+                                 lambda board: castling_squares(board, Board._attacked)),
+    ]
+    print(f"{'query per position':<32}{'map us':>8}{'scan us':>9}")
+    for name, lookup, scan in queries:
+        map_time = min(timed(lookup, boards) for _ in range(3))
+        scan_time = min(timed(scan, boards) for _ in range(3))
+        print(f"{'  ' + name:<32}{map_time / len(boards) * 1e6:>8.2f}{scan_time / len(boards) * 1e6:>9.2f}")
+
+if __name__ == "__main__":
+    main()
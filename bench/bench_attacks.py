@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Attack Table Micro-Benchmark
+Compares the per-position cost of the old offset-list attack code with the precomputed lookup tables.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from square import Square
+from piece import *
+from attacks import KNIGHT_TARGETS, KING_TARGETS, PAWN_TARGETS, RAYS, STRAIGHT_INCRS, DIAGONAL_INCRS
+import perft
+
+class OffsetBoard(Board):
+
+    '''
+        Board with the attack detection as it was before the lookup tables:
+        offset lists rebuilt per call and Square.in_range on every step
+    '''
+
+    def can_attack_king(self, piece, piece_row, piece_col, king_row, king_col):
+        if isinstance(piece, Pawn):
+            direction = -1 if piece.color == 'white' else 1
+            for attack_row, attack_col in [(piece_row + direction, piece_col - 1),
+                                           (piece_row + direction, piece_col + 1)]:
+                if (Square.in_range(attack_row, attack_col) and
+                    attack_row == king_row and attack_col == king_col):
+                    return True
+            return False
+        elif isinstance(piece, Knight):
+            for move_row, move_col in [
+                (piece_row - 2, piece_col + 1), (piece_row - 1, piece_col + 2),
+                (piece_row + 1, piece_col + 2), (piece_row + 2, piece_col + 1),
+                (piece_row + 2, piece_col - 1), (piece_row + 1, piece_col - 2),
+                (piece_row - 1, piece_col - 2), (piece_row - 2, piece_col - 1)]:
+                if (Square.in_range(move_row, move_col) and
+                    move_row == king_row and move_col == king_col):
+                    return True
+            return False
+        elif isinstance(piece, Bishop):
+            return self.can_move_diagonally(piece_row, piece_col, king_row, king_col)
+        elif isinstance(piece, Rook):
+            return self.can_move_straight(piece_row, piece_col, king_row, king_col)
+        elif isinstance(piece, Queen):
+            return (self.can_move_diagonally(piece_row, piece_col, king_row, king_col) or
+                    self.can_move_straight(piece_row, piece_col, king_row, king_col))
+        elif isinstance(piece, King):
+            return abs(king_row - piece_row) <= 1 and abs(king_col - piece_col) <= 1
+        return False
+
+    def can_move_diagonally(self, from_row, from_col, to_row, to_col):
+        if abs(to_row - from_row) != abs(to_col - from_col):
+            return False
+        row_dir = 1 if to_row > from_row else -1
+        col_dir = 1 if to_col > from_col else -1
+        current_row = from_row + row_dir
+        current_col = from_col + col_dir
+        while current_row != to_row and current_col != to_col:
+            if self.squares[current_row][current_col].has_piece():
+                return False
+            current_row += row_dir
+            current_col += col_dir
+        return True
+
+    def can_move_straight(self, from_row, from_col, to_row, to_col):
+        if from_row != to_row and from_col != to_col:
+            return False
+        if from_row == to_row:
+            col_dir = 1 if to_col > from_col else -1
+            current_col = from_col + col_dir
+            while current_col != to_col:
+                if self.squares[from_row][current_col].has_piece():
+                    return False
+                current_col += col_dir
+        else:
+            row_dir = 1 if to_row > from_row else -1
+            current_row = from_row + row_dir
+            while current_row != to_row:
+                if self.squares[current_row][from_col].has_piece():
+                    return False
+                current_row += row_dir
+        return True
+
+    def square_under_attack(self, row, col, defending_color):
+        attacking_color = 'black' if defending_color == 'white' else 'white'
+        for (r, c), piece in self.pieces(attacking_color):
+            if self.can_attack_king(piece, r, c, row, col):
+                return True
+        return False
+
+def offset_targets(board, color):
+    """Count pseudo-legal targets with offset lists and range checks"""
+    count = 0
+    for (row, col), piece in board.pieces(color):
+        if isinstance(piece, Knight):
+            steps = [(row - 2, col + 1), (row - 1, col + 2), (row + 1, col + 2), (row + 2, col + 1),
+                     (row + 2, col - 1), (row + 1, col - 2), (row - 1, col - 2), (row - 2, col - 1)]
+        elif isinstance(piece, King):
+            steps = [(row - 1, col + 1), (row - 1, col - 1), (row + 1, col + 1), (row + 1, col - 1),
+                     (row - 1, col + 0), (row + 0, col + 1), (row + 1, col + 0), (row + 0, col - 1)]
+        elif isinstance(piece, Pawn):
+            steps = [(row + piece.dir, col - 1), (row + piece.dir, col + 1)]
+        else:
+            steps = []
+            incrs = []
+            if isinstance(piece, (Bishop, Queen)):
+                incrs += [(-1, 1), (-1, -1), (1, 1), (1, -1)]
+            if isinstance(piece, (Rook, Queen)):
+                incrs += [(-1, 0), (0, 1), (1, 0), (0, -1)]
+            for row_incr, col_incr in incrs:
+                r, c = row + row_incr, col + col_incr
+                while Square.in_range(r, c):
+                    count += 1
+                    if board.squares[r][c].has_piece():
+                        break
+                    r, c = r + row_incr, c + col_incr
+        for r, c in steps:
+            if Square.in_range(r, c):
+                count += 1
+    return count
+
+def table_targets(board, color):
+    """Count pseudo-legal targets with the lookup tables"""
+    count = 0
+    for (row, col), piece in board.pieces(color):
+        sq = row * 8 + col
+        if isinstance(piece, Knight):
+            count += len(KNIGHT_TARGETS[sq])
+        elif isinstance(piece, King):
+            count += len(KING_TARGETS[sq])
+        elif isinstance(piece, Pawn):
+            count += len(PAWN_TARGETS[color][sq])
+        else:
+            incrs = []
+            if isinstance(piece, (Bishop, Queen)):
+                incrs += DIAGONAL_INCRS
+            if isinstance(piece, (Rook, Queen)):
+                incrs += STRAIGHT_INCRS
+            for incr in incrs:
+                for r, c in RAYS[incr][sq]:
+                    count += 1
+                    if board.squares[r][c].piece is not None:
+                        break
+    return count
+
+def attack_map(board, color):
+    """Attacked flag of every square, the work castling and king moves repeat"""
+    return [board.square_under_attack(row, col, color) for row in range(8) for col in range(8)]
+
+def measure(func, boards, min_time=1.0):
+    """Run func over all positions until min_time elapses, return microseconds per position"""
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for board, color in boards:
+            func(board, color)
+        done += len(boards)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / done * 1e6
+
+def main():
+    fens = [fen for _, fen, _ in perft.POSITIONS]
+    before = [(board, board.next_player) for board in map(OffsetBoard.from_fen, fens)]
+    after = [(board, board.next_player) for board in map(Board.from_fen, fens)]
+
+    cases = [
+        ('in_check', lambda board, color: board.in_check(color), None),
+        ('attack map (64 squares)', attack_map, None),
+        ('pseudo-legal targets', offset_targets, table_targets),
+    ]
+
+    print(f"{'per position':<26}{'offsets us':>12}{'tables us':>12}{'speedup':>10}")
+    for name, old, new in cases:
+        old_cost = measure(old, before)
+        new_cost = measure(new or old, after)
+        print(f"{name:<26}{old_cost:>12.1f}{new_cost:>12.1f}{old_cost / new_cost:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Board Engine Benchmark
+Measures positions per second of the rules queries on the square-based Board and the BitBoard engine.
+
+Usage:
+    python bench/bench_board.py [--gate]    # --gate: exit 1 unless BitBoard generates legal codes faster
+"""
+
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from bitboard import BitBoard
+from square import Square
+from move import Move
+
+# opening moves played to reach the benchmark positions
+MOVES = [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)),
+         ((7, 5), (4, 2)), ((0, 5), (3, 2)), ((6, 3), (5, 3)), ((0, 6), (2, 5)),
+         ((7, 1), (5, 2)), ((1, 3), (2, 3))]
+
+def positions(board_class):
+    """Return boards (with the side to move) for every ply of the benchmark line"""
+    result = []
+    color = 'white'
+    for ply in range(len(MOVES) + 1):
+        board = board_class()
+        for (from_row, from_col), (to_row, to_col) in MOVES[:ply]:
+            piece = board.squares[from_row][from_col].piece
+            board.move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+        result.append((board, color))
+        color = 'black' if color == 'white' else 'white'
+    return result
+
+def generate_all(board, color):
+    count = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board.squares[row][col].piece
+            if piece is not None and piece.color == color:
+                count += len(board.piece_moves(piece, row, col))
+    return count
+
+def game_over(board, color):
+    return board.is_checkmate(color) or board.is_stalemate(color)
+
+def game_status(board, color):
+    return board.game_status(color)
+
+def measure(func, boards, min_time=1.0):
+    """Run func over all positions until min_time elapses, return positions per second"""
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for board, color in boards:
+            func(board, color)
+        done += len(boards)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rules query speed of Board and BitBoard')
+    parser.add_argument('--gate', action='store_true', help='fail unless BitBoard is ahead on legal codes')
+    args = parser.parse_args(argv)
+
+    queries = [
+        ('in_check', lambda board, color: board.in_check(color)),
+        ('legal move generation', generate_all),
+        ('legal codes', lambda board, color: board.legal_codes(color)),
+        ('game over test', game_over),
+        ('game status', game_status),
+    ]
+    engines = [('Board', positions(Board)), ('BitBoard', positions(BitBoard))]
+
+    print(f"{'query':<24}{'Board pos/s':>14}{'BitBoard pos/s':>16}{'speedup':>10}")
+    speedups = {}
+    for name, func in queries:
+        rates = [measure(func, boards) for _, boards in engines]
+        speedups[name] = rates[1] / rates[0]
+        print(f"{name:<24}{rates[0]:>14.0f}{rates[1]:>16.0f}{speedups[name]:>9.1f}x")
+
+    if args.gate and speedups['legal codes'] <= 1.0:
+        print("FAIL: BitBoard legal code generation is not ahead of Board")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
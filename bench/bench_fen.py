@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+FEN Benchmark
+Measures FEN strings loaded and exported per second on the square-based Board and the BitBoard engine,
+against the bulk loading target of 20,000 positions per second. Bulk loads go through load_fen, which
+reuses one board; from_fen builds a new Board each time (64 squares and their tables) and is shown
+beside it with an empty board's construction, the floor under from_fen.
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from bitboard import BitBoard
+import perft
+
+# positions per second wanted for batch analysis, perft and test setup
+TARGET = 20000
+
+def rate(func, items, min_time=1.0):
+    """Calls per second of func over items, repeated for at least min_time"""
+    done = 0
+    start = time.perf_counter()
+    while True:
+        for item in items:
+            func(item)
+        done += len(items)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return done / elapsed
+
+def main():
+    fens = [fen for _, fen, _ in perft.POSITIONS]
+    print(f"{'engine':<10}{'load_fen/s':>12}{'from_fen/s':>12}{'to_fen/s':>12}{'empty Board/s':>15}")
+    slowest = None
+    for board_class in (Board, BitBoard):
+        boards = [board_class.from_fen(fen) for fen in fens]
+        loads = rate(board_class().load_fen, fens)
+        builds = rate(board_class.from_fen, fens)
+        exports = rate(board_class.to_fen, boards)
+        # the floor under from_fen: constructing a board with nothing to place
+        empty = rate(board_class.from_fen, ['8/8/8/8/8/8/8/8 w - - 0 1'])
+        print(f"{board_class.__name__:<10}{loads:>12.0f}{builds:>12.0f}{exports:>12.0f}{empty:>15.0f}")
+        slowest = loads if slowest is None else min(slowest, loads)
+    if slowest >= TARGET:
+        print(f"load_fen meets the {TARGET}/s target")
+    else:
+        print(f"load_fen misses the {TARGET}/s target: {slowest:.0f}/s")
+
+if __name__ == "__main__":
+    main()
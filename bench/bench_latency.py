@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Input Latency Benchmark
+Runs the real game loop (dummy video driver) fed by a scripted fast mouse: the e2
+pawn is picked up, waved around the board with motion events at --rate per second and put
+back, over and over. Reports the input-to-display latency percentiles of the LatencyProbe
+and the events the loop handled, with and without mouse motion coalescing.
+
+Usage:
+    python bench/bench_latency.py [--seconds 5] [--rate 1000]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.append(SRC)
+
+import pygame
+
+from const import *
+from main import Main
+from renderer import coalesce_motion
+from latency import LatencyProbe
+
+class Feeder:
+
+    '''
+        Scripted mouse: the e2 pawn is picked up, circled over the board for half a second
+        and dropped back home (no move), over and over, then the window is closed. post_due
+        posts the events that have come due since it was last called, as a real mouse
+        would have queued them between two frames.
+    '''
+
+    def __init__(self, seconds, rate):
+        self.rate = rate
+        self.start = time.perf_counter()
+        self.deadline = self.start + seconds
+        self.posted = 0
+
+    def event(self, index):
+        home = (4 * SQSIZE + SQSIZE // 2, 6 * SQSIZE + SQSIZE // 2)
+        step = index % (self.rate // 2 + 2)
+        if step == 0:
+            return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=home, button=1)
+        if step == self.rate // 2 + 1:
+            return pygame.event.Event(pygame.MOUSEBUTTONUP, pos=home, button=1)
+        angle = index / 50
+        pos = (int(WIDTH / 2 + WIDTH / 3 * math.cos(angle)), int(HEIGHT / 2 + HEIGHT / 3 * math.sin(angle)))
+        return pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(1, 0, 0))
+
+    def post_due(self):
+        now = time.perf_counter()
+        if now >= self.deadline:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+        due = int((now - self.start) * self.rate)
+        while self.posted < due:
+            pygame.event.post(self.event(self.posted))
+            self.posted += 1
+
+def run(seconds, rate, coalesce):
+    """LatencyProbe and counts of events read, events handled and frames drawn of one run"""
+    main = Main()
+    renderer = main.renderer
+    # the probe goes on the renderer only, so the loop does not print its own report on quit
+    probe = renderer.probe = LatencyProbe()
+    # the renderer hands out every event, coalescing is applied here so both are counted
+    renderer.coalesce = False
+    counts = {'read': 0, 'handled': 0, 'frames': 0}
+
+    feeder = Feeder(seconds, rate)
+    events, update = renderer.events, renderer.update
+    def counted_events(block=True):
+        feeder.post_due()
+        # never blocking: pygame.event.wait drops the attributes of posted mouse events
+        read = events(False)
+        handled = coalesce_motion(read) if coalesce else read
+        counts['read'] += len(read)
+        counts['handled'] += len(handled)
+        return handled
+    def counted_update():
+        rects = update()
+        counts['frames'] += bool(rects)
+        return rects
+    renderer.events, renderer.update = counted_events, counted_update
+
+    try:
+        main.mainloop()
+    except SystemExit:
+        pass
+    finally:
+        main.worker.close()
+    return probe, counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Input-to-display latency of the game loop')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rate', type=int, default=1000, help='mouse motion events per second')
+    args = parser.parse_args(argv)
+
+    # assets are looked up relative to the repository root
+    os.chdir(os.path.join(SRC, '..'))
+    print(f"{'motion':<12}{'input':>8}{'handled':>9}{'frames':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for coalesce in (False, True):
+        probe, counts = run(args.seconds, args.rate, coalesce)
+        name = 'coalesced' if coalesce else 'every event'
+        print(f"{name:<12}{counts['read']:>8}{counts['handled']:>9}{counts['frames']:>8}"
+              f"{probe.percentile(50) * 1000:>9.1f}{probe.percentile(95) * 1000:>9.1f}{probe.percentile(99) * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Board Memory Benchmark
+Reports the bytes held by one piece (its type and color are shared class data, an instance
+only holds its moved flag and moves) and by a live Board (square-based and bitboard engine): freshly set up,
+and after a 20 ply game whose legal moves were queried every turn, as the Game does. Then the
+bytes held by a Game mid-game, after --plies seeded random plies, as the UI keeps it and as a
+server Session keeps it.
+
+Usage:
+    python bench/bench_memory.py [--boards 200] [--plies 80]
+"""
+
+import sys
+import os
+import gc
+import random
+import argparse
+import itertools
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from bitboard import BitBoard
+from square import Square
+from move import Move
+from game import Game
+from piece import Pawn, Queen
+from server import Session
+
+# 1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O Nf6 5. d3 d6 6. Bg5 Bg4 7. h3 Bxf3 8. Qxf3 O-O 9. Nc3 Nd4 10. Qd1 Nxc2
+PLIES = [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)), ((7, 5), (4, 2)),
+         ((0, 5), (3, 2)), ((7, 4), (7, 6)), ((0, 6), (2, 5)), ((6, 3), (5, 3)), ((1, 3), (2, 3)),
+         ((7, 2), (3, 6)), ((0, 2), (4, 6)), ((6, 7), (5, 7)), ((4, 6), (5, 5)), ((7, 3), (5, 5)),
+         ((0, 4), (0, 6)), ((7, 1), (5, 2)), ((2, 2), (4, 3)), ((5, 5), (7, 3)), ((4, 3), (6, 2))]
+
+def played(board_class):
+    """Board after PLIES, with the legal moves of every position looked up"""
+    board = board_class()
+    for (from_row, from_col), (to_row, to_col) in PLIES:
+        piece = board.squares[from_row][from_col].piece
+        move = Move(Square(from_row, from_col), Square(to_row, to_col))
+        if not board.valid_move(piece, move):
+            raise ValueError(f'illegal ply {move}')
+        board.move(piece, move)
+    board.position_info(board.next_player)
+    return board
+
+def random_plies(game, play_move, seed, plies):
+    """Play up to plies random legal moves through play_move"""
+    rng = random.Random(seed)
+    for _ in range(plies):
+        if game.game_over:
+            break
+        move = rng.choice(game.board.position_info(game.next_player).moves)
+        play_move(game.board.squares[move.initial.row][move.initial.col].piece, move)
+
+def ui_game(bitboard, seed, plies):
+    game = Game(bitboard)
+    random_plies(game, game.play_move, seed, plies)
+    return game
+
+def session_game(bitboard, seed, plies):
+    session = Session(seed, bitboard)
+    random_plies(session.game, session.play_move, seed, plies)
+    return session
+
+def seeded(build, bitboard, plies):
+    """build for bytes_per_board, playing the same games (seeds 0, 1, ...) in every column"""
+    seeds = itertools.count()
+    return lambda: build(bitboard, next(seeds), plies)
+
+def bytes_per_board(build, count):
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    boards = [build() for _ in range(count)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del boards
+    return size / count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bytes held per live board')
+    parser.add_argument('--boards', type=int, default=200)
+    parser.add_argument('--plies', type=int, default=80, help='random plies of the mid-game Games')
+    args = parser.parse_args(argv)
+
+    pawn = bytes_per_board(lambda: Pawn('white'), args.boards * 32)
+    queen = bytes_per_board(lambda: Queen('black'), args.boards * 32)
+    print(f"bytes per piece: pawn {pawn:.0f}, queen {queen:.0f}")
+
+    print(f"{'engine':<10}{'new board':>12}{'after 20 plies':>16}")
+    for board_class in (Board, BitBoard):
+        fresh = bytes_per_board(board_class, args.boards)
+        game = bytes_per_board(lambda: played(board_class), args.boards)
+        print(f"{board_class.__name__:<10}{fresh:>12.0f}{game:>16.0f}")
+
+    # the position cache of a long game holds every position played
+    print(f"{'engine':<10}{'new Game':>12}{f'Game {args.plies} plies':>18}{f'Session {args.plies} plies':>21}")
+    for bitboard, name in ((False, 'Board'), (True, 'BitBoard')):
+        fresh = bytes_per_board(lambda: Game(bitboard), args.boards)
+        ui = bytes_per_board(seeded(ui_game, bitboard, args.plies), args.boards)
+        served = bytes_per_board(seeded(session_game, bitboard, args.plies), args.boards)
+        print(f"{name:<10}{fresh:>12.0f}{ui:>18.0f}{served:>21.0f}")
+
+if __name__ == "__main__":
+    main()
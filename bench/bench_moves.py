@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Move Generation Allocation Benchmark
+Generates the legal moves of the perft positions (and the positions one move deeper) as
+Move objects, piece by piece with piece_moves, and as move codes with legal_codes, and reports
+the memory blocks (objects) kept per generated position and the time.
+
+Usage:
+    python bench/bench_moves.py
+"""
+
+import sys
+import os
+import time
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from bitboard import BitBoard
+import perft
+
+def positions(board_class):
+    """Boards of the perft positions and of every position one legal move after them"""
+    boards = []
+    for name, fen, counts in perft.POSITIONS:
+        board = board_class.from_fen(fen)
+        boards.append(board)
+        for piece, move in perft.legal_moves(board, board.next_player):
+            board.make_move(piece, move)
+            boards.append(board_class.from_fen(board.to_fen()))
+            board.unmake_move()
+    return boards
+
+def move_objects(board):
+    """The legal moves as Move objects, generated per piece"""
+    moves = []
+    for (row, col), piece in board.pieces(board.next_player):
+        moves.extend(board.piece_moves(piece, row, col))
+    return moves
+
+def move_codes(board):
+    return board.legal_codes(board.next_player)
+
+def measure(generate, boards, repeat=5):
+    """(memory blocks kept per generated position, microseconds per position)"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [generate(board) for board in boards]
+    after = tracemalloc.take_snapshot()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del kept
+
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for board in boards:
+            generate(board)
+        best = min(best, time.perf_counter() - start)
+    return blocks / len(boards), best / len(boards) * 1e6
+
+def main():
+    print(f"{'engine':<10}{'moves as':<10}{'blocks/pos':>12}{'us/pos':>10}")
+    for board_class in (Board, BitBoard):
+        boards = positions(board_class)
+        generators = [('objects', move_objects)]
+        if hasattr(board_class, 'legal_codes'):
+            generators.append(('codes', move_codes))
+        for name, generate in generators:
+            blocks, micros = measure(generate, boards)
+            print(f"{board_class.__name__:<10}{name:<10}{blocks:>12.1f}{micros:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Parallel Search Scaling Benchmark
+Searches a fixed position set with the sequential Engine.search and with the root-split
+search at 1, 2, 4, 8 and N workers, and reports time, nodes, nodes per second and speedup
+over the sequential search.
+
+Usage:
+    python bench/bench_parallel.py [--depth 3] [--workers 1 2 4 8 16]
+"""
+
+import sys
+import os
+import time
+import argparse
+import multiprocessing
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from board import Board
+from engine import Engine
+from parallel import ParallelSearch
+import perft
+
+# (name, fen)
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'),
+    ('open game', 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'),
+    ('italian', 'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3'),
+    ('queen pawn', 'rnbqkbnr/ppp2ppp/4p3/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 0 3'),
+]
+
+def run_sequential(depth):
+    """Search every position with one Engine, returning (best moves, total nodes, seconds)"""
+    engine = Engine()
+    best, nodes = [], 0
+    start = time.perf_counter()
+    for name, fen in POSITIONS:
+        board = Board.from_fen(fen)
+        result = engine.search(board, board.next_player, time_ms=float('inf'), max_depth=depth)
+        best.append((perft.move_name(result.move), result.score))
+        nodes += result.nodes
+    return best, nodes, time.perf_counter() - start
+
+def run(workers, depth):
+    """Search every position, returning (best moves, total nodes, seconds)"""
+    search = ParallelSearch(workers)
+    try:
+        best, nodes = [], 0
+        start = time.perf_counter()
+        for name, fen in POSITIONS:
+            result = search.search(fen, depth)
+            best.append((perft.move_name(result.move), result.score))
+            nodes += result.nodes
+        return best, nodes, time.perf_counter() - start
+    finally:
+        search.close()
+
+def main(argv=None):
+    cores = multiprocessing.cpu_count()
+    parser = argparse.ArgumentParser(description='Root-split search scaling benchmark')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, 8, cores}))
+    args = parser.parse_args(argv)
+
+    print(f"{len(POSITIONS)} positions, depth {args.depth}, {cores} cores")
+    print(f"{'workers':>10}{'time s':>10}{'nodes':>10}{'nps':>10}{'speedup':>10}")
+    sequential, nodes, baseline = run_sequential(args.depth)
+    print(f"{'sequential':>10}{baseline:>10.2f}{nodes:>10}{nodes / baseline:>10.0f}{1:>9.2f}x")
+    reference = None
+    for workers in args.workers:
+        best, nodes, elapsed = run(workers, args.depth)
+        if reference is None:
+            reference = best
+        print(f"{workers:>10}{elapsed:>10.2f}{nodes:>10}{nodes / elapsed:>10.0f}{baseline / elapsed:>9.2f}x")
+        # the root split must not change the answer
+        if best != reference:
+            print(f"  results differ from {args.workers[0]} workers: {best} != {reference}")
+            return 1
+    print("best moves: " + ", ".join(f"{name} {move}" for (name, _), (move, _) in zip(POSITIONS, reference)))
+    # equal scores may go to a different move: the root orders differ once the sequential search has a table move
+    print("sequential: " + ", ".join(f"{name} {move}" for (name, _), (move, _) in zip(POSITIONS, sequential)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
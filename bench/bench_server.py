@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Game Server Load Generator
+Drives N simulated clients (N / 2 games) against the asyncio game server over localhost.
+Every pair plays seeded random games, each a different line that never returns to an earlier
+position (so no move is answered from a cached position), and times each move from sending
+MOVE to receiving its MOVED broadcast. A game that has not ended after --plies plies is left
+for a new one.
+
+Usage:
+    python bench/bench_server.py [--clients 200] [--seconds 10] [--plies 60] [--seed 1]
+    python bench/bench_server.py --port 8765     # against a server that is already running
+"""
+
+import sys
+import os
+import time
+import random
+import asyncio
+import itertools
+import argparse
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.append(SRC)
+
+from board import Board
+from perft import move_name
+
+# distinct game lines generated up front, the pairs take them in turn
+LINES = 256
+
+def game_line(rng, plies):
+    '''
+        Moves of a random game of up to plies plies that never repeats a position, and
+        whether it ended (checkmate or stalemate). Of moves sharing their squares the first
+        is played, as the server does.
+    '''
+    board = Board()
+    seen = {board.hash}
+    line = []
+    for _ in range(plies):
+        moves = {}
+        for move in board.position_info(board.next_player).moves:
+            moves.setdefault(move_name(move), move)
+        fresh = []
+        for name, move in moves.items():
+            board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+            if board.hash not in seen:
+                fresh.append(name)
+            board.unmake_move()
+        if not fresh:
+            break
+        name = rng.choice(fresh)
+        move = moves[name]
+        board.move(board.squares[move.initial.row][move.initial.col].piece, move)
+        seen.add(board.hash)
+        line.append(name)
+        if board.position_info(board.next_player).status is not None:
+            return line, True
+    return line, False
+
+async def expect(reader, kind):
+    """Next line starting with kind (skipping other broadcasts), split into words"""
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        words = line.decode().split()
+        if words[0] == kind:
+            return words
+        if words[0] == 'ERROR':
+            raise RuntimeError(line.decode().strip())
+
+async def play_pair(host, port, lines, deadline, latencies):
+    """Two clients playing the (moves, ended) lines against each other until deadline, returning games played"""
+    white_reader, white_writer = await asyncio.open_connection(host, port)
+    black_reader, black_writer = await asyncio.open_connection(host, port)
+    readers = (white_reader, black_reader)
+    writers = (white_writer, black_writer)
+    games = 0
+    try:
+        while time.perf_counter() < deadline:
+            white_writer.write(b'NEW\n')
+            game_id = (await expect(white_reader, 'GAME'))[1]
+            black_writer.write(f'JOIN {game_id}\n'.encode())
+            await expect(black_reader, 'START')
+            await expect(white_reader, 'START')
+            line, ended = next(lines)
+            for ply, move in enumerate(line):
+                mover = ply % 2
+                start = time.perf_counter()
+                writers[mover].write(f'MOVE {move}\n'.encode())
+                await expect(readers[mover], 'MOVED')
+                latencies.append(time.perf_counter() - start)
+                await expect(readers[1 - mover], 'MOVED')
+            if ended:
+                await expect(white_reader, 'OVER')
+                await expect(black_reader, 'OVER')
+            # an unfinished game is abandoned by the next NEW / JOIN
+            games += 1
+    finally:
+        for writer in writers:
+            writer.write(b'QUIT\n')
+            writer.close()
+    return games
+
+async def stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'STATS\n')
+    words = await expect(reader, 'STATS')
+    writer.write(b'QUIT\n')
+    writer.close()
+    return ' '.join(words[1:])
+
+async def run(host, port, clients, seconds, lines):
+    latencies = []
+    start = time.perf_counter()
+    # every pair starts at a different line
+    pairs = asyncio.gather(*(play_pair(host, port, itertools.islice(itertools.cycle(lines), pair, None),
+                                       start + seconds, latencies)
+                             for pair in range(clients // 2)))
+    # server counters while every game is still being played
+    await asyncio.sleep(seconds * 0.9)
+    server_stats = await stats(host, port)
+    games = await pairs
+    return sum(games), latencies, time.perf_counter() - start, server_stats
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def start_server(idle):
+    """Server in a subprocess on a free port, returning (process, port)"""
+    process = subprocess.Popen([sys.executable, os.path.join(SRC, 'server.py'), '--port', '0', '--idle', str(idle)],
+                               stdout=subprocess.PIPE, text=True)
+    # "listening on host:port"
+    port = int(process.stdout.readline().rsplit(':', 1)[1])
+    return process, port
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load generator for the game server')
+    parser.add_argument('--clients', type=int, default=200, help='simulated clients, two per game')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--plies', type=int, default=60, help='longest game before it is abandoned')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the random game lines')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None, help='use a running server instead of starting one')
+    parser.add_argument('--idle', type=float, default=30, help='idle seconds before hibernation (started server)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    lines = [game_line(rng, args.plies) for _ in range(LINES)]
+    process, port = (None, args.port) if args.port else start_server(args.idle)
+    try:
+        games, latencies, elapsed, server_stats = asyncio.run(
+            run(args.host, port, args.clients, args.seconds, lines))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latencies.sort()
+    print(f"{args.clients} clients, {games} games, {len(latencies)} moves in {elapsed:.2f}s")
+    print(f"moves/s {len(latencies) / elapsed:.0f}  latency p50 {percentile(latencies, 50) * 1000:.2f}ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.2f}ms  max {latencies[-1] * 1000:.2f}ms")
+    print(f"server: {server_stats}")
+    print(f"lines: {len(lines)} random games of up to {args.plies} plies, "
+          f"{sum(ended for _, ended in lines)} of them ending in mate or stalemate")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+Measures import time, game creation time and per-game memory of a headless Game (rules only)
+and of a Game with its presentation attached, each in a fresh interpreter.
+"""
+
+import sys
+import os
+import json
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+GAMES = 50
+
+# runs in a fresh interpreter so module imports are measured cold
+SCRIPT = '''
+import sys, time, json, tracemalloc
+sys.path.insert(0, {src!r})
+presentation = {presentation!r}
+start = time.perf_counter()
+from game import Game
+if presentation:
+    import pygame
+    pygame.init()
+imported = time.perf_counter() - start
+
+def new_game():
+    game = Game()
+    if presentation:
+        game.dragger
+    return game
+
+start = time.perf_counter()
+new_game()
+first = time.perf_counter() - start
+
+tracemalloc.start()
+start = time.perf_counter()
+games = [new_game() for _ in range({games})]
+per_game = (time.perf_counter() - start) / {games}
+memory = tracemalloc.get_traced_memory()[0] / {games}
+print(json.dumps([imported, first, per_game, memory, 'pygame' in sys.modules]))
+'''
+
+def measure(presentation):
+    script = SCRIPT.format(src=SRC, presentation=presentation, games=GAMES)
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', SDL_AUDIODRIVER='dummy')
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    print(f"{'mode':<14}{'import ms':>11}{'first ms':>10}{'game ms':>9}{'game KiB':>10}{'pygame':>8}")
+    for name, presentation in (('headless', False), ('presentation', True)):
+        imported, first, per_game, memory, pygame_loaded = measure(presentation)
+        print(f"{name:<14}{imported * 1000:>11.0f}{first * 1000:>10.1f}{per_game * 1000:>9.2f}"
+              f"{memory / 1024:>10.1f}{'yes' if pygame_loaded else 'no':>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from const import *
+
+'''
+    Attack and ray lookup tables, built once at import time.
+    Squares are indexed as row * 8 + col; list tables hold (row, col)
+    tuples for iteration and the *_ATTACKS tables hold the same squares
+    as 64-bit bitboards for membership tests.
+'''
+
+STRAIGHT_INCRS = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+DIAGONAL_INCRS = [(-1, 1), (-1, -1), (1, 1), (1, -1)]
+KNIGHT_INCRS = [(-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1)]
+KING_INCRS = DIAGONAL_INCRS + STRAIGHT_INCRS
+
+def _on_board(row, col):
+    return 0 <= row < ROWS and 0 <= col < COLS
+
+def _step_targets(incrs):
+    """Per-square list of the squares one step of each increment away"""
+    table = []
+    for sq in range(ROWS * COLS):
+        row, col = divmod(sq, COLS)
+        table.append(tuple((row + row_incr, col + col_incr) for row_incr, col_incr in incrs
+                           if _on_board(row + row_incr, col + col_incr)))
+    return table
+
+def _ray_targets(row_incr, col_incr):
+    """Per-square list of the squares along one direction, nearest first"""
+    table = []
+    for sq in range(ROWS * COLS):
+        row, col = divmod(sq, COLS)
+        ray = []
+        row, col = row + row_incr, col + col_incr
+        while _on_board(row, col):
+            ray.append((row, col))
+            row, col = row + row_incr, col + col_incr
+        table.append(tuple(ray))
+    return table
+
+def _bitboards(table):
+    return [sum(1 << (row * COLS + col) for row, col in targets) for targets in table]
+
+KNIGHT_TARGETS = _step_targets(KNIGHT_INCRS)
+KING_TARGETS = _step_targets(KING_INCRS)
+# squares a pawn of each color attacks
+PAWN_TARGETS = {
+    'white': _step_targets([(-1, -1), (-1, 1)]),
+    'black': _step_targets([(1, -1), (1, 1)]),
+}
+# direction -> per-square ray
+RAYS = {incr: _ray_targets(*incr) for incr in STRAIGHT_INCRS + DIAGONAL_INCRS}
+
+KNIGHT_ATTACKS = _bitboards(KNIGHT_TARGETS)
+KING_ATTACKS = _bitboards(KING_TARGETS)
+PAWN_ATTACKS = {color: _bitboards(table) for color, table in PAWN_TARGETS.items()}
+RAY_ATTACKS = {incr: _bitboards(table) for incr, table in RAYS.items()}
+
+def _indexes(table):
+    return [tuple(row * COLS + col for row, col in targets) for targets in table]
+
+# the same tables as square indexes, for the board's attack maps
+KNIGHT_SQUARES = _indexes(KNIGHT_TARGETS)
+KING_SQUARES = _indexes(KING_TARGETS)
+PAWN_SQUARES = {color: _indexes(table) for color, table in PAWN_TARGETS.items()}
+RAY_SQUARES = {incr: _indexes(table) for incr, table in RAYS.items()}
+
+def _between_table(incrs):
+    """[from][to] squares strictly between two squares aligned along incrs, None when not aligned"""
+    table = [[None] * (ROWS * COLS) for sq in range(ROWS * COLS)]
+    for sq in range(ROWS * COLS):
+        for incr in incrs:
+            ray = RAYS[incr][sq]
+            for i, (row, col) in enumerate(ray):
+                table[sq][row * COLS + col] = ray[:i]
+    return table
+
+STRAIGHT_BETWEEN = _between_table(STRAIGHT_INCRS)
+DIAGONAL_BETWEEN = _between_table(DIAGONAL_INCRS)
+
+# (ray bitboards, positive) pairs for bitboard sliders - positive rays walk towards
+# higher square indexes, so their nearest blocker is the lowest set bit, otherwise the highest one
+DIAGONAL_RAYS = [(RAY_ATTACKS[incr], incr[0] * COLS + incr[1] > 0) for incr in DIAGONAL_INCRS]
+STRAIGHT_RAYS = [(RAY_ATTACKS[incr], incr[0] * COLS + incr[1] > 0) for incr in STRAIGHT_INCRS]
+
+def slider_attacks(sq, occupied, rays):
+    """Squares attacked from sq along the given rays, stopping at the first blocker"""
+    attacks = 0
+    for ray, positive in rays:
+        mask = ray[sq]
+        blockers = mask & occupied
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            mask ^= ray[first]
+        attacks |= mask
+    return attacks
+
+def bishop_attacks(sq, occupied):
+    return slider_attacks(sq, occupied, DIAGONAL_RAYS)
+
+def rook_attacks(sq, occupied):
+    return slider_attacks(sq, occupied, STRAIGHT_RAYS)
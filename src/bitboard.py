@@ -0,0 +1,293 @@
+from const import *
+from square import Square
+from piece import *
+from move import *
+from board import Board
+from attacks import (KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, DIAGONAL_RAYS, STRAIGHT_RAYS,
+                     bishop_attacks, rook_attacks)
+
+# piece type indexes into the per-color bitboard lists
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+KINDS = {Pawn: PAWN, Knight: KNIGHT, Bishop: BISHOP, Rook: ROOK, Queen: QUEEN, King: KING}
+
+ALL_SQUARES = (1 << (ROWS * COLS)) - 1
+
+class BitBoard(Board):
+
+    '''
+        Board engine that mirrors the position into 64-bit bitboards per piece type and color.
+        The squares stay the source of truth for the UI; every piece change on a square
+        is reflected in the bitboards, and the rules queries run on integer operations.
+    '''
+
+    def __init__(self, fen=None):
+        self.bitboards = {'white': [0] * 6, 'black': [0] * 6}
+        self.occupied = {'white': 0, 'black': 0}
+        super().__init__(fen)
+
+    def _piece_changed(self, square, old, new):
+        super()._piece_changed(square, old, new)
+        bit = 1 << (square.row * COLS + square.col)
+        if old is not None:
+            self.bitboards[old.color][KINDS[old.kind]] &= ~bit
+            self.occupied[old.color] &= ~bit
+        if new is not None:
+            self.bitboards[new.color][KINDS[new.kind]] |= bit
+            self.occupied[new.color] |= bit
+
+    def _clear(self):
+        super()._clear()
+        self.bitboards = {'white': [0] * 6, 'black': [0] * 6}
+        self.occupied = {'white': 0, 'black': 0}
+
+    def _rebuild(self):
+        super()._rebuild()
+        for color, pieces in self.piece_squares.items():
+            bitboards = self.bitboards[color]
+            occupied = 0
+            for (row, col), piece in pieces.items():
+                bit = 1 << (row * COLS + col)
+                bitboards[KINDS[piece.kind]] |= bit
+                occupied |= bit
+            self.occupied[color] |= occupied
+
+    # attack detection
+
+    def _is_attacked(self, sq, color, occupied, captured=0):
+        """Check if sq is attacked by the opponent of color, ignoring pieces in captured"""
+        enemy = self.bitboards['black' if color == 'white' else 'white']
+        keep = ~captured
+        if KNIGHT_ATTACKS[sq] & enemy[KNIGHT] & keep:
+            return True
+        if PAWN_ATTACKS[color][sq] & enemy[PAWN] & keep:
+            return True
+        if KING_ATTACKS[sq] & enemy[KING]:
+            return True
+        queens = enemy[QUEEN]
+        diagonal = (enemy[BISHOP] | queens) & keep
+        if diagonal and bishop_attacks(sq, occupied) & diagonal:
+            return True
+        straight = (enemy[ROOK] | queens) & keep
+        if straight and rook_attacks(sq, occupied) & straight:
+            return True
+        return False
+
+    def _king_sq(self, color):
+        kings = self.bitboards[color][KING]
+        return kings.bit_length() - 1 if kings else None
+
+    # in_check and square_under_attack are the board's attack map lookups
+
+    def _is_legal(self, color, kind, from_sq, to_sq, captured):
+        """Check if moving from_sq -> to_sq (removing the captured bits) keeps the king safe"""
+        occupied = self.occupied['white'] | self.occupied['black']
+        occupied = (occupied & ~captured & ~(1 << from_sq)) | (1 << to_sq)
+        king_sq = to_sq if kind == KING else self._king_sq(color)
+        if king_sq is None:
+            return True
+        return not self._is_attacked(king_sq, color, occupied, captured)
+
+    def would_be_in_check(self, piece, move):
+        """Check if a move would put or leave the king in check"""
+        initial = move.initial
+        final = move.final
+        from_sq = initial.row * COLS + initial.col
+        to_sq = final.row * COLS + final.col
+        rival = self.occupied['black' if piece.color == 'white' else 'white']
+        captured = (1 << to_sq) & rival
+        # en passant removes the pawn beside the moving pawn
+        if (isinstance(piece, Pawn) and not captured and initial.col != final.col and
+                self.en_passant_target and
+                final.row == self.en_passant_target.row and
+                final.col == self.en_passant_target.col):
+            captured = (1 << (initial.row * COLS + final.col)) & rival
+        return not self._is_legal(piece.color, KINDS[piece.kind], from_sq, to_sq, captured)
+
+    # move generation
+
+    def _check_info(self, color):
+        '''
+            The king square of color, the checkers bitboard, the mask of squares a move
+            must end on to resolve a single check (every square when not in check) and the
+            pinned pieces by square with the ray mask they may still move along
+        '''
+        king_sq = self._king_sq(color)
+        if king_sq is None:
+            return None, 0, ALL_SQUARES, {}
+        enemy = self.bitboards['black' if color == 'white' else 'white']
+        own = self.occupied[color]
+        occupied = own | self.occupied['black' if color == 'white' else 'white']
+
+        # knights and pawns check from a single square, which is also the only way out
+        checkers = (KNIGHT_ATTACKS[king_sq] & enemy[KNIGHT]) | (PAWN_ATTACKS[color][king_sq] & enemy[PAWN])
+        block = checkers
+        pins = {}
+
+        # sliders: walk each ray out of the king to its first and second piece
+        queens = enemy[QUEEN]
+        for rays, sliders in ((DIAGONAL_RAYS, enemy[BISHOP] | queens), (STRAIGHT_RAYS, enemy[ROOK] | queens)):
+            if not sliders:
+                continue
+            for ray, positive in rays:
+                mask = ray[king_sq]
+                if not mask & sliders:
+                    continue
+                blockers = mask & occupied
+                first = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+                if sliders >> first & 1:
+                    # checker: the squares up to and including it resolve the check
+                    checkers |= 1 << first
+                    block |= mask ^ ray[first]
+                elif own >> first & 1:
+                    beyond = ray[first] & occupied
+                    if beyond:
+                        second = (beyond & -beyond).bit_length() - 1 if positive else beyond.bit_length() - 1
+                        if sliders >> second & 1:
+                            pins[first] = mask ^ ray[second]
+
+        if not checkers:
+            block = ALL_SQUARES
+        return king_sq, checkers, block, pins
+
+    def legal_codes(self, color):
+        """Move codes of every legal move of color"""
+        codes = []
+        self._generate(color, self._check_info(color), codes)
+        return codes
+
+    def _piece_codes(self, piece, row, col, codes, check=None):
+        self._generate(piece.color, check or self._check_info(piece.color), codes, 1 << (row * COLS + col))
+
+    def _generate(self, color, check, codes, origins=ALL_SQUARES):
+        '''
+            Append to codes the move codes of the legal moves of color's pieces standing on
+            the origins bitboard, a piece type at a time. check is the _check_info of color:
+            every move ends inside its check mask (and a pinned piece on its pin ray), so
+            only king steps (attacked squares) and en passant (two pieces leave one rank)
+            are tested against the position
+        '''
+        king_sq, checkers, block, pins = check
+        opponent = 'black' if color == 'white' else 'white'
+        pieces = self.bitboards[color]
+        own = self.occupied[color]
+        rival = self.occupied[opponent]
+        occupied = own | rival
+        append = codes.append
+
+        if king_sq is not None and origins >> king_sq & 1:
+            enemy_attacks = self.attacks[opponent]
+            targets = KING_ATTACKS[king_sq] & ~own
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                to_sq = bit.bit_length() - 1
+                # the attack map, and when in check a look through the king's own square
+                if enemy_attacks[to_sq]:
+                    continue
+                if checkers and self._is_attacked(to_sq, color, occupied ^ (1 << king_sq)):
+                    continue
+                code = king_sq | to_sq << 6
+                append(code | CAPTURE if bit & rival else ROUTES[code])
+
+            # castling moves (the king's square and the squares it passes looked up in the attack map)
+            row, col = divmod(king_sq, COLS)
+            if not checkers and not self.squares[row][col].piece.moved:
+                # queen castling (long castling)
+                left_rook = self.squares[row][0].piece
+                if (isinstance(left_rook, Rook) and not left_rook.moved and
+                        not occupied & (0b1110 << row * COLS) and
+                        not enemy_attacks[row * COLS + 3] and
+                        not enemy_attacks[row * COLS + 2]):
+                    append(king_sq | (row * COLS + 2) << 6 | CASTLING)
+
+                # king castling (short castling)
+                right_rook = self.squares[row][7].piece
+                if (isinstance(right_rook, Rook) and not right_rook.moved and
+                        not occupied & (0b1100000 << row * COLS) and
+                        not enemy_attacks[row * COLS + 5] and
+                        not enemy_attacks[row * COLS + 6]):
+                    append(king_sq | (row * COLS + 6) << 6 | CASTLING)
+
+        # double check - only the king can move
+        if checkers & (checkers - 1):
+            return
+
+        pinned = 0
+        for sq in pins:
+            pinned |= 1 << sq
+        allowed = block & ~own
+
+        # knights (a pinned knight has no move along its pin ray)
+        movers = pieces[KNIGHT] & origins & ~pinned
+        while movers:
+            bit = movers & -movers
+            movers ^= bit
+            sq = bit.bit_length() - 1
+            targets = KNIGHT_ATTACKS[sq] & allowed
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                code = sq | (bit.bit_length() - 1) << 6
+                append(code | CAPTURE if bit & rival else ROUTES[code])
+
+        # sliders: queens are generated with the bishops and again with the rooks
+        queens = pieces[QUEEN]
+        for movers, slider_attacks in ((pieces[BISHOP] | queens, bishop_attacks), (pieces[ROOK] | queens, rook_attacks)):
+            movers &= origins
+            while movers:
+                bit = movers & -movers
+                movers ^= bit
+                sq = bit.bit_length() - 1
+                targets = slider_attacks(sq, occupied) & allowed
+                if pinned & bit:
+                    targets &= pins[sq]
+                while targets:
+                    bit = targets & -targets
+                    targets ^= bit
+                    code = sq | (bit.bit_length() - 1) << 6
+                    append(code | CAPTURE if bit & rival else ROUTES[code])
+
+        # pawns
+        movers = pieces[PAWN] & origins
+        if not movers:
+            return
+        if color == 'white':
+            forward, start_row, last_row = -COLS, ROWS - 2, 0
+        else:
+            forward, start_row, last_row = COLS, 1, ROWS - 1
+        pawn_attacks = PAWN_ATTACKS[color]
+        target = self.en_passant_target
+        en_passant = -1 if target is None else target.row * COLS + target.col
+        while movers:
+            bit = movers & -movers
+            movers ^= bit
+            sq = bit.bit_length() - 1
+            pawn_allowed = block & pins[sq] if pinned & bit else block
+            # promotion on the last rank
+            to_sq = sq + forward
+            promotion = PROMOTE_QUEEN if to_sq // COLS == last_row else 0
+
+            # vertical moves, two squares from the starting row
+            if 0 <= to_sq < ROWS * COLS and not occupied >> to_sq & 1:
+                if pawn_allowed >> to_sq & 1:
+                    code = sq | to_sq << 6
+                    append(code | promotion if promotion else ROUTES[code])
+                to_sq += forward
+                if sq // COLS == start_row and not occupied >> to_sq & 1 and pawn_allowed >> to_sq & 1:
+                    append(sq | to_sq << 6 | DOUBLE_PUSH)
+
+            # diagonal moves
+            attacks = pawn_attacks[sq]
+            targets = attacks & rival & pawn_allowed
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                append(sq | (bit.bit_length() - 1) << 6 | CAPTURE | promotion)
+
+            # en passant removes two pieces from the capturing rank,
+            # so it is the one move still tried on the bitboards
+            if en_passant >= 0 and attacks >> en_passant & 1 and not occupied >> en_passant & 1:
+                captured = (1 << (sq - sq % COLS + en_passant % COLS)) & rival
+                if self._is_legal(color, PAWN, sq, en_passant, captured):
+                    append(sq | en_passant << 6 | CAPTURE | EN_PASSANT)
@@ -1,53 +1,255 @@
-import pygame
-
 from const import *
 from square import Square
 from piece import *
-from move import Move
+from move import *
+from zobrist import *
+from cache import PositionCache, PositionInfo
+from attacks import *
+from functools import lru_cache
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# FEN letter -> (piece class, color)
+FEN_PIECES = {}
+for char, piece_class in (('p', Pawn), ('n', Knight), ('b', Bishop), ('r', Rook), ('q', Queen), ('k', King)):
+    FEN_PIECES[char.upper()] = (piece_class, 'white')
+    FEN_PIECES[char] = (piece_class, 'black')
+FEN_CASTLING = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+
+# contents of an empty board's mailbox
+EMPTY_SQUARES = [None] * (ROWS * COLS)
+
+@lru_cache(maxsize=4096)
+def parse_rank(row, rank):
+    '''
+        (col, (row, col), square index, piece class, color, moved) of every piece in the
+        FEN rank on row, e.g. 'r3k2r'. Pawns off their starting rank have moved, everything
+        else until the castling field says otherwise.
+    '''
+    pieces = []
+    col = 0
+    for char in rank:
+        if char in '12345678':
+            col += int(char)
+            continue
+        piece_class, color = FEN_PIECES[char]
+        moved = row != (6 if color == 'white' else 1) if piece_class is Pawn else True
+        pieces.append((col, (row, col), row * COLS + col, piece_class, color, moved))
+        col += 1
+    return tuple(pieces)
 
 class Board:
 
-    def __init__(self):
+    def __init__(self, fen=None):
         self.squares = [[0, 0, 0, 0, 0, 0, 0, 0] for col in range(COLS)]
 
+        # Zobrist key of the position, kept up to date incrementally
+        self.hash = 0
+        self.next_player = 'white'
+        self.castling_rights = 0
+        self._en_passant_target = None
+
+        # pieces of each color by (row, col) and the king squares, kept in sync with the squares
+        self.piece_squares = {'white': {}, 'black': {}}
+        self.king_squares = {'white': None, 'black': None}
+
+        # the piece on every square index, and the attack maps: how many pieces of each color
+        # attack every square and the squares each piece attacks, built on first use
+        # (see the attacks property) and kept up to date incrementally from then on
+        self.mailbox = [None] * (ROWS * COLS)
+        self._attacks = None
+        self._attack_sets = None
+
+        # legal moves / check / game status per position
+        self.cache = PositionCache()
+
+        # undo records of the moves played with make_move
+        self.undo_stack = []
+
+        # FEN move counters: plies since the last capture or pawn move, and the move number
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
         self._create()
         self.last_move = None
         self.en_passant_target = None  # Square where en passant capture is possible
-        self._add_pieces('white')
-        self._add_pieces('black')
+        if fen is None:
+            self._add_pieces('white')
+            self._add_pieces('black')
+            self._rebuild()
+        else:
+            self._load_fen(fen)
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Board set up from a FEN string"""
+        return cls(fen)
+
+    def load_fen(self, fen):
+        '''
+            Set this board to the position of a FEN string in place, reusing its squares,
+            piece lists and cache: the way to go through many positions (batch analysis,
+            perft suites), where from_fen builds a whole new Board every time
+        '''
+        self._clear()
+        self._load_fen(fen)
+        return self
+
+    def _clear(self):
+        """Take every piece off and reset the position state, keeping the squares and tables"""
+        squares = self.squares
+        for color in ('white', 'black'):
+            pieces = self.piece_squares[color]
+            for row, col in pieces:
+                squares[row][col].place(None)
+            pieces.clear()
+            self.king_squares[color] = None
+        self.mailbox[:] = EMPTY_SQUARES
+        self._attacks = None
+        self._attack_sets = None
+        self.next_player = 'white'
+        self._en_passant_target = None
+        self.last_move = None
+        self.undo_stack.clear()
+        self.cache.clear()
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+    def to_fen(self):
+        """FEN string of the position"""
+        ranks = []
+        for row in range(ROWS):
+            rank = ''
+            empty = 0
+            for col in range(COLS):
+                piece = self.squares[row][col].piece
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                char = 'n' if isinstance(piece, Knight) else piece.name[0]
+                rank += char.upper() if piece.color == 'white' else char
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+
+        castling = ''.join(char for char, right in FEN_CASTLING if self.castling_rights & right) or '-'
+        target = self.en_passant_target
+        en_passant = '-' if target is None else Square.get_alphacol(target.col) + str(ROWS - target.row)
+        return (f"{'/'.join(ranks)} {self.next_player[0]} {castling} {en_passant} "
+                f"{self.halfmove_clock} {self.fullmove_number}")
+
+    def _load_fen(self, fen):
+        '''
+            Place the pieces of a FEN string on the (empty) board. Castling rights become
+            the moved flags of the kings and rooks, pawns off their starting rank have moved.
+            The pieces are placed without the per-square updates and the derived state is
+            rebuilt once at the end.
+        '''
+        fields = fen.split()
+        placement, side, castling, en_passant = fields[:4]
+        squares = self.squares
+        mailbox = self.mailbox
+        piece_squares = self.piece_squares
+        for row, rank in enumerate(placement.split('/')):
+            row_squares = squares[row]
+            for col, pos, sq, piece_class, color, moved in parse_rank(row, rank):
+                piece = piece_class(color)
+                piece.moved = moved
+                row_squares[col].place(piece)
+                mailbox[sq] = piece
+                piece_squares[color][pos] = piece
+
+        # castling rights -> unmoved king and rook
+        for char, row, rook_col in (('K', 7, 7), ('Q', 7, 0), ('k', 0, 7), ('q', 0, 0)):
+            if char in castling:
+                king = squares[row][4].piece
+                rook = squares[row][rook_col].piece
+                if isinstance(king, King) and isinstance(rook, Rook):
+                    king.moved = False
+                    rook.moved = False
+
+        if en_passant != '-':
+            self._en_passant_target = Square(ROWS - int(en_passant[1]), 'abcdefgh'.index(en_passant[0]))
+        if side == 'b':
+            self.next_player = 'black'
+        self._rebuild()
+        if len(fields) >= 6:
+            self.halfmove_clock = int(fields[4])
+            self.fullmove_number = int(fields[5])
+
+    @property
+    def en_passant_target(self):
+        return self._en_passant_target
+
+    @en_passant_target.setter
+    def en_passant_target(self, square):
+        # keep the en passant file in the position hash
+        if self._en_passant_target is not None:
+            self.hash ^= EN_PASSANT_KEYS[self._en_passant_target.col]
+        if square is not None:
+            self.hash ^= EN_PASSANT_KEYS[square.col]
+        self._en_passant_target = square
+
+    def rehash(self):
+        """Recompute castling rights and the position hash from scratch (after editing squares by hand)"""
+        self.castling_rights = castling_rights(self)
+        self.hash = hash_board(self)
 
     def move(self, piece, move):
+        self.make_move(piece, move)
+
+        # clear valid moves
+        piece.clear_moves()
+
+    def make_move(self, piece, move):
+        """Play a move, pushing an undo record so unmake_move can take it back"""
         initial = move.initial
         final = move.final
+        final_square = self.squares[final.row][final.col]
+
+        # undo record: what the move captured (and where), the previous en passant
+        # target and moved flags, whether it promoted, and the previous hash state
+        captured = final_square.piece
+        captured_square = final_square
+        rook_moved = None
+        undo_state = (self.en_passant_target, piece.moved, self.castling_rights, 
+                      self.next_player, self.last_move, self.hash,
+                      self.halfmove_clock, self.fullmove_number)
 
         # Check if this is a castling move
         if isinstance(piece, King) and abs(final.col - initial.col) == 2:
+            rook_moved = self.squares[initial.row][7 if final.col == 6 else 0].piece.moved
             self.castling(initial, final)
         else:
             # update move on console board
             self.squares[initial.row][initial.col].piece = None
-            self.squares[final.row][final.col].piece = piece
+            final_square.piece = piece
 
             # En passant capture
             if (isinstance(piece, Pawn) and 
+                captured is None and 
                 self.en_passant_target and 
                 final.row == self.en_passant_target.row and 
                 final.col == self.en_passant_target.col):
                 # Remove the captured pawn (which is behind the final square)
                 captured_row = initial.row  # Same row as the moving pawn
                 captured_col = final.col    # Same column as the final square
-                self.squares[captured_row][captured_col].piece = None
+                captured_square = self.squares[captured_row][captured_col]
+                captured = captured_square.piece
+                captured_square.piece = None
 
             # pawn promotion
             if isinstance(piece, Pawn):
                 self.check_promotion(piece, final)
 
+        self.undo_stack.append((piece, move, captured, captured_square, rook_moved, undo_state))
+
         # moved
         piece.moved = True
 
-        # clear valid moves
-        piece.clear_moves()
-
         # set last move
         self.last_move = move
         
@@ -58,68 +260,79 @@ class Board:
         else:
             self.en_passant_target = None
 
+        # castling rights are lost once a king or rook leaves (or is captured on) its home square
+        rights = (self.castling_rights & 
+                  CASTLING_MASKS[initial.row * COLS + initial.col] & 
+                  CASTLING_MASKS[final.row * COLS + final.col])
+        if rights != self.castling_rights:
+            self.hash ^= CASTLING_KEYS[self.castling_rights] ^ CASTLING_KEYS[rights]
+            self.castling_rights = rights
+
+        # move counters
+        if captured is not None or isinstance(piece, Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if self.next_player == 'black':
+            self.fullmove_number += 1
+
+        # switch side to move
+        self.next_player = 'black' if self.next_player == 'white' else 'white'
+        self.hash ^= SIDE_KEY
+
+    def unmake_move(self):
+        """Take back the last move played with make_move"""
+        piece, move, captured, captured_square, rook_moved, undo_state = self.undo_stack.pop()
+        initial = move.initial
+        final = move.final
+
+        # castling - put the rook back in its corner
+        if rook_moved is not None:
+            rook_col, rook_final_col = (7, 5) if final.col == 6 else (0, 3)
+            rook = self.squares[initial.row][rook_final_col].piece
+            self.squares[initial.row][rook_final_col].piece = None
+            self.squares[initial.row][rook_col].piece = rook
+            rook.moved = rook_moved
+
+        # the moving piece goes back (a promoted pawn replaces its queen)
+        self.squares[final.row][final.col].piece = None
+        if captured is not None:
+            captured_square.piece = captured
+        self.squares[initial.row][initial.col].piece = piece
+
+        (self.en_passant_target, piece.moved, self.castling_rights, 
+         self.next_player, self.last_move, self.hash,
+         self.halfmove_clock, self.fullmove_number) = undo_state
+
     def valid_move(self, piece, move):
-        return move in piece.moves
+        """Check if move is legal for piece - a set lookup in the legal moves of the position"""
+        initial = move.initial
+        if self.squares[initial.row][initial.col].piece is not piece:
+            return False
+        return self.position_info(piece.color).is_legal(move)
     
     def in_check(self, color):
         """Check if the king of given color is in check"""
         # Find the king
-        king = None
-        king_row, king_col = None, None
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece():
-                    if isinstance(square.piece, King) and square.piece.color == color:
-                        king = square.piece
-                        king_row, king_col = row, col
-                        break
-            if king:
-                break
-        
-        if not king:
+        king_pos = self.king_squares[color]
+        if not king_pos:
             return False
         
-        # Check if any opponent piece can attack the king
+        # a lookup in the opponent's attack map
         opponent_color = 'black' if color == 'white' else 'white'
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece() and square.piece.color == opponent_color:
-                    piece = square.piece
-                    # Check if this piece can attack the king directly
-                    if self.can_attack_king(piece, row, col, king_row, king_col):
-                        return True
-        return False
+        return self.attacks[opponent_color][king_pos[0] * COLS + king_pos[1]] > 0
     
     def can_attack_king(self, piece, piece_row, piece_col, king_row, king_col):
         """Check if a piece can attack the king without recursion"""
+        piece_sq = piece_row * COLS + piece_col
+        king_sq = king_row * COLS + king_col
+        
         if isinstance(piece, Pawn):
             # Pawns attack diagonally
-            direction = -1 if piece.color == 'white' else 1
-            attack_squares = [(piece_row + direction, piece_col - 1), 
-                             (piece_row + direction, piece_col + 1)]
-            # Check if attack squares are in range and contain the king
-            for attack_row, attack_col in attack_squares:
-                if (Square.in_range(attack_row, attack_col) and 
-                    attack_row == king_row and attack_col == king_col):
-                    return True
-            return False
+            return PAWN_ATTACKS[piece.color][piece_sq] >> king_sq & 1 == 1
             
         elif isinstance(piece, Knight):
-            # Knight moves
-            knight_moves = [
-                (piece_row - 2, piece_col + 1), (piece_row - 1, piece_col + 2),
-                (piece_row + 1, piece_col + 2), (piece_row + 2, piece_col + 1),
-                (piece_row + 2, piece_col - 1), (piece_row + 1, piece_col - 2),
-                (piece_row - 1, piece_col - 2), (piece_row - 2, piece_col - 1)
-            ]
-            # Check if any knight move reaches the king
-            for move_row, move_col in knight_moves:
-                if (Square.in_range(move_row, move_col) and 
-                    move_row == king_row and move_col == king_col):
-                    return True
-            return False
+            return KNIGHT_ATTACKS[piece_sq] >> king_sq & 1 == 1
             
         elif isinstance(piece, Bishop):
             # Bishop moves diagonally
@@ -136,145 +349,192 @@ class Board:
             
         elif isinstance(piece, King):
             # King moves one square in any direction
-            return abs(king_row - piece_row) <= 1 and abs(king_col - piece_col) <= 1
+            return KING_ATTACKS[piece_sq] >> king_sq & 1 == 1
             
         return False
     
     def can_move_diagonally(self, from_row, from_col, to_row, to_col):
         """Check if a piece can move diagonally from one square to another"""
-        if abs(to_row - from_row) != abs(to_col - from_col):
+        between = DIAGONAL_BETWEEN[from_row * COLS + from_col][to_row * COLS + to_col]
+        if between is None:
             return False
-            
-        row_dir = 1 if to_row > from_row else -1
-        col_dir = 1 if to_col > from_col else -1
-        
-        current_row = from_row + row_dir
-        current_col = from_col + col_dir
-        
-        while current_row != to_row and current_col != to_col:
-            if self.squares[current_row][current_col].has_piece():
+        for row, col in between:
+            if self.squares[row][col].piece is not None:
                 return False
-            current_row += row_dir
-            current_col += col_dir
-            
         return True
     
     def can_move_straight(self, from_row, from_col, to_row, to_col):
         """Check if a piece can move straight from one square to another"""
-        if from_row != to_row and from_col != to_col:
+        between = STRAIGHT_BETWEEN[from_row * COLS + from_col][to_row * COLS + to_col]
+        if between is None:
             return False
-            
-        if from_row == to_row:  # Horizontal move
-            col_dir = 1 if to_col > from_col else -1
-            current_col = from_col + col_dir
-            while current_col != to_col:
-                if self.squares[from_row][current_col].has_piece():
-                    return False
-                current_col += col_dir
-        else:  # Vertical move
-            row_dir = 1 if to_row > from_row else -1
-            current_row = from_row + row_dir
-            while current_row != to_row:
-                if self.squares[current_row][from_col].has_piece():
-                    return False
-                current_row += row_dir
-                
+        for row, col in between:
+            if self.squares[row][col].piece is not None:
+                return False
         return True
     
     def square_under_attack(self, row, col, defending_color):
         """Check if a square is under attack by the opponent"""
-        attacking_color = 'black' if defending_color == 'white' else 'white'
+        opponent_color = 'black' if defending_color == 'white' else 'white'
+        return self.attacks[opponent_color][row * COLS + col] > 0
+    
+    def attack_count(self, row, col, color):
+        """Number of pieces of color attacking (row, col)"""
+        return self.attacks[color][row * COLS + col]
+    
+    def _attacked(self, row, col, color, ignore=None):
+        """Check if (row, col) is attacked by the opponent of color, treating the ignore square as empty"""
+        squares = self.squares
+        sq = row * COLS + col
+        
+        # knights
+        for r, c in KNIGHT_TARGETS[sq]:
+            piece = squares[r][c].piece
+            if isinstance(piece, Knight) and piece.color != color:
+                return True
+        
+        # pawns attack the square from where a pawn of the defending color would attack
+        for r, c in PAWN_TARGETS[color][sq]:
+            piece = squares[r][c].piece
+            if isinstance(piece, Pawn) and piece.color != color:
+                return True
         
-        for r in range(ROWS):
-            for c in range(COLS):
-                square = self.squares[r][c]
-                if square.has_piece() and square.piece.color == attacking_color:
-                    piece = square.piece
-                    if self.can_attack_king(piece, r, c, row, col):
-                        return True
+        # kings
+        for r, c in KING_TARGETS[sq]:
+            piece = squares[r][c].piece
+            if isinstance(piece, King) and piece.color != color:
+                return True
+        
+        # sliders, walking outwards from the square
+        for incrs, sliders in ((STRAIGHT_INCRS, (Rook, Queen)), (DIAGONAL_INCRS, (Bishop, Queen))):
+            for incr in incrs:
+                for r, c in RAYS[incr][sq]:
+                    piece = squares[r][c].piece
+                    if piece is not None and (r, c) != ignore:
+                        if piece.color != color and isinstance(piece, sliders):
+                            return True
+                        break
         return False
     
+    def _check_info(self, color):
+        '''
+            Find the king of color, the pieces giving check, the squares that
+            resolve a single check (capturing or blocking the checker) and the
+            pinned pieces with the squares they may still move to
+        '''
+        king_pos = self.king_squares[color]
+        checkers = []
+        block = set()
+        pins = {}
+        if king_pos is None:
+            return king_pos, checkers, block, pins
+        king_sq = king_pos[0] * COLS + king_pos[1]
+        
+        # sliders: the first own piece on a ray is pinned if an enemy slider stands behind it
+        for incrs, sliders in ((STRAIGHT_INCRS, (Rook, Queen)), (DIAGONAL_INCRS, (Bishop, Queen))):
+            for incr in incrs:
+                ray = RAYS[incr][king_sq]
+                pinned = None
+                for i, (r, c) in enumerate(ray):
+                    piece = self.squares[r][c].piece
+                    if piece is not None:
+                        if piece.color == color:
+                            if pinned:
+                                break
+                            pinned = (r, c)
+                        else:
+                            if isinstance(piece, sliders):
+                                if pinned:
+                                    pins[pinned] = set(ray[:i + 1])
+                                else:
+                                    checkers.append((r, c))
+                                    block.update(ray[:i + 1])
+                            break
+        
+        # knights and pawns, only looked for when the attack map has the king attacked
+        if self.attacks['black' if color == 'white' else 'white'][king_sq] > len(checkers):
+            for r, c in KNIGHT_TARGETS[king_sq]:
+                piece = self.squares[r][c].piece
+                if isinstance(piece, Knight) and piece.color != color:
+                    checkers.append((r, c))
+                    block.add((r, c))
+            
+            for r, c in PAWN_TARGETS[color][king_sq]:
+                piece = self.squares[r][c].piece
+                if isinstance(piece, Pawn) and piece.color != color:
+                    checkers.append((r, c))
+                    block.add((r, c))
+        
+        return king_pos, checkers, block, pins
+    
     def would_be_in_check(self, piece, move):
         """Check if a move would put or leave the king in check"""
-        # Save current state
-        initial = move.initial
-        final = move.final
-        captured_piece = self.squares[final.row][final.col].piece
-        
-        # Make the move temporarily
-        self.squares[initial.row][initial.col].piece = None
-        self.squares[final.row][final.col].piece = piece
+        # Make the move temporarily (exact for en passant and promotion too)
+        self.make_move(piece, move)
         
         # Check if king is in check
         in_check = self.in_check(piece.color)
         
-
-        
         # Restore the board
-        self.squares[initial.row][initial.col].piece = piece
-        self.squares[final.row][final.col].piece = captured_piece
+        self.unmake_move()
         
         return in_check
     
+    def iter_legal_codes(self, color, check=None):
+        '''
+            Yield the move codes of the legal moves of color, generated a piece at a time,
+            so a caller that stops early never generates the rest. check is the _check_info
+            of color, if the caller already has it. The board must not change while iterating.
+        '''
+        check = check or self._check_info(color)
+        codes = []
+        for (row, col), piece in self.pieces(color):
+            self._piece_codes(piece, row, col, codes, check)
+            yield from codes
+            codes.clear()
+
+    def iter_legal_moves(self, color):
+        """Yield the legal moves of color one at a time, as Move views"""
+        for code in self.iter_legal_codes(color):
+            yield Move.from_code(code)
+
+    def any_legal_move(self, color):
+        """Check if color has a legal move, stopping at the first one found"""
+        for _ in self.iter_legal_codes(color):
+            return True
+        return False
+
     def has_valid_moves(self, color):
         """Check if the given color has any valid moves"""
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece() and square.piece.color == color:
-                    # Calculate moves for this piece
-                    self.calc_moves(square.piece, row, col)
-                    if len(square.piece.moves) > 0:
-                        return True
-        return False
+        return self.any_legal_move(color)
+
+    def game_status(self, color):
+        '''
+            'checkmate', 'stalemate' or None for color to move: the check information is
+            computed once and shared by the move search and the mate / stalemate verdict
+        '''
+        check = self._check_info(color)
+        for _ in self.iter_legal_codes(color, check):
+            return None
+        return 'checkmate' if check[1] else 'stalemate'
     
     def is_checkmate(self, color):
         """Check if the given color is in checkmate"""
-        # First check if the king is in check
-        if not self.in_check(color):
-            return False
-        
-        # Find the king
-        king = None
-        king_row, king_col = None, None
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece():
-                    if isinstance(square.piece, King) and square.piece.color == color:
-                        king = square.piece
-                        king_row, king_col = row, col
-                        break
-            if king:
-                break
-        
-        if not king:
-            return False
-        
-        # Check if king can escape check
-        king.clear_moves()
-        self.calc_moves(king, king_row, king_col)
-        if len(king.moves) > 0:
-            return False  # King can escape
-        
-        # Check if any other piece can block the check or capture the attacking piece
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.squares[row][col]
-                if square.has_piece() and square.piece.color == color and square.piece != king:
-                    square.piece.clear_moves()
-                    self.calc_moves(square.piece, row, col)
-                    if len(square.piece.moves) > 0:
-                        return False  # Another piece can help
-        
-        return True  # No escape possible
+        return self.in_check(color) and not self.any_legal_move(color)
     
     def is_stalemate(self, color):
         """Check if the given color is in stalemate"""
-        return not self.in_check(color) and not self.has_valid_moves(color)
+        return not self.in_check(color) and not self.any_legal_move(color)
+
+    def position_info(self, color):
+        """Legal moves, check flag and game status of color, read through the position cache"""
+        key = (self.hash, color)
+        info = self.cache.get(key)
+        if info is None:
+            info = PositionInfo(self.legal_codes(color), self.in_check(color))
+            self.cache.put(key, info)
+        return info
     
-
-        
     def check_promotion(self, piece, final):
         if final.row == 0 or final.row == 7:
             self.squares[final.row][final.col].piece = Queen(piece.color)
@@ -306,258 +566,313 @@ class Board:
                 self.squares[initial.row][5].piece = rook
                 self.squares[initial.row][7].piece = None
 
+    def legal_codes(self, color):
+        """Move codes of every legal move of color"""
+        codes = []
+        # checkers and pins are found once for the whole position
+        check = self._check_info(color)
+        for (row, col), piece in self.pieces(color):
+            self._piece_codes(piece, row, col, codes, check)
+        return codes
+
+    def piece_moves(self, piece, row, col):
+        """Legal moves of the piece on (row, col) as Move views - nothing on the piece or board changes"""
+        codes = []
+        self._piece_codes(piece, row, col, codes)
+        return [Move.from_code(code) for code in codes]
+
     def calc_moves(self, piece, row, col):
 
         '''
             Calculate all the valid moves for a specific piece at a specific position
+            and add them to piece.moves (the queries use piece_moves, which leaves it alone)
         '''
 
-        def pawn_moves():
-            # pawn steps depending on if its already moved or not
-            steps = 1 if piece.moved else 2
-
-            # vertical moves
-            start = row + piece.dir
-            end = row + (piece.dir * (1 + steps))
-            for possible_move_row in range(start, end, piece.dir):
-                if Square.in_range(possible_move_row):
-                    if self.squares[possible_move_row][col].isempty():
-                        # create squares for the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, col)
-                        # create new move
-                        move = Move(initial, final)
-                        # check if move doesn't put king in check
-                        if not self.would_be_in_check(piece, move):
-                            # append new valid move
-                            piece.add_move(move)
-                    # another piece is blocking the pawn
-                    else:
-                        break
-                # not in range
-                else: break
+        for move in self.piece_moves(piece, row, col):
+            piece.add_move(move)
 
-            # diagonal moves
+    def _piece_codes(self, piece, row, col, codes, check=None):
+        '''
+            Append the move codes of the legal moves of the piece on (row, col) to codes.
+            check is the _check_info of the piece's color, if the caller already has it.
+            No Square or Move is created: only en passant is tried on the board.
+        '''
+        king_pos, checkers, block, pins = check or self._check_info(piece.color)
+
+        # double check - only the king can move
+        if len(checkers) > 1 and not isinstance(piece, King):
+            return
+
+        squares = self.squares
+        color = piece.color
+        sq = row * COLS + col
+
+        # squares a move may end on: a pinned piece stays on its pin ray,
+        # a single check must be captured or blocked (None = anywhere)
+        allowed = pins.get((row, col))
+        if checkers:
+            allowed = block if allowed is None else allowed & block
+
+        if isinstance(piece, Pawn):
+            # promotion on the last rank
+            promotion = PROMOTE_QUEEN if row + piece.dir in (0, ROWS - 1) else 0
+
+            # vertical moves, two squares if the pawn has not moved yet
             possible_move_row = row + piece.dir
-            possible_move_cols = [col - 1, col + 1]
-            for possible_move_col in possible_move_cols:
-                if Square.in_range(possible_move_row, possible_move_col):
-                    # Normal capture
-                    if self.squares[possible_move_row][possible_move_col].has_rival_piece(piece.color):
-                        # create squares for the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create new move
-                        move = Move(initial, final)
-                        # check if move doesn't put king in check
-                        if not self.would_be_in_check(piece, move):
-                            # append new valid move
-                            piece.add_move(move)
-                    
-                    # En passant capture
-                    elif (self.en_passant_target and 
-                          possible_move_row == self.en_passant_target.row and 
-                          possible_move_col == self.en_passant_target.col):
-                        # create squares for the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create new move
-                        move = Move(initial, final)
-                        # check if move doesn't put king in check
-                        if not self.would_be_in_check(piece, move):
-                            # append new valid move
-                            piece.add_move(move)
-                        
-        def knight_moves():
-            # 8 possible moves for a knight
-            possible_moves = [
-                (row - 2, col + 1),
-                (row - 1, col + 2),
-                (row + 1, col + 2),
-                (row + 2, col + 1),
-                (row + 2, col - 1),
-                (row + 1, col - 2),
-                (row - 1, col - 2),
-                (row - 2, col - 1),
-            ]
-
-            for possible_move in possible_moves:
-                possible_move_row, possible_move_col = possible_move
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_rival(piece.color):
-                        # create squares for the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create new move
-                        move = Move(initial, final)
-                        # check if move doesn't put king in check
-                        if not self.would_be_in_check(piece, move):
-                            # append new valid move
-                            piece.add_move(move)
-
-        def straightline_moves(incrs):
+            if 0 <= possible_move_row < ROWS and squares[possible_move_row][col].piece is None:
+                if allowed is None or (possible_move_row, col) in allowed:
+                    code = sq | (possible_move_row * COLS + col) << 6
+                    codes.append(code | promotion if promotion else ROUTES[code])
+                possible_move_row += piece.dir
+                if (not piece.moved and 0 <= possible_move_row < ROWS and
+                        squares[possible_move_row][col].piece is None and
+                        (allowed is None or (possible_move_row, col) in allowed)):
+                    codes.append(sq | (possible_move_row * COLS + col) << 6 | DOUBLE_PUSH)
+
+            # diagonal moves
+            target = self.en_passant_target
+            for pos in PAWN_TARGETS[color][sq]:
+                possible_move_row, possible_move_col = pos
+                rival = squares[possible_move_row][possible_move_col].piece
+                # normal capture
+                if rival is not None:
+                    if rival.color != color and (allowed is None or pos in allowed):
+                        codes.append(sq | (possible_move_row * COLS + possible_move_col) << 6 | CAPTURE | promotion)
+
+                # en passant capture
+                elif target and possible_move_row == target.row and possible_move_col == target.col:
+                    code = sq | (possible_move_row * COLS + possible_move_col) << 6 | CAPTURE | EN_PASSANT
+                    # en passant removes two pieces from the capturing rank,
+                    # so it is the one move still tried on the board
+                    if not self.would_be_in_check(piece, Move.from_code(code)):
+                        codes.append(code)
+
+        elif isinstance(piece, Knight):
+            # up to 8 possible moves for a knight, looked up per square
+            for pos in KNIGHT_TARGETS[sq]:
+                possible_move_row, possible_move_col = pos
+                rival = squares[possible_move_row][possible_move_col].piece
+                if (rival is None or rival.color != color) and (allowed is None or pos in allowed):
+                    code = sq | (possible_move_row * COLS + possible_move_col) << 6
+                    codes.append(ROUTES[code] if rival is None else code | CAPTURE)
+
+        elif isinstance(piece, King):
+            # normal moves to the adjacent squares
+            enemy_attacks = self.attacks['black' if color == 'white' else 'white']
+            for pos in KING_TARGETS[sq]:
+                possible_move_row, possible_move_col = pos
+                rival = squares[possible_move_row][possible_move_col].piece
+                if rival is None or rival.color != color:
+                    # check the king is not attacked there: the attack map, and when in check
+                    # a scan looking through the king's current square (a checking slider's ray
+                    # runs on behind the king once it steps away)
+                    if enemy_attacks[possible_move_row * COLS + possible_move_col]:
+                        continue
+                    if not checkers or not self._attacked(possible_move_row, possible_move_col, color, ignore=(row, col)):
+                        code = sq | (possible_move_row * COLS + possible_move_col) << 6
+                        codes.append(ROUTES[code] if rival is None else code | CAPTURE)
+
+            # castling moves
+            if not piece.moved and not checkers:
+                # queen castling (long castling): b, c and d empty, king does not pass an attacked square
+                left_rook = squares[row][0].piece
+                if (isinstance(left_rook, Rook) and not left_rook.moved and
+                        all(squares[row][c].piece is None for c in range(1, 4)) and
+                        not any(self.square_under_attack(row, c, color) for c in range(4, 1, -1))):
+                    codes.append(sq | (row * COLS + 2) << 6 | CASTLING)
+
+                # king castling (short castling): f and g empty and not attacked
+                right_rook = squares[row][7].piece
+                if (isinstance(right_rook, Rook) and not right_rook.moved and
+                        all(squares[row][c].piece is None for c in range(5, 7)) and
+                        not any(self.square_under_attack(row, c, color) for c in range(4, 7))):
+                    codes.append(sq | (row * COLS + 6) << 6 | CASTLING)
+
+        else:
+            # sliders: bishops along the diagonals, rooks straight, queens both
+            if isinstance(piece, Bishop):
+                incrs = DIAGONAL_INCRS
+            elif isinstance(piece, Rook):
+                incrs = STRAIGHT_INCRS
+            else:
+                incrs = KING_INCRS
             for incr in incrs:
-                row_incr, col_incr = incr
-                possible_move_row = row + row_incr
-                possible_move_col = col + col_incr
-
-                while True:
-                    if Square.in_range(possible_move_row, possible_move_col):
-                        # create squares for the possible new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create a possible new move
-                        move = Move(initial, final)
-
-                        # empty = continue
-                        if self.squares[possible_move_row][possible_move_col].isempty():
-                            # check if move doesn't put king in check
-                            if not self.would_be_in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-
-                        # has rival piece = add move (can capture) + break
-                        if self.squares[possible_move_row][possible_move_col].has_rival_piece(piece.color):
-                            # check if move doesn't put king in check
-                            if not self.would_be_in_check(piece, move):
-                                # append new move
-                                piece.add_move(move)
-                            break
+                # squares along the ray, nearest first
+                for pos in RAYS[incr][sq]:
+                    possible_move_row, possible_move_col = pos
+                    rival = squares[possible_move_row][possible_move_col].piece
 
-                        # has team piece = break
-                        if self.squares[possible_move_row][possible_move_col].has_team_piece(piece.color):
-                            break
-                    
-                    # not in range
-                    else:
+                    # has team piece = break
+                    if rival is not None and rival.color == color:
                         break
 
-                    # incrementing incrs
-                    possible_move_row = possible_move_row + row_incr
-                    possible_move_col = possible_move_col + col_incr
-
-        def king_moves():
-            adjs = [
-                (row - 1, col + 1), # upper right
-                (row - 1, col - 1), # upper left
-                (row + 1, col + 1), # lower right
-                (row + 1, col - 1), # lower left
-                (row - 1, col + 0), # up
-                (row + 0, col + 1), # right
-                (row + 1, col + 0), # down
-                (row + 0, col - 1), # left
-            ]
-
-            # normal moves
-            for adj in adjs:
-                possible_move_row, possible_move_col = adj
-
-                if Square.in_range(possible_move_row, possible_move_col):
-                    if self.squares[possible_move_row][possible_move_col].isempty_or_rival(piece.color):
-                        # create squares for the new move
-                        initial = Square(row, col)
-                        final = Square(possible_move_row, possible_move_col)
-                        # create new move
-                        move = Move(initial, final)
-                        # check if move doesn't put king in check
-                        if not self.would_be_in_check(piece, move):
-                            # append new valid move
-                            piece.add_move(move)
+                    # empty = continue, has rival piece = add move (can capture) + break
+                    if allowed is None or pos in allowed:
+                        code = sq | (possible_move_row * COLS + possible_move_col) << 6
+                        codes.append(ROUTES[code] if rival is None else code | CAPTURE)
 
-            # castling moves
-            if not piece.moved and not self.in_check(piece.color):
-                # queen castling (long castling)
-                left_rook = self.squares[row][0].piece
-                if isinstance(left_rook, Rook) and not left_rook.moved:
-                    # check if squares between king and rook are empty
-                    can_castle = True
-                    for c in range(1, 4):
-                        if self.squares[row][c].has_piece():
-                            can_castle = False
-                            break
-                    
-                    if can_castle:
-                        # Check if king and squares it passes through are not under attack
-                        squares_safe = True
-                        for c in range(4, 2, -1):  # Check e1->d1->c1 or e8->d8->c8
-                            if self.square_under_attack(row, c, piece.color):
-                                squares_safe = False
-                                break
-                        
-                        if squares_safe:
-                            # create castling move
-                            initial = Square(row, col)
-                            final = Square(row, 2)  # king moves to c1/c8
-                            move = Move(initial, final)
-                            piece.add_move(move)
-
-                # king castling (short castling)
-                right_rook = self.squares[row][7].piece
-                if isinstance(right_rook, Rook) and not right_rook.moved:
-                    # check if squares between king and rook are empty
-                    can_castle = True
-                    for c in range(5, 7):
-                        if self.squares[row][c].has_piece():
-                            can_castle = False
+                    if rival is not None:
+                        break
+
+    def _piece_changed(self, square, old, new):
+        '''
+            Called by a board square whenever its piece is replaced,
+            keeps the position hash, piece lists (and subclass state) in sync
+        '''
+        pos = (square.row, square.col)
+        if old is not None:
+            self.hash ^= piece_key(old, square.row, square.col)
+            self.piece_squares[old.color].pop(pos, None)
+            if isinstance(old, King) and self.king_squares[old.color] == pos:
+                self.king_squares[old.color] = None
+        if new is not None:
+            self.hash ^= piece_key(new, square.row, square.col)
+            self.piece_squares[new.color][pos] = new
+            if isinstance(new, King):
+                self.king_squares[new.color] = pos
+        self._update_attacks(square.row * COLS + square.col, old, new)
+
+    def _place(self, row, col, piece):
+        """Put piece on (row, col) for a bulk load: square, mailbox and piece list, _rebuild does the rest"""
+        self.squares[row][col].place(piece)
+        self.mailbox[row * COLS + col] = piece
+        self.piece_squares[piece.color][row, col] = piece
+
+    def _rebuild(self):
+        '''
+            Rebuild the state derived from the piece lists in one pass - king squares, castling
+            rights and hash - after pieces were placed with _place instead of going through
+            _piece_changed one at a time. The attack maps are left to their first use.
+        '''
+        key = 0
+        for color, pieces in self.piece_squares.items():
+            for pos, piece in pieces.items():
+                if piece.kind is King:
+                    self.king_squares[color] = pos
+                key ^= PIECE_KEYS[piece.name, color][pos[0] * COLS + pos[1]]
+        self._attacks = None
+        self._attack_sets = None
+
+        # the rest of the key as hash_board computes it
+        self.castling_rights = castling_rights(self)
+        if self.next_player == 'black':
+            key ^= SIDE_KEY
+        key ^= CASTLING_KEYS[self.castling_rights]
+        if self._en_passant_target is not None:
+            key ^= EN_PASSANT_KEYS[self._en_passant_target.col]
+        self.hash = key
+
+    @property
+    def attacks(self):
+        """{color: [number of pieces of color attacking each square index]}, built on first use"""
+        if self._attacks is None:
+            self._build_attacks()
+        return self._attacks
+
+    @property
+    def attack_sets(self):
+        """Square indexes attacked by the piece on each square index, built on first use"""
+        if self._attack_sets is None:
+            self._build_attacks()
+        return self._attack_sets
+
+    def _build_attacks(self):
+        # only once every piece is on its square, so the sliders stop at their blockers
+        attacks = {'white': [0] * (ROWS * COLS), 'black': [0] * (ROWS * COLS)}
+        attack_sets = [()] * (ROWS * COLS)
+        for sq, piece in enumerate(self.mailbox):
+            if piece is not None:
+                counts = attacks[piece.color]
+                targets = self._piece_attacks(sq, piece)
+                for target in targets:
+                    counts[target] += 1
+                attack_sets[sq] = targets
+        self._attacks = attacks
+        self._attack_sets = attack_sets
+
+    def _update_attacks(self, sq, old, new):
+        '''
+            Keep the attack maps in step with a piece change on square index sq: the old piece's
+            attacks are taken off, the new piece's put on, and when sq turns empty or occupied
+            the sliders whose rays reach sq are recomputed (their rays now run on past sq or
+            stop at it). Nothing else on the board can change what it attacks.
+        '''
+        mailbox = self.mailbox
+        if self._attacks is None:
+            # no maps yet: they are built from the mailbox when first asked for
+            mailbox[sq] = new
+            return
+        if old is not None:
+            counts = self._attacks[old.color]
+            for target in self._attack_sets[sq]:
+                counts[target] -= 1
+            self._attack_sets[sq] = ()
+        mailbox[sq] = new
+
+        if (old is None) != (new is None):
+            for incrs, sliders in ((STRAIGHT_INCRS, (Rook, Queen)), (DIAGONAL_INCRS, (Bishop, Queen))):
+                for incr in incrs:
+                    for target in RAY_SQUARES[incr][sq]:
+                        piece = mailbox[target]
+                        if piece is not None:
+                            if isinstance(piece, sliders):
+                                self._set_attacks(target, piece)
                             break
-                    
-                    if can_castle:
-                        # Check if king and squares it passes through are not under attack
-                        squares_safe = True
-                        for c in range(4, 7):  # Check e1->f1->g1 or e8->f8->g8
-                            if self.square_under_attack(row, c, piece.color):
-                                squares_safe = False
-                                break
-                        
-                        if squares_safe:
-                            # create castling move
-                            initial = Square(row, col)
-                            final = Square(row, 6)  # king moves to g1/g8
-                            move = Move(initial, final)
-                            piece.add_move(move)
-                    
-        if isinstance(piece, Pawn): 
-            pawn_moves()
-
-        elif isinstance(piece, Knight): 
-            knight_moves()
-
-        elif isinstance(piece, Bishop): 
-            straightline_moves([
-                (-1, 1), # upper right
-                (-1, -1), # upper left
-                (1, 1), # lower right
-                (1, -1), # lower left
-            ])
-
-        elif isinstance(piece, Rook): 
-            straightline_moves([
-                (-1, 0), # up
-                (0, 1), # right
-                (1, 0), # down
-                (0, -1), # left
-            ])
-
-        elif isinstance(piece, Queen): 
-            straightline_moves([
-                (-1, 1), # upper right
-                (-1, -1), # upper left
-                (1, 1), # lower right
-                (1, -1), # lower left
-                (-1, 0), # up
-                (0, 1), # right
-                (1, 0), # down
-                (0, -1), # left
-            ])
 
-        elif isinstance(piece, King):
-            king_moves()
+        if new is not None:
+            self._set_attacks(sq, new)
+
+    def _set_attacks(self, sq, piece):
+        """Replace the attacks of the piece on square index sq in the attack maps"""
+        counts = self._attacks[piece.color]
+        attack_sets = self._attack_sets
+        for target in attack_sets[sq]:
+            counts[target] -= 1
+        targets = self._piece_attacks(sq, piece)
+        for target in targets:
+            counts[target] += 1
+        attack_sets[sq] = targets
+
+    def _piece_attacks(self, sq, piece):
+        """Square indexes attacked by piece standing on square index sq (own pieces included)"""
+        if isinstance(piece, Pawn):
+            return PAWN_SQUARES[piece.color][sq]
+        if isinstance(piece, Knight):
+            return KNIGHT_SQUARES[sq]
+        if isinstance(piece, King):
+            return KING_SQUARES[sq]
+        if isinstance(piece, Bishop):
+            incrs = DIAGONAL_INCRS
+        elif isinstance(piece, Rook):
+            incrs = STRAIGHT_INCRS
+        else:
+            incrs = KING_INCRS
+        mailbox = self.mailbox
+        targets = []
+        for incr in incrs:
+            for target in RAY_SQUARES[incr][sq]:
+                targets.append(target)
+                if mailbox[target] is not None:
+                    break
+        return tuple(targets)
+
+    def recompute_attacks(self):
+        """Attack maps built from scratch: {color: [count per square index]}"""
+        attacks = {'white': [0] * (ROWS * COLS), 'black': [0] * (ROWS * COLS)}
+        for sq, piece in enumerate(self.mailbox):
+            if piece is not None:
+                counts = attacks[piece.color]
+                for target in self._piece_attacks(sq, piece):
+                    counts[target] += 1
+        return attacks
+
+    def pieces(self, color):
+        """List of ((row, col), piece) for every piece of color"""
+        return list(self.piece_squares[color].items())
 
     # creates squares for entire board
     def _create(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                self.squares[row][col] = Square(row, col)
+        self.squares = [[Square(row, col, None, self) for col in range(COLS)] for row in range(ROWS)]
 
     # add pieces to the game board
     def _add_pieces(self, color):
@@ -566,22 +881,22 @@ class Board:
 
         # pawns
         for col in range(COLS):
-            self.squares[row_pawn][col] = Square(row_pawn, col, Pawn(color))
+            self._place(row_pawn, col, Pawn(color))
 
         # knights
-        self.squares[row_other][1] = Square(row_other, 1, Knight(color))
-        self.squares[row_other][6] = Square(row_other, 6, Knight(color))
+        self._place(row_other, 1, Knight(color))
+        self._place(row_other, 6, Knight(color))
 
         # bishops
-        self.squares[row_other][2] = Square(row_other, 2, Bishop(color))
-        self.squares[row_other][5] = Square(row_other, 5, Bishop(color))
+        self._place(row_other, 2, Bishop(color))
+        self._place(row_other, 5, Bishop(color))
 
         # rooks
-        self.squares[row_other][0] = Square(row_other, 0, Rook(color))
-        self.squares[row_other][7] = Square(row_other, 7, Rook(color))
+        self._place(row_other, 0, Rook(color))
+        self._place(row_other, 7, Rook(color))
 
         # queen
-        self.squares[row_other][3] = Square(row_other, 3, Queen(color))
+        self._place(row_other, 3, Queen(color))
 
         # king
-        self.squares[row_other][4] = Square(row_other, 4, King(color))
\ No newline at end of file
+        self._place(row_other, 4, King(color))
\ No newline at end of file
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+from move import Move, ROUTE_MASK
+
+class PositionInfo:
+
+    __slots__ = ('codes', 'in_check', 'status', '_moves', '_routes', '_by_origin')
+
+    # everything the UI and game-over logic ask about one side in one position;
+    # the legal moves are kept as move codes, Move views and the route set are built on first use
+    def __init__(self, codes, in_check):
+        self.codes = codes
+        self.in_check = in_check
+        self._moves = None
+        self._routes = None
+        self._by_origin = None
+        if codes:
+            self.status = None
+        else:
+            self.status = 'checkmate' if in_check else 'stalemate'
+
+    @property
+    def moves(self):
+        if self._moves is None:
+            self._moves = [Move.from_code(code) for code in self.codes]
+        return self._moves
+
+    def build_move_table(self):
+        """Group the legal moves by origin square index (row * 8 + col) in one pass, once"""
+        if self._by_origin is None:
+            table = {}
+            for code, move in zip(self.codes, self.moves):
+                origin = code & 63
+                if origin in table:
+                    table[origin].append(move)
+                else:
+                    table[origin] = [move]
+            self._by_origin = table
+        return self._by_origin
+
+    @property
+    def by_origin(self):
+        """Legal moves grouped by origin square index, built on first use"""
+        return self.build_move_table()
+
+    def moves_from(self, row, col):
+        """Legal moves of the piece on (row, col) - a lookup in by_origin"""
+        return self.by_origin.get(row * 8 + col, ())
+
+    def is_legal(self, move):
+        """Constant-time membership test of a Move (or move code) in the legal moves"""
+        if self._routes is None:
+            # one bit per route: a fraction of the memory of a set of ints
+            routes = 0
+            for code in self.codes:
+                routes |= 1 << (code & ROUTE_MASK)
+            self._routes = routes
+        code = move if isinstance(move, int) else move.code
+        return self._routes >> (code & ROUTE_MASK) & 1 == 1
+
+class PositionCache:
+
+    '''
+        Bounded LRU cache of PositionInfo keyed by (position hash, color)
+    '''
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        info = self.entries.get(key)
+        if info is None:
+            self.misses += 1
+            return None
+        # mark as most recently used
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return info
+
+    def put(self, key, info):
+        self.entries[key] = info
+        self.entries.move_to_end(key)
+        # evict the least recently used entry
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
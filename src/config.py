@@ -4,8 +4,15 @@ import os
 from sound import Sound
 from theme import Theme
 
+# piece image sizes in assets/images: board squares and the dragged piece
+TEXTURE_SIZES = (80, 128)
+PIECE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+
 class Config:
 
+    # (color, name, size) -> surface, shared by every Config so a reset never reloads from disk
+    textures = {}
+
     def __init__(self):
         self.themes = []
         self._add_themes()
@@ -20,12 +27,39 @@ class Config:
         self.capture_sound = Sound(
             os.path.join('assets/sounds/capture.wav')
         )
+        # piece images
+        self._load_textures()
 
     def change_theme(self):
         self.index += 1
         self.index %= len(self.themes)
         self.theme = self.themes[self.index]
 
+    def get_texture(self, piece, size=80):
+        """Shared surface of the piece image at the given size"""
+        key = (piece.color, piece.name, size)
+        texture = self.textures.get(key)
+        if texture is None:
+            texture = self._load_texture(*key)
+        return texture
+
+    def _load_textures(self):
+        for color in ('white', 'black'):
+            for name in PIECE_NAMES:
+                for size in TEXTURE_SIZES:
+                    if (color, name, size) not in self.textures:
+                        self._load_texture(color, name, size)
+
+    def _load_texture(self, color, name, size):
+        texture = pygame.image.load(
+            os.path.join(f'assets/images/imgs-{size}px/{color}_{name}.png')
+        )
+        # match the display pixel format once instead of converting on every blit
+        if pygame.display.get_surface() is not None:
+            texture = texture.convert_alpha()
+        self.textures[(color, name, size)] = texture
+        return texture
+
     def _add_themes(self):
         green = Theme((234, 235, 200), (119, 154, 88), (244, 247, 116), (172, 195, 51), '#C86464', '#C84646')
         brown = Theme((235, 209, 166), (165, 117, 80), (245, 234, 100), (209, 185, 59), '#C86464', '#C84646')
@@ -7,3 +7,9 @@ COLS = 8
 ROWS = 8
 SQSIZE = WIDTH // COLS
 
+# Frame cap while input is arriving
+FPS = 60
+
+# Engine thinking time per move and per hint
+ENGINE_TIME_MS = 1000
+HINT_TIME_MS = 500
@@ -1,11 +1,12 @@
-import pygame
-
 from const import *
 
 class Dragger:
 
-    def __init__(self):
+    def __init__(self, config):
+        self.config = config
         self.piece = None
+        # legal moves of the dragged piece, highlighted while dragging
+        self.moves = ()
         self.dragging = False
         self.mouseX = 0
         self.mouseY = 0
@@ -15,16 +16,12 @@ class Dragger:
     # blit method
     def update_blit(self, surface):
         # make moving piece size bigger
-        self.piece.set_texture(size=128)
-        texture = self.piece.texture
-
-        # image
-        img = pygame.image.load(texture)
+        img = self.config.get_texture(self.piece, size=128)
         # rect
         img_center = (self.mouseX, self.mouseY)
-        self.piece.texture_rect = img.get_rect(center=img_center)
+        texture_rect = img.get_rect(center=img_center)
         # blit
-        surface.blit(img, self.piece.texture_rect)
+        surface.blit(img, texture_rect)
 
     # other methods    
 
@@ -42,10 +39,12 @@ class Dragger:
         self.initial_row = row
         self.initial_col = col
 
-    def drag_piece(self, piece):
+    def drag_piece(self, piece, moves=()):
         self.piece = piece
+        self.moves = moves
         self.dragging = True
 
     def undrag_piece(self):
         self.piece = None
+        self.moves = ()
         self.dragging = False
\ No newline at end of file
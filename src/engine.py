@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Engine - computer opponent search
+Negamax alpha-beta with iterative deepening, a transposition table, MVV-LVA and killer move
+ordering and a quiescence search over captures, bounded by a time budget in milliseconds.
+
+Usage:
+    python src/engine.py                                 # search the start position for 1s
+    python src/engine.py --fen "<fen>" --time-ms 5000 --depth 8
+"""
+
+import sys
+import time
+import argparse
+
+from const import *
+from piece import *
+from board import Board, START_FEN
+from bitboard import BitBoard
+from perft import move_name
+
+# score of a mate at the root, mates further away score less
+MATE = 1000000
+INFINITY = MATE + 1
+MAX_PLY = 64
+
+# transposition table bound types
+EXACT, LOWER, UPPER = range(3)
+
+# how many nodes between clock (and stop()) checks, a few milliseconds of search
+CHECK_INTERVAL = 32
+
+class TTEntry:
+
+    def __init__(self, key, depth, score, bound, move, generation):
+        self.key = key
+        self.depth = depth
+        self.score = score
+        self.bound = bound
+        self.move = move
+        self.generation = generation
+
+class TranspositionTable:
+
+    '''
+        Fixed-size table of search results indexed by the low bits of the position hash.
+        A slot is replaced when it holds a result from an earlier search, or one searched
+        no deeper than the new result (depth-preferred with aging).
+    '''
+
+    def __init__(self, size=1 << 18):
+        # round down to a power of two so the index is a mask
+        self.size = 1 << (size.bit_length() - 1)
+        self.mask = self.size - 1
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def get(self, key):
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def put(self, key, depth, score, bound, move):
+        index = key & self.mask
+        entry = self.slots[index]
+        if (entry is None or entry.key == key or entry.generation != self.generation or
+                depth >= entry.depth):
+            # keep the old best move when the new result has none
+            if move is None and entry is not None and entry.key == key:
+                move = entry.move
+            self.slots[index] = TTEntry(key, depth, score, bound, move, self.generation)
+
+    def clear(self):
+        self.slots = [None] * self.size
+
+class SearchResult:
+
+    # outcome of one iterative deepening iteration
+    def __init__(self, move, score, depth, nodes, elapsed):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.nps = int(nodes / elapsed) if elapsed > 0 else 0
+
+    def __str__(self):
+        return (f'depth {self.depth} score {self.score} nodes {self.nodes} '
+                f'nps {self.nps} time {int(self.elapsed * 1000)}ms move {self.move}')
+
+def evaluate(board, color):
+    """Material balance from the side to move's point of view, using Piece.value"""
+    score = 0
+    for side in ('white', 'black'):
+        for _, piece in board.pieces(side):
+            score += piece.value
+    # kings cancel out, values are signed white positive
+    return score if color == 'white' else -score
+
+def move_key(move):
+    return (move.initial.row, move.initial.col, move.final.row, move.final.col)
+
+class Engine:
+
+    '''
+        Searches a Board for the best move of the side to move.
+        The board is searched in place with make_move/unmake_move and is left as it was found.
+    '''
+
+    def __init__(self, tt_size=1 << 18):
+        self.tt = TranspositionTable(tt_size)
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.nodes = 0
+        self.deadline = None
+        self.stop = None
+        self.root_moves = None
+        self.window = (-INFINITY, INFINITY)
+        self.next_check = 0
+        self.stopped = False
+        self.first_move_pending = False
+
+    def search(self, board, color, time_ms=1000, max_depth=MAX_PLY, info=None, stop=None, root_moves=None,
+               alpha=-INFINITY, beta=INFINITY):
+        '''
+            Iteratively deepen until the time budget or max_depth runs out, or until
+            stop() (polled with the clock) returns True. Returns the SearchResult of the
+            deepest completed iteration (None when color has no legal move); info,
+            if given, is called with each one. root_moves restricts the moves searched
+            at the root to a subset of the legal moves. alpha and beta narrow the root
+            window: a score at or below alpha is only an upper bound, one at or above
+            beta only a lower bound.
+        '''
+        self.stop = stop
+        self.root_moves = root_moves
+        self.window = (alpha, beta)
+        self.tt.new_search()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.nodes = 0
+        self.next_check = 0
+        self.stopped = False
+        # there is always a move to return: the clock is not read until one root move has a score
+        self.first_move_pending = True
+        start = time.perf_counter()
+        self.deadline = start + time_ms / 1000
+
+        moves = board.position_info(color).moves if root_moves is None else root_moves
+        if not moves:
+            return None
+
+        result = None
+        for depth in range(1, min(max_depth, MAX_PLY) + 1):
+            score, move = self._root(board, color, depth)
+            if self.stopped and result is not None:
+                break
+            result = SearchResult(move, score, depth, self.nodes, time.perf_counter() - start)
+            if info is not None:
+                info(result)
+            # a forced mate will not get any better
+            if self.stopped or abs(score) >= MATE - MAX_PLY:
+                break
+        return result
+
+    def _root(self, board, color, depth):
+        alpha, beta = self.window
+        best_move = None
+        rival = 'black' if color == 'white' else 'white'
+        entry = self.tt.get(board.hash)
+        tt_move = entry.move if entry is not None else None
+
+        moves = board.position_info(color).moves if self.root_moves is None else self.root_moves
+        for move in self._ordered(board, moves, tt_move, 0):
+            board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+            score = -self._negamax(board, rival, depth - 1, -beta, -alpha, 1)
+            board.unmake_move()
+            if self.stopped:
+                break
+            if best_move is None or score > alpha:
+                alpha = score
+                best_move = move
+            if self.first_move_pending:
+                # the first move of the first iteration was searched without the clock: read it now
+                self.first_move_pending = False
+                self.next_check = self.nodes
+
+        # a result over a subset of the root moves or in a narrowed window says nothing about the position
+        if best_move is not None and self.root_moves is None and self.window == (-INFINITY, INFINITY):
+            self.tt.put(board.hash, depth, alpha, EXACT, move_key(best_move))
+        return alpha, best_move
+
+    def _negamax(self, board, color, depth, alpha, beta, ply):
+        if self._out_of_time():
+            return 0
+        if depth <= 0:
+            return self._quiescence(board, color, alpha, beta, ply)
+        self.nodes += 1
+
+        key = board.hash
+        original_alpha = alpha
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                score = self._score_from_tt(entry.score, ply)
+                if entry.bound == EXACT:
+                    return score
+                if entry.bound == LOWER and score >= beta:
+                    return score
+                if entry.bound == UPPER and score <= alpha:
+                    return score
+
+        info = board.position_info(color)
+        if not info.moves:
+            # checkmated (prefer the quickest mate) or stalemated
+            return -MATE + ply if info.in_check else 0
+
+        rival = 'black' if color == 'white' else 'white'
+        best_score = -INFINITY
+        best_move = None
+        for move in self._ordered(board, info.moves, tt_move, ply):
+            captures = self._is_capture(board, move)
+            board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+            score = -self._negamax(board, rival, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                # quiet moves that cut off are tried early in sibling nodes
+                if not captures:
+                    self._add_killer(move_key(move), ply)
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.put(key, depth, self._score_to_tt(best_score, ply), bound, move_key(best_move))
+        return best_score
+
+    def _quiescence(self, board, color, alpha, beta, ply):
+        """Search captures only until the position is quiet, so the evaluation is not taken mid-exchange"""
+        if self._out_of_time():
+            return 0
+        self.nodes += 1
+        stand_pat = evaluate(board, color)
+        if stand_pat >= beta or ply >= MAX_PLY - 1:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        captures = [move for move in board.position_info(color).moves if self._is_capture(board, move)]
+        rival = 'black' if color == 'white' else 'white'
+        for move in sorted(captures, key=lambda move: -self._mvv_lva(board, move)):
+            board.make_move(board.squares[move.initial.row][move.initial.col].piece, move)
+            score = -self._quiescence(board, rival, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if self.stopped:
+                return 0
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    # move ordering
+
+    def _ordered(self, board, moves, tt_move, ply):
+        """Transposition table move, then captures by MVV-LVA, then killers, then the rest"""
+        killers = self.killers[ply]
+
+        def priority(move):
+            key = move_key(move)
+            if key == tt_move:
+                return 0
+            if self._is_capture(board, move):
+                return 1 - self._mvv_lva(board, move)
+            if key == killers[0]:
+                return 2
+            if key == killers[1]:
+                return 3
+            return 4
+
+        return sorted(moves, key=priority)
+
+    def _is_capture(self, board, move):
+        if board.squares[move.final.row][move.final.col].piece is not None:
+            return True
+        # en passant
+        target = board.en_passant_target
+        piece = board.squares[move.initial.row][move.initial.col].piece
+        return (isinstance(piece, Pawn) and target is not None and move.initial.col != move.final.col and
+                move.final.row == target.row and move.final.col == target.col)
+
+    def _mvv_lva(self, board, move):
+        """Most valuable victim, least valuable attacker, scaled into (0, 1)"""
+        victim = board.squares[move.final.row][move.final.col].piece
+        attacker = board.squares[move.initial.row][move.initial.col].piece
+        victim_value = abs(victim.value) if victim is not None else 1.0
+        return (victim_value * 10 - min(abs(attacker.value), 10)) / 100
+
+    def _add_killer(self, key, ply):
+        killers = self.killers[ply]
+        if killers[0] != key:
+            killers[1] = killers[0]
+            killers[0] = key
+
+    # helpers
+
+    def _out_of_time(self):
+        if self.stopped:
+            return True
+        if self.first_move_pending:
+            return False
+        if self.nodes >= self.next_check:
+            self.next_check = self.nodes + CHECK_INTERVAL
+            self.stopped = (time.perf_counter() >= self.deadline or
+                            (self.stop is not None and self.stop()))
+        return self.stopped
+
+    def _score_to_tt(self, score, ply):
+        # mate scores are stored relative to the node, not the root
+        if score >= MATE - MAX_PLY:
+            return score + ply
+        if score <= -MATE + MAX_PLY:
+            return score - ply
+        return score
+
+    def _score_from_tt(self, score, ply):
+        if score >= MATE - MAX_PLY:
+            return score - ply
+        if score <= -MATE + MAX_PLY:
+            return score + ply
+        return score
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search a position for the best move')
+    parser.add_argument('--fen', default=START_FEN)
+    parser.add_argument('--time-ms', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=MAX_PLY)
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard engine')
+    args = parser.parse_args(argv)
+
+    board = (BitBoard if args.bitboard else Board).from_fen(args.fen)
+    color = board.next_player
+    engine = Engine()
+
+    def report(result):
+        print(f"depth {result.depth:2d}  score {result.score:8.3f}  nodes {result.nodes:8d}  "
+              f"nps {result.nps:7d}  time {int(result.elapsed * 1000):6d}ms  {move_name(result.move)}")
+
+    result = engine.search(board, color, args.time_ms, args.depth, report)
+    if result is None:
+        print("no legal moves")
+        return 1
+    print(f"bestmove {move_name(result.move)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
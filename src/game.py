@@ -1,205 +1,68 @@
-import pygame
-
 from const import *
 from board import Board
+from bitboard import BitBoard
 from square import Square
-from dragger import Dragger
-from config import Config
 from piece import King, Queen, Rook, Bishop, Knight, Pawn
 
 class Game:
 
-    def __init__(self):
-        self.next_player = 'white'
+    def __init__(self, bitboard=False, fen=None):
         self.hovered_square = None
-        self.board = Board()
-        self.dragger = Dragger()
-        self.config = Config()
+        # bitboard=True switches the rules queries to the bitboard engine
+        self.bitboard = bitboard
+        self.board = BitBoard(fen) if bitboard else Board(fen)
+        self.next_player = self.board.next_player
+        # presentation (images, sounds, fonts, dragging) is attached on first use,
+        # so a game without a display never imports pygame
+        self._config = None
+        self._dragger = None
         self.game_over = False
         self.winner = None
         self.move_history = []
-        self.move_count = 1
+        self.move_count = self.board.fullmove_number
         self.board_flipped = False
         self.show_popup = False
         self.popup_rect = None
         self.new_game_button_rect = None
+        # color played by the computer (None for player vs player) and the last hint move
+        self.computer = None
+        self.hint = None
         
         # Check for checkmate at the start (in case we're loading a checkmate position)
         self.check_game_over()
 
-    # Show board methods (blit methods)
-
-    def show_bg(self, surface):
-        theme = self.config.theme
-
-        for row in range(ROWS):
-            for col in range(COLS):
-                # Calculate display coordinates (flipped if board is flipped)
-                if self.board_flipped:
-                    display_row = ROWS - 1 - row
-                    display_col = COLS - 1 - col
-                else:
-                    display_row = row
-                    display_col = col
-                
-                # color
-                color = theme.bg.light if (row + col) % 2 == 0 else theme.bg.dark
-                # rect
-                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
-                # blit
-                pygame.draw.rect(surface, color, rect)
-
-                # row coordinates
-                if col == 0:
-                    # color
-                    color = theme.bg.dark if row % 2 == 0 else theme.bg.light
-                    # label
-                    lbl = self.config.font.render(str(ROWS - row), 1, color)
-                    lbl_pos = (5, 5 + display_row * SQSIZE)
-                    # blit
-                    surface.blit(lbl, lbl_pos)
-
-                # col coordinates
-                if row == 7:
-                    # color
-                    color = theme.bg.dark if (row + col) % 2 == 0 else theme.bg.light
-                    # label
-                    lbl = self.config.font.render(Square.get_alphacol(col), 1, color)
-                    lbl_pos = (display_col * SQSIZE + SQSIZE - 20, HEIGHT - 20)
-                    # blit
-                    surface.blit(lbl, lbl_pos)
-
-    def show_pieces(self, surface):
-        for row in range(ROWS):
-            for col in range(COLS):
-                # check if piece belongs on square
-                if self.board.squares[row][col].has_piece():
-                    # gets piece at that position and stores in a variable
-                    piece = self.board.squares[row][col].piece
+    @classmethod
+    def from_fen(cls, fen, bitboard=False):
+        """Game continuing from the position of a FEN string"""
+        return cls(bitboard, fen)
 
-                    # show all pieces except piece being dragged
-                    if piece is not self.dragger.piece:
-                        # keeps piece at size 80 
-                        piece.set_texture(size=80)
-                        # stores the image of that piece in a variable
-                        img = pygame.image.load(piece.texture)
-                        
-                        # Calculate display coordinates (flipped if board is flipped)
-                        if self.board_flipped:
-                            display_row = ROWS - 1 - row
-                            display_col = COLS - 1 - col
-                        else:
-                            display_row = row
-                            display_col = col
-                        
-                        img_center = display_col * SQSIZE + SQSIZE // 2, display_row * SQSIZE + SQSIZE // 2
-                        # centers the piece
-                        piece.texture_rect = img.get_rect(center=img_center)
-                        # tells pygame to display centered image
-                        surface.blit(img, piece.texture_rect)
+    # presentation
 
-    def show_moves(self, surface):
-        theme = self.config.theme
+    @property
+    def config(self):
+        if self._config is None:
+            from config import Config
+            self._config = Config()
+        return self._config
 
-        if self.dragger.dragging:
-            piece = self.dragger.piece
-
-            # loop through all valid moves
-            for move in piece.moves:
-                # Calculate display coordinates (flipped if board is flipped)
-                if self.board_flipped:
-                    display_row = ROWS - 1 - move.final.row
-                    display_col = COLS - 1 - move.final.col
-                else:
-                    display_row = move.final.row
-                    display_col = move.final.col
-                
-                # color
-                color = theme.moves.light if (move.final.row + move.final.col) % 2 == 0 else theme.moves.dark
-                # rect
-                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
-                # blit
-                pygame.draw.rect(surface, color, rect)
-
-    def show_last_move(self, surface):
-        theme = self.config.theme
-
-        if self.board.last_move:
-            initial = self.board.last_move.initial
-            final = self.board.last_move.final
-
-            for pos in [initial, final]:
-                # Calculate display coordinates (flipped if board is flipped)
-                if self.board_flipped:
-                    display_row = ROWS - 1 - pos.row
-                    display_col = COLS - 1 - pos.col
-                else:
-                    display_row = pos.row
-                    display_col = pos.col
-                
-                # color
-                color = theme.trace.light if (pos.row + pos.col) % 2 == 0 else theme.trace.dark
-                # rect
-                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
-                # blit
-                pygame.draw.rect(surface, color, rect)
-
-    def show_hover(self, surface):
-        if self.hovered_square:
-            # Calculate display coordinates (flipped if board is flipped)
-            if self.board_flipped:
-                display_row = ROWS - 1 - self.hovered_square.row
-                display_col = COLS - 1 - self.hovered_square.col
-            else:
-                display_row = self.hovered_square.row
-                display_col = self.hovered_square.col
-            
-            # color
-            color = (180, 180, 180)
-            # rect
-            rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
-            # blit
-            pygame.draw.rect(surface, color, rect, width=3)
-    
-    def show_check_indicator(self, surface):
-        """Show red border around king if in check"""
-        if not self.game_over:
-            # Check if current player is in check
-            if self.board.in_check(self.next_player):
-                # Find the king
-                for row in range(ROWS):
-                    for col in range(COLS):
-                        square = self.board.squares[row][col]
-                        if (square.has_piece() and 
-                            isinstance(square.piece, King) and 
-                            square.piece.color == self.next_player):
-                            # Calculate display coordinates (flipped if board is flipped)
-                            if self.board_flipped:
-                                display_row = ROWS - 1 - row
-                                display_col = COLS - 1 - col
-                            else:
-                                display_row = row
-                                display_col = col
-                            
-                            # Draw red border around king
-                            color = (255, 0, 0)  # Red
-                            rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
-                            pygame.draw.rect(surface, color, rect, width=3)
-                            return
+    @property
+    def dragger(self):
+        if self._dragger is None:
+            from dragger import Dragger
+            self._dragger = Dragger(self.config)
+        return self._dragger
 
     # other methods
+    def play_move(self, piece, move):
+        """Play a validated move for the side to move and hand the turn over"""
+        captured = self.board.squares[move.final.row][move.final.col].has_piece()
+        self.board.move(piece, move)
+        self.add_move_to_history(piece, move, captured)
+        self.play_sound(captured)
+        self.hint = None
+        self.next_turn()
+
     def next_turn(self):
-        # Check for game over conditions BEFORE switching turns
-        # Check if the player who just moved put the opponent in checkmate
-        if self.board.is_checkmate(self.next_player):
-            self.game_over = True
-            self.winner = 'white' if self.next_player == 'black' else 'black'
-            self.show_popup = True
-        elif self.board.is_stalemate(self.next_player):
-            self.game_over = True
-            self.winner = 'draw'
-            self.show_popup = True
-        
         # Switch turns
         self.next_player = 'white' if self.next_player == 'black' else 'black'
         
@@ -207,31 +70,34 @@ class Game:
         if self.next_player == 'white':
             self.move_count += 1
         
-        # Check for checkmate/stalemate for the new player
+        # Build the legal move table of the new player and check for checkmate/stalemate
         self.check_game_over()
     
     def check_game_over(self):
-        """Check if the current player is in checkmate or stalemate"""
-        if self.board.is_checkmate(self.next_player):
+        '''
+            Check if the current player is in checkmate or stalemate. The legal moves of the
+            position are generated once here, at the start of the turn, and grouped by origin
+            square: picking up a piece and highlighting its moves are then lookups in the table
+        '''
+        info = self.board.position_info(self.next_player)
+        info.build_move_table()
+        status = info.status
+        if status == 'checkmate':
             self.game_over = True
             self.winner = 'white' if self.next_player == 'black' else 'black'
             self.show_popup = True
-        elif self.board.is_stalemate(self.next_player):
+        elif status == 'stalemate':
             self.game_over = True
             self.winner = 'draw'
             self.show_popup = True
     
+    def legal_moves(self, row, col):
+        """Legal moves of the current player's piece on (row, col), looked up in the turn's move table"""
+        return self.board.position_info(self.next_player).moves_from(row, col)
+    
     def has_any_valid_moves(self):
         """Check if the current player has any valid moves"""
-        for row in range(ROWS):
-            for col in range(COLS):
-                square = self.board.squares[row][col]
-                if square.has_piece() and square.piece.color == self.next_player:
-                    square.piece.clear_moves()
-                    self.board.calc_moves(square.piece, row, col)
-                    if len(square.piece.moves) > 0:
-                        return True
-        return False
+        return self.board.any_legal_move(self.next_player)
     
     def add_move_to_history(self, piece, move, captured=False):
         """Add a move to the move history with algebraic notation"""
@@ -280,13 +146,16 @@ class Game:
         self.board_flipped = not self.board_flipped
 
     def play_sound(self, captured=False):
+        # headless games have no sounds to play
+        if self._config is None:
+            return
         if captured:
             self.config.capture_sound.play()
         else:
             self.config.move_sound.play()
 
     def reset(self):
-        self.__init__()
+        self.__init__(self.bitboard)
     
     def handle_popup_click(self, pos):
         """Handle clicks on the popup dialog"""
@@ -295,65 +164,3 @@ class Game:
                 self.reset()
                 return True
         return False
-    
-    def show_game_over(self, surface):
-        """Display game over popup"""
-        if self.show_popup:
-            # Create semi-transparent overlay
-            overlay = pygame.Surface((WIDTH, HEIGHT))
-            overlay.set_alpha(180)  # More opaque
-            overlay.fill((0, 0, 0))
-            surface.blit(overlay, (0, 0))
-            
-            # Popup dimensions
-            popup_width = 400
-            popup_height = 200
-            popup_x = (WIDTH - popup_width) // 2
-            popup_y = (HEIGHT - popup_height) // 2
-            
-            # Create popup background
-            popup_surface = pygame.Surface((popup_width, popup_height))
-            popup_surface.fill((100, 100, 100))  # Lighter gray background
-            popup_surface.set_alpha(255)
-            
-            # Draw popup border
-            pygame.draw.rect(popup_surface, (255, 255, 255), (0, 0, popup_width, popup_height), 3)
-            
-            # Game over text
-            if self.winner == 'draw':
-                text = "STALEMATE!"
-                color = (255, 255, 0)  # Yellow
-            else:
-                text = f"{self.winner.upper()} WINS!"
-                color = (255, 255, 255)  # White
-            
-            font = pygame.font.SysFont('monospace', 36, bold=True)
-            text_surface = font.render(text, True, color)
-            text_rect = text_surface.get_rect(center=(popup_width//2, 60))
-            popup_surface.blit(text_surface, text_rect)
-            
-            # New Game button
-            button_width = 150
-            button_height = 40
-            button_x = (popup_width - button_width) // 2
-            button_y = 120
-            
-            # Button background
-            pygame.draw.rect(popup_surface, (100, 100, 100), (button_x, button_y, button_width, button_height))
-            pygame.draw.rect(popup_surface, (255, 255, 255), (button_x, button_y, button_width, button_height), 2)
-            
-            # Button text
-            button_font = pygame.font.SysFont('monospace', 20, bold=True)
-            button_text = button_font.render("New Game", True, (255, 255, 255))
-            button_text_rect = button_text.get_rect(center=(popup_width//2, button_y + button_height//2))
-            popup_surface.blit(button_text, button_text_rect)
-            
-            # Store button rect for click detection
-            self.new_game_button_rect = pygame.Rect(popup_x + button_x, popup_y + button_y, button_width, button_height)
-            
-            # Draw popup on main surface
-            surface.blit(popup_surface, (popup_x, popup_y))
-    
-    def show_game_info(self, surface):
-        """Display nothing - clean interface"""
-        pass
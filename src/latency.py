@@ -0,0 +1,55 @@
+import time
+import pygame
+
+# pygame event types the probe times
+INPUT_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN)
+
+class LatencyProbe:
+
+    '''
+        Input-to-display latency: every input event is stamped when it is taken off the
+        queue and timed to the end of the first pygame.display.update after it. Events read
+        without waiting may have queued at any point since the previous read, so they are
+        stamped with that earlier time and the figures are an upper bound. Input that
+        changes nothing on screen (no dirty rects in the next frame) is not counted.
+    '''
+
+    def __init__(self, maxsamples=100000):
+        self.maxsamples = maxsamples
+        # input events not shown yet, as (time read, count)
+        self.pending = []
+        self.samples = []
+        self.dropped = 0
+
+    def received(self, events, stamp):
+        """Stamp the input events among events with the time they arrived by"""
+        count = sum(1 for event in events if event.type in INPUT_EVENTS)
+        if count:
+            self.pending.append((stamp, count))
+
+    def presented(self, rects):
+        """A frame was drawn: its display update shows the pending input, if it changed anything"""
+        pending = self.pending
+        if not pending:
+            return
+        if rects:
+            now = time.perf_counter()
+            for stamp, count in pending:
+                self.samples.extend([now - stamp] * count)
+            if len(self.samples) > self.maxsamples:
+                del self.samples[:len(self.samples) - self.maxsamples]
+        else:
+            self.dropped += sum(count for stamp, count in pending)
+        pending.clear()
+
+    def percentile(self, p):
+        """Latency in seconds that p percent of the timed events stayed under"""
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def report(self):
+        if not self.samples:
+            return 'latency: no input reached the display'
+        return (f"latency over {len(self.samples)} events: "
+                f"p50 {self.percentile(50) * 1000:.1f}ms  p95 {self.percentile(95) * 1000:.1f}ms  "
+                f"p99 {self.percentile(99) * 1000:.1f}ms  ({self.dropped} changed nothing)")
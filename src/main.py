@@ -1,22 +1,44 @@
 import pygame
 import sys
+import argparse
 
 from const import *
 from game import Game
+from renderer import Renderer
+from latency import LatencyProbe
+from worker import EngineWorker, MOVE, HINT
 from square import Square
 from move import Move
 
 class Main:
 
-    def __init__(self):
+    def __init__(self, latency=False):
         pygame.init()
         self.screen = pygame.display.set_mode( (WIDTH, HEIGHT) )
         pygame.display.set_caption('CHESS')
         self.game = Game()
+        # latency=True times every input to the display update showing it, reported on quit
+        self.probe = LatencyProbe() if latency else None
+        self.renderer = Renderer(self.game, self.screen, probe=self.probe)
+        # searches run in a separate process so thinking never stalls a frame
+        self.worker = EngineWorker()
+
+    def engine_result(self, result):
+        """Apply an answer from the engine worker"""
+        game = self.game
+        if result.move is None:
+            return
+        initial_row, initial_col, final_row, final_col = result.move
+        move = Move(Square(initial_row, initial_col), Square(final_row, final_col))
+        if result.kind == MOVE:
+            game.play_move(game.board.squares[initial_row][initial_col].piece, move)
+        elif result.kind == HINT:
+            game.hint = move
 
     def mainloop(self):
         
-        screen = self.screen
+        renderer = self.renderer
+        worker = self.worker
         game = self.game
         board = self.game.board
         dragger = self.game.dragger
@@ -25,33 +47,32 @@ class Main:
             # Check for game over conditions if not already over
             if not game.game_over:
                 game.check_game_over()
+
+            # answers from the engine worker, polled once per frame
+            for result in worker.poll():
+                self.engine_result(result)
+
+            # computer's turn
+            if game.computer == game.next_player and not game.game_over and not worker.busy:
+                worker.submit(MOVE, game.board.to_fen(), ENGINE_TIME_MS)
             
-            # show methods
-            game.show_bg(screen)
-            game.show_last_move(screen)
-            game.show_moves(screen)
-            game.show_pieces(screen)
-
-            game.show_hover(screen)
-            game.show_check_indicator(screen)
-            game.show_game_info(screen)
-
-            if dragger.dragging:
-                dragger.update_blit(screen)
-            
-            # Show game over screen if game is over
-            game.show_game_over(screen)
+            # redraw the squares that changed since the last frame
+            renderer.update()
 
-            for event in pygame.event.get():
+            # waits for input when idle (but not while the engine is thinking), capped at FPS
+            for event in renderer.events(block=not worker.busy):
                 
                 # click piece
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     # Check for popup clicks first
                     if game.handle_popup_click(event.pos):
+                        worker.cancel()
+                        board = self.game.board
+                        dragger = self.game.dragger
                         continue
                     
-                    # Don't allow moves if game is over
-                    if game.game_over:
+                    # Don't allow moves if game is over or while the computer is to move
+                    if game.game_over or game.computer == game.next_player:
                         continue
                         
                     dragger.update_mouse(event.pos)
@@ -73,19 +94,9 @@ class Main:
                         piece = board.squares[board_row][board_col].piece
                         # valid piece color
                         if piece.color == game.next_player:
-                            piece.clear_moves()
-                            board.calc_moves(piece, board_row, board_col)
-                            
-
-                            
                             # Save board coordinates, not display coordinates
                             dragger.save_initial_board_coords(board_row, board_col)
-                            dragger.drag_piece(piece)
-                            # show methods
-                            game.show_bg(screen)
-                            game.show_last_move(screen)
-                            game.show_moves(screen)
-                            game.show_pieces(screen)
+                            dragger.drag_piece(piece, game.legal_moves(board_row, board_col))
                 
                 # move piece (mouse motion)
                 elif event.type == pygame.MOUSEMOTION:
@@ -109,13 +120,6 @@ class Main:
 
                     if dragger.dragging:
                         dragger.update_mouse(event.pos)
-                        # show methods
-                        game.show_bg(screen)
-                        game.show_last_move(screen)
-                        game.show_moves(screen)
-                        game.show_pieces(screen)
-                        game.show_hover(screen)
-                        dragger.update_blit(screen)
 
                 # release piece
                 elif event.type == pygame.MOUSEBUTTONUP:
@@ -141,19 +145,10 @@ class Main:
 
                         # if valid move -> move
                         if board.valid_move(dragger.piece, move):
-                            captured = board.squares[board_released_row][board_released_col].has_piece()
-
-                            board.move(dragger.piece, move)
-                            # Record move in history
-                            game.add_move_to_history(dragger.piece, move, captured)
-                            # sounds
-                            game.play_sound(captured)
-                            # show methods
-                            game.show_bg(screen)
-                            game.show_last_move(screen)
-                            game.show_pieces(screen)
-                            # next turn
-                            game.next_turn()
+                            # move, record it, play the sound and pass the turn
+                            game.play_move(dragger.piece, move)
+                            # pending hints are for the old position
+                            worker.cancel()
                             
                     dragger.undrag_piece()
 
@@ -168,8 +163,19 @@ class Main:
                     if event.key == pygame.K_f:
                         game.toggle_board_flip()
 
+                    # press 'H' for a hint
+                    if event.key == pygame.K_h and not game.game_over:
+                        worker.cancel()
+                        worker.submit(HINT, game.board.to_fen(), HINT_TIME_MS)
+
+                    # press 'C' to let the computer play the side to move (again to stop)
+                    if event.key == pygame.K_c:
+                        worker.cancel()
+                        game.computer = None if game.computer else game.next_player
+
                     # press 'R' to restart game
                     if event.key == pygame.K_r:
+                        worker.cancel()
                         game.reset()
                         game = self.game
                         board = self.game.board
@@ -177,14 +183,16 @@ class Main:
                 
                 # quit game
                 elif event.type == pygame.QUIT:
+                    if self.probe is not None:
+                        print(self.probe.report())
+                    worker.close()
                     pygame.quit()
                     sys.exit()
-            
-
-
-
-            pygame.display.update()
 
 
-main = Main()
-main.mainloop()
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Player vs player chess')
+    parser.add_argument('--latency', action='store_true', help='report input-to-display latency on quit')
+    args = parser.parse_args()
+    main = Main(latency=args.latency)
+    main.mainloop()
\ No newline at end of file
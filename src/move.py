@@ -1,16 +1,66 @@
+from square import SQUARES
+
+'''
+    Move codes: a move packed into one int, as generated by the boards.
+    bits 0-5 initial square, 6-11 final square (square index = row * 8 + col),
+    12-15 flags, 16-18 promotion piece. The low 12 bits are the move's route,
+    which is what identifies a move among the legal moves of a position.
+'''
+
+ROUTE_MASK = 0xFFF
+
+# flags
+CAPTURE = 1 << 12
+EN_PASSANT = 2 << 12
+CASTLING = 4 << 12
+DOUBLE_PUSH = 8 << 12
+
+# promotion piece (pawns always promote to a queen)
+PROMOTION_SHIFT = 16
+PROMOTE_QUEEN = 1 << PROMOTION_SHIFT
+
+# every code without flags, built once so generated quiet moves share these int objects
+ROUTES = tuple(range(ROUTE_MASK + 1))
+
+def encode_move(from_sq, to_sq, flags=0):
+    return from_sq | to_sq << 6 | flags
+
+def move_from(code):
+    return code & 63
+
+def move_to(code):
+    return code >> 6 & 63
 
 class Move:
 
-    def __init__(self, initial, final):
-        # initial and final are squares
+    __slots__ = ('initial', 'final', 'code')
+
+    # initial and final are squares; code is the packed move (flags are only known
+    # for generated moves, a move built from two squares carries just its route)
+    def __init__(self, initial, final, code=None):
         self.initial = initial
         self.final = final
+        if code is None:
+            code = encode_move(initial.row * 8 + initial.col, final.row * 8 + final.col)
+        self.code = code
+
+    @classmethod
+    def from_code(cls, code):
+        """View of a move code on the interned squares"""
+        return cls(SQUARES[code & 63], SQUARES[code >> 6 & 63], code)
+
+    @property
+    def route(self):
+        return self.code & ROUTE_MASK
 
     def __str__(self):
         s = ''
         s += f'({self.initial.col}, {self.initial.row})'
         s += f' -> ({self.final.col}, {self.final.row})'
         return s
-    
+
     def __eq__(self, other):
-        return self.initial == other.initial and self.final == other.final
\ No newline at end of file
+        return self.initial == other.initial and self.final == other.final
+
+    def __hash__(self):
+        return self.code & ROUTE_MASK
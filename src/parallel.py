@@ -0,0 +1,103 @@
+import multiprocessing
+import time
+
+from square import Square
+from move import Move
+from board import Board
+from engine import Engine, SearchResult, move_key, INFINITY
+
+# transposition table slots per root move search
+TASK_TT_SIZE = 1 << 16
+
+# width of the window that tests a root move against the first move's score; any width
+# is correct, since a fail-soft score inside (alpha, beta) is exact and one at or above
+# beta is re-searched - a narrow window only makes the test cheaper
+NULL_WINDOW = 0.01
+
+def _search_root_move(task):
+    '''
+        Pool task: search one root move of the position to a fixed depth in the root
+        window (alpha, beta). Every task gets a fresh Engine, so its result depends only
+        on the task itself, never on which process ran it or what that process searched before.
+    '''
+    fen, root_move, depth, alpha, beta = task
+    board = Board.from_fen(fen)
+    initial_row, initial_col, final_row, final_col = root_move
+    move = Move(Square(initial_row, initial_col), Square(final_row, final_col))
+    engine = Engine(TASK_TT_SIZE)
+    # fixed depth, so no time limit
+    result = engine.search(board, board.next_player, time_ms=float('inf'), max_depth=depth, root_moves=[move],
+                           alpha=alpha, beta=beta)
+    return result.score, result.nodes
+
+class ParallelSearch:
+
+    '''
+        Root-split search over a multiprocessing pool.
+        The best move of a search one ply shallower goes first, the other root moves follow
+        as Engine orders them, and each is searched to the same fixed depth in its own task.
+        The first move is searched with a full window and its score becomes alpha for all
+        the others, which are only tested against it in a null window (alpha, alpha +
+        NULL_WINDOW). A score inside the window is exact; the moves that fail high are
+        searched again above alpha for theirs. The best score wins, ties going to the
+        earlier move. The result is the same for any number of workers: every task gets
+        its bound before it starts and no tables are shared, so which worker finishes
+        first cannot change any score. The search has no randomness, so there is no
+        seed to fix.
+    '''
+
+    def __init__(self, workers=None):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.pool = multiprocessing.Pool(self.workers)
+
+    def search(self, fen, depth):
+        """SearchResult for the side to move in the FEN position, None without legal moves"""
+        start = time.perf_counter()
+        board = Board.from_fen(fen)
+        moves = board.position_info(board.next_player).moves
+        if not moves:
+            return None
+        # the best move one ply shallower goes first, as in iterative deepening,
+        # then the rest in the order of the sequential search's root
+        nodes = 0
+        tt_move = None
+        if depth > 1:
+            guess = Engine(TASK_TT_SIZE).search(board, board.next_player, time_ms=float('inf'), max_depth=depth - 1)
+            tt_move, nodes = move_key(guess.move), guess.nodes
+        root_moves = [move_key(move) for move in Engine(1)._ordered(board, moves, tt_move, 0)]
+
+        best_move = root_moves[0]
+        best_score, task_nodes = self.pool.apply(_search_root_move, ((fen, best_move, depth, -INFINITY, INFINITY),))
+        nodes += task_nodes
+        alpha = best_score
+
+        # everything else only has to be proven no better than the first move
+        beta = alpha + NULL_WINDOW
+        tasks = [(fen, root_move, depth, alpha, beta) for root_move in root_moves[1:]]
+        fail_high = []
+        for root_move, (score, task_nodes) in zip(root_moves[1:], self.pool.imap(_search_root_move, tasks, self._chunksize(tasks))):
+            nodes += task_nodes
+            if score >= beta:
+                fail_high.append(root_move)
+            elif score > best_score:
+                # inside the window the score is exact
+                best_score, best_move = score, root_move
+
+        # the moves that beat it get their exact scores
+        tasks = [(fen, root_move, depth, alpha, INFINITY) for root_move in fail_high]
+        for root_move, (score, task_nodes) in zip(fail_high, self.pool.imap(_search_root_move, tasks, self._chunksize(tasks))):
+            nodes += task_nodes
+            if score > best_score:
+                best_score, best_move = score, root_move
+
+        initial_row, initial_col, final_row, final_col = best_move
+        move = Move(Square(initial_row, initial_col), Square(final_row, final_col))
+        return SearchResult(move, best_score, depth, nodes, time.perf_counter() - start)
+
+    def _chunksize(self, tasks):
+        # a few chunks per worker: fewer round trips, still balanced
+        return max(1, len(tasks) // (self.workers * 4))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Perft - move generation correctness and speed
+Counts the leaf nodes of the legal move tree to a given depth and compares them with reference counts.
+
+Usage:
+    python src/perft.py                        # run the reference suite
+    python src/perft.py --depth 4 --bitboard   # deeper suite on the bitboard engine
+    python src/perft.py --fen "<fen>" --depth 3 --divide
+"""
+
+import sys
+import time
+import argparse
+
+from const import *
+from board import Board
+from bitboard import BitBoard
+from square import Square
+from move import Move
+
+# (name, fen, {depth: leaf nodes})
+# the board always promotes to a queen, so positions with promotions
+# are counted with queen promotions only
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     {1: 20, 2: 400, 3: 8902, 4: 197281}),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     {1: 48, 2: 2039, 3: 97862}),
+    ('endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     {1: 14, 2: 191, 3: 2812, 4: 43238}),
+    ('promotions', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     {1: 6, 2: 228, 3: 8087}),
+    ('promotion capture', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     {1: 41, 2: 1373, 3: 54007}),
+    ('en passant pinned', '8/8/8/8/k2Pp2Q/8/8/3K4 b - d3 0 1',
+     {1: 6, 2: 136, 3: 863, 4: 20471}),
+    ('en passant discovered check', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+     {1: 18, 2: 92, 3: 1670, 4: 10138}),
+    ('en passant illegal', '8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1',
+     {1: 13, 2: 102, 3: 1266, 4: 10276}),
+    ('castling gives check', '5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+     {1: 15, 2: 66, 3: 1198, 4: 6399}),
+    ('long castling gives check', '3k4/8/8/8/8/8/8/R3K3 w Q - 0 1',
+     {1: 16, 2: 71, 3: 1286, 4: 7418}),
+    ('castling rights', 'r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1',
+     {1: 26, 2: 1141, 3: 27826}),
+    ('castling prevented', 'r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1',
+     {1: 44, 2: 1494, 3: 50509}),
+    ('promote out of check', '2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1',
+     {1: 5, 2: 75, 3: 694, 4: 9674}),
+    ('promote to give check', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     {1: 6, 2: 28, 3: 248, 4: 1379}),
+    ('self stalemate', 'K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+     {1: 2, 2: 6, 3: 13, 4: 63}),
+    ('discovered pin', '8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+     {1: 37, 2: 183, 3: 6559, 4: 23527}),
+]
+
+def legal_moves(board, color):
+    """List of (piece, move) for every legal move of color"""
+    squares = board.squares
+    moves = []
+    for code in board.legal_codes(color):
+        move = Move.from_code(code)
+        moves.append((squares[move.initial.row][move.initial.col].piece, move))
+    return moves
+
+def move_name(move):
+    """Coordinate notation of a move, e.g. e2e4"""
+    initial, final = move.initial, move.final
+    return (Square.get_alphacol(initial.col) + str(ROWS - initial.row) +
+            Square.get_alphacol(final.col) + str(ROWS - final.row))
+
+def perft(board, depth, color):
+    """Number of leaf nodes depth plies below the current position"""
+    if depth <= 1:
+        # leaves are only counted, so their moves stay as codes
+        return len(board.legal_codes(color)) if depth == 1 else 1
+    moves = legal_moves(board, color)
+
+    rival = 'black' if color == 'white' else 'white'
+    nodes = 0
+    for piece, move in moves:
+        board.make_move(piece, move)
+        nodes += perft(board, depth - 1, rival)
+        board.unmake_move()
+    return nodes
+
+def divide(board, depth, color):
+    """Leaf nodes below each root move, as (move name, nodes) pairs"""
+    rival = 'black' if color == 'white' else 'white'
+    result = []
+    for piece, move in legal_moves(board, color):
+        board.make_move(piece, move)
+        result.append((move_name(move), perft(board, depth - 1, rival)))
+        board.unmake_move()
+    return sorted(result)
+
+def run(board_class, fen, depth, show_divide=False):
+    """Run perft on one position, print the counts and speed and return the node count"""
+    board = board_class.from_fen(fen)
+    color = board.next_player
+    start = time.perf_counter()
+    if show_divide:
+        breakdown = divide(board, depth, color)
+        for name, count in breakdown:
+            print(f"  {name}: {count}")
+        nodes = sum(count for _, count in breakdown)
+    else:
+        nodes = perft(board, depth, color)
+    elapsed = time.perf_counter() - start
+    print(f"  depth {depth}: {nodes} nodes in {elapsed:.2f}s ({nodes / max(elapsed, 1e-9):.0f} nodes/s)")
+    return nodes
+
+def run_suite(board_class, max_depth):
+    """Check every reference position up to max_depth, returning the list of failures"""
+    failures = []
+    total_nodes = 0
+    start = time.perf_counter()
+    board = board_class()
+    for name, fen, expected in POSITIONS:
+        board.load_fen(fen)
+        color = board.next_player
+        for depth in sorted(expected):
+            if depth > max_depth:
+                break
+            nodes = perft(board, depth, color)
+            total_nodes += nodes
+            ok = nodes == expected[depth]
+            status = "PASS" if ok else "FAIL"
+            print(f"[{status}] {name} depth {depth}: {nodes} (expected {expected[depth]})")
+            if not ok:
+                failures.append((name, depth, nodes, expected[depth]))
+    elapsed = time.perf_counter() - start
+    print(f"\n{total_nodes} nodes in {elapsed:.2f}s ({total_nodes / max(elapsed, 1e-9):.0f} nodes/s)")
+    return failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perft move generation test')
+    parser.add_argument('--fen', help='position to search (default: run the reference suite)')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--divide', action='store_true', help='show the node count below each root move')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard engine')
+    args = parser.parse_args(argv)
+
+    board_class = BitBoard if args.bitboard else Board
+    if args.fen:
+        run(board_class, args.fen, args.depth, args.divide)
+        return 0
+
+    failures = run_suite(board_class, args.depth)
+    if failures:
+        print(f"{len(failures)} perft counts do not match the reference")
+        return 1
+    print("All perft counts match the reference")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+PGN - replay archived games through the rules engine
+Streams games from a PGN file, replays their SAN moves with legality checking across a
+process pool and reports every game's outcome or first illegal move.
+
+Usage:
+    python src/pgn.py games.pgn                      # all cores
+    python src/pgn.py games.pgn --workers 4 --batch 100 --quiet
+"""
+
+import sys
+import time
+import argparse
+import itertools
+import multiprocessing
+from collections import deque
+
+from const import *
+from board import Board
+from bitboard import BitBoard
+from piece import *
+
+SAN_PIECES = {'N': Knight, 'B': Bishop, 'R': Rook, 'Q': Queen, 'K': King}
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+class PGNGame:
+
+    # one game of a PGN file: the tag pairs and the SAN moves of the main line
+    def __init__(self, number, tags, moves):
+        self.number = number
+        self.tags = tags
+        self.moves = moves
+
+class ReplayResult:
+
+    '''
+        Outcome of replaying one game: the number of plies played, the status of the
+        final position ('checkmate', 'stalemate' or None), and for a rejected game the
+        ply and SAN of the first move that is not legal, with the reason.
+    '''
+
+    def __init__(self, number, result, plies, status=None, error_ply=None, error_move=None, error=None):
+        self.number = number
+        self.result = result
+        self.plies = plies
+        self.status = status
+        self.error_ply = error_ply
+        self.error_move = error_move
+        self.error = error
+
+    @property
+    def legal(self):
+        return self.error is None
+
+    def __str__(self):
+        if self.legal:
+            status = f', {self.status}' if self.status else ''
+            return f'game {self.number}: {self.result} in {self.plies} plies{status}'
+        move_number = self.error_ply // 2 + 1
+        dots = '.' if self.error_ply % 2 == 0 else '...'
+        return f'game {self.number}: illegal {move_number}{dots}{self.error_move} ({self.error})'
+
+# reading
+
+def read_games(lines):
+    '''
+        Yield the games of a PGN text one at a time from any iterable of lines
+        (an open file is read lazily, so memory does not grow with the file size)
+    '''
+    tags = {}
+    movetext = []
+    number = 0
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            # a tag after movetext starts the next game
+            if movetext:
+                number += 1
+                yield PGNGame(number, tags, san_moves(' '.join(movetext)))
+                tags, movetext = {}, []
+            name, _, value = line[1:-1].partition(' ')
+            tags[name] = value.strip().strip('"')
+        elif line and not line.startswith('%'):
+            # rest-of-line comment
+            line = line.split(';', 1)[0]
+            movetext.append(line)
+    if movetext or tags:
+        number += 1
+        yield PGNGame(number, tags, san_moves(' '.join(movetext)))
+
+def san_moves(movetext):
+    '''
+        SAN moves of the main line, without move numbers, comments, variations, NAGs,
+        standalone annotation glyphs ("!?") and en passant markers ("e.p."), and the result
+    '''
+    moves = []
+    depth = 0
+    i = 0
+    length = len(movetext)
+    while i < length:
+        char = movetext[i]
+        if char == '{':
+            # brace comment
+            end = movetext.find('}', i)
+            i = length if end < 0 else end + 1
+        elif char == '(':
+            depth += 1
+            i += 1
+        elif char == ')':
+            depth -= 1
+            i += 1
+        elif char.isspace():
+            i += 1
+        else:
+            end = i
+            while end < length and not movetext[end].isspace() and movetext[end] not in '{}()':
+                end += 1
+            token = movetext[i:end]
+            i = end
+            if depth or token in RESULTS:
+                continue
+            # move numbers ("12." or "12...")
+            token = token.lstrip('0123456789').lstrip('.')
+            if token.endswith('e.p.'):
+                token = token[:-4]
+            if not token.strip('!?') or token.startswith('$'):
+                continue
+            moves.append(token)
+    return moves
+
+# replaying
+
+def parse_san(board, color, san):
+    '''
+        The legal move of color described by a SAN string, as (piece, move).
+        Raises ValueError when no legal move or more than one matches.
+    '''
+    san = san.rstrip('+#!?')
+    if not san:
+        raise ValueError('unreadable move')
+    king_row = 7 if color == 'white' else 0
+    if san in ('O-O', '0-0'):
+        return _only(board, color, King, lambda move:
+                     (move.initial.row, move.initial.col, move.final.row, move.final.col) == (king_row, 4, king_row, 6))
+    if san in ('O-O-O', '0-0-0'):
+        return _only(board, color, King, lambda move:
+                     (move.initial.row, move.initial.col, move.final.row, move.final.col) == (king_row, 4, king_row, 2))
+
+    promotion = None
+    if '=' in san:
+        san, promotion = san.split('=')
+    elif san[-1] in 'NBRQ' and san[0].islower():
+        # promotion without "=" (e.g. e8Q)
+        san, promotion = san[:-1], san[-1]
+    if promotion is not None and promotion != 'Q':
+        raise ValueError('only promotion to a queen is supported')
+
+    piece_class = SAN_PIECES.get(san[0], Pawn)
+    if piece_class is not Pawn:
+        san = san[1:]
+    san = san.replace('x', '')
+    if len(san) < 2 or san[-2] not in 'abcdefgh' or san[-1] not in '12345678':
+        raise ValueError('unreadable move')
+    final_row = ROWS - int(san[-1])
+    final_col = 'abcdefgh'.index(san[-2])
+    # disambiguation: origin file and/or rank
+    origin = san[:-2]
+    origin_col = 'abcdefgh'.index(origin[0]) if origin and origin[0] in 'abcdefgh' else None
+    origin_row = ROWS - int(origin[-1]) if origin and origin[-1] in '12345678' else None
+
+    def matches(move):
+        return (move.final.row == final_row and move.final.col == final_col and
+                (origin_col is None or move.initial.col == origin_col) and
+                (origin_row is None or move.initial.row == origin_row))
+
+    return _only(board, color, piece_class, matches)
+
+def _only(board, color, piece_class, matches):
+    """The single legal move of a piece_class piece of color that matches"""
+    found = []
+    # only the pieces of the named type need their moves generated
+    for (row, col), piece in board.pieces(color):
+        if piece.kind is piece_class:
+            found.extend((piece, move) for move in board.piece_moves(piece, row, col) if matches(move))
+    if not found:
+        raise ValueError('no legal move matches')
+    if len(found) > 1:
+        raise ValueError('ambiguous move')
+    return found[0]
+
+def replay(game, board_class=Board):
+    """Play the moves of a PGNGame on a fresh board, stopping at the first illegal one"""
+    board = board_class.from_fen(game.tags['FEN']) if 'FEN' in game.tags else board_class()
+    color = board.next_player
+    result = game.tags.get('Result', '*')
+    for ply, san in enumerate(game.moves):
+        try:
+            piece, move = parse_san(board, color, san)
+        except ValueError as error:
+            return ReplayResult(game.number, result, ply, error_ply=ply, error_move=san, error=str(error))
+        board.make_move(piece, move)
+        color = board.next_player
+    return ReplayResult(game.number, result, len(game.moves), board.position_info(color).status)
+
+def replay_batch(batch, bitboard=False):
+    """Replay a list of PGNGames, returning their ReplayResults (pool task)"""
+    board_class = BitBoard if bitboard else Board
+    return [replay(game, board_class) for game in batch]
+
+def batches(games, size):
+    games = iter(games)
+    while True:
+        batch = list(itertools.islice(games, size))
+        if not batch:
+            return
+        yield batch
+
+def validate(games, workers=None, batch_size=64, bitboard=False):
+    '''
+        Replay games (any iterable of PGNGames, e.g. read_games(file)) across a process pool
+        and yield their ReplayResults in file order. At most two batches per worker are in
+        flight, so games are read only as fast as they are replayed.
+    '''
+    workers = workers or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = deque()
+        for batch in batches(games, batch_size):
+            pending.append(pool.apply_async(replay_batch, (batch, bitboard)))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+    finally:
+        # let the workers exit on their own: terminating them relies on SIGTERM,
+        # which a process that initialised pygame turns into a quit event instead
+        pool.close()
+        pool.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay the games of a PGN file through the rules engine')
+    parser.add_argument('path', help='PGN file')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--batch', type=int, default=64, help='games per task')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard engine')
+    parser.add_argument('--quiet', action='store_true', help='only report illegal games')
+    args = parser.parse_args(argv)
+
+    games = plies = illegal = 0
+    start = time.perf_counter()
+    with open(args.path, encoding='utf-8', errors='replace') as pgn_file:
+        for result in validate(read_games(pgn_file), args.workers, args.batch, args.bitboard):
+            games += 1
+            plies += result.plies
+            if not result.legal:
+                illegal += 1
+            if not args.quiet or not result.legal:
+                print(result)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"\n{games} games ({illegal} illegal), {plies} plies in {elapsed:.2f}s "
+          f"({games / elapsed:.1f} games/s, {plies / elapsed:.0f} plies/s)")
+    return 1 if illegal else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,104 @@
-import os
+COLORS = ('white', 'black')
 
 class Piece:
 
-    def __init__(self, name, color, value, texture=None, texture_rect=None):
-        self.name = name
-        self.color = color
-        value_sign = 1 if color == 'white' else -1
-        self.value= value * value_sign
-        self.moves = []
+    '''
+        A piece's identity - its type and color - is shared class data: every piece type
+        gets one subclass per color (WhitePawn, BlackPawn, ...) holding its kind (the type),
+        color and signed value, and Pawn('white') makes a WhitePawn. An instance only keeps
+        the state of one piece on one board: whether it has moved and the moves last
+        calculated for it. isinstance(piece, Pawn) asks the type as before. Images and
+        screen positions are the renderer's business (Config.get_texture serves the images).
+    '''
+
+    __slots__ = ('moved', 'moves')
+
+    name = None
+    # material value by color, signed white positive
+    values = {'white': 0.0, 'black': -0.0}
+    # step along the rows by color (pawns only)
+    dirs = None
+
+    # identity, set on the colored classes
+    kind = None
+    color = None
+    value = 0.0
+    colored = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'color' in cls.__dict__:
+            return
+        # a piece type: create its white and black classes, importable from this module
+        cls.colored = {}
+        for color in COLORS:
+            attrs = {'__slots__': (), '__module__': cls.__module__,
+                     'kind': cls, 'color': color, 'value': cls.values[color]}
+            if cls.dirs is not None:
+                attrs['dir'] = cls.dirs[color]
+            colored = type(color.capitalize() + cls.__name__, (cls,), attrs)
+            cls.colored[color] = globals()[colored.__name__] = colored
+
+    def __new__(cls, color):
+        return object.__new__(cls.colored[color])
+
+    def __init__(self, color):
         self.moved = False
-        self.texture = texture
-        self.set_texture()
-        self.texture_rect = texture_rect
+        # no list until there is a move to hold
+        self.moves = ()
 
-    def set_texture(self, size=80):
-        self.texture = os.path.join(
-            f'assets/images/imgs-{size}px/{self.color}_{self.name}.png'
-        )
+    def __getnewargs__(self):
+        # copies and pickles are made through __new__, which needs the color
+        return (self.color,)
 
     def add_move(self, move):
-        self.moves.append(move)
+        if self.moves:
+            self.moves.append(move)
+        else:
+            self.moves = [move]
 
     def clear_moves(self):
-        self.moves = []
+        self.moves = ()
 
 class Pawn(Piece):
 
-    def __init__(self, color):
-        self.dir = -1 if color == 'white' else 1
-        super().__init__('pawn', color, 1.0)
+    __slots__ = ()
+
+    name = 'pawn'
+    values = {'white': 1.0, 'black': -1.0}
+    dirs = {'white': -1, 'black': 1}
 
 class Knight(Piece):
 
-    def __init__(self, color):
-        super().__init__('knight', color, 3.0)
+    __slots__ = ()
+
+    name = 'knight'
+    values = {'white': 3.0, 'black': -3.0}
 
 class Bishop(Piece):
 
-    def __init__(self, color):
-        super().__init__('bishop', color, 3.001)
+    __slots__ = ()
+
+    name = 'bishop'
+    values = {'white': 3.001, 'black': -3.001}
 
 class Rook(Piece):
 
-    def __init__(self, color):
-        super().__init__('rook', color, 5.0)
+    __slots__ = ()
+
+    name = 'rook'
+    values = {'white': 5.0, 'black': -5.0}
 
 class Queen(Piece):
 
-    def __init__(self, color):
-        super().__init__('queen', color, 9.0)
+    __slots__ = ()
+
+    name = 'queen'
+    values = {'white': 9.0, 'black': -9.0}
 
 class King(Piece):
 
-    def __init__(self, color):
-        super().__init__('king', color, 10000.0)
\ No newline at end of file
+    __slots__ = ()
+
+    name = 'king'
+    values = {'white': 10000.0, 'black': -10000.0}
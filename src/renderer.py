@@ -0,0 +1,431 @@
+import time
+import pygame
+
+from const import *
+from square import Square
+
+def coalesce_motion(events):
+    """events with every run of mouse motion events cut down to its last (latest) one"""
+    coalesced = []
+    for event in events:
+        if (event.type == pygame.MOUSEMOTION and coalesced and
+                coalesced[-1].type == pygame.MOUSEMOTION):
+            coalesced[-1] = event
+        else:
+            coalesced.append(event)
+    return coalesced
+
+class Renderer:
+
+    '''
+        Draws the game onto a surface, repainting only the squares whose contents
+        changed since the previous frame. Every square is summarised by what is
+        drawn on it (piece, highlights, hover, hint, check border); squares whose summary
+        differs, plus the squares under the dragged piece before and after it moved,
+        are redrawn and handed to pygame.display.update as dirty rects.
+    '''
+
+    def __init__(self, game, surface, fps=FPS, idle=True, coalesce=True, probe=None):
+        self.game = game
+        self.surface = surface
+        self.fps = fps
+        # sleep until the next event instead of polling when nothing is happening
+        self.idle = idle
+        # only the latest of consecutive mouse motions is handed out per frame
+        self.coalesce = coalesce
+        # LatencyProbe timing input to the display update that shows it, or None
+        self.probe = probe
+        self.last_read = time.perf_counter()
+        self.clock = pygame.time.Clock()
+        self.squares = None
+        self.layer = None
+        self.drag_rect = None
+        # (theme index, board_flipped) -> background surface
+        self.backgrounds = {}
+
+    # frame pacing
+
+    def events(self, block=True):
+        '''
+            Events since the last frame, capping the frame rate. While idle it blocks
+            until the next event, unless block is False (e.g. a search result is awaited).
+            Runs of mouse motion are coalesced to the latest position: only where the
+            mouse is now matters for the frame about to be drawn
+        '''
+        self.clock.tick(self.fps)
+        if self.idle and block and not pygame.event.peek():
+            events = [pygame.event.wait()] + pygame.event.get()
+            arrived = time.perf_counter()
+        else:
+            events = pygame.event.get()
+            # these may have queued at any point since the previous read
+            arrived = self.last_read
+        self.last_read = time.perf_counter()
+        if self.probe is not None:
+            self.probe.received(events, arrived)
+        return coalesce_motion(events) if self.coalesce else events
+
+    # drawing
+
+    def update(self):
+        """Draw the frame and push the dirty rects to the display"""
+        rects = self.draw()
+        if rects:
+            pygame.display.update(rects)
+        if self.probe is not None:
+            self.probe.presented(rects)
+        return rects
+
+    def draw(self):
+        """Repaint what changed since the previous frame and return the dirty rects"""
+        game = self.game
+        squares = self._square_states()
+        layer = (game.config.index, game.board_flipped, game.show_popup)
+        drag_rect = self._drag_rect()
+
+        if self.squares is None or layer != self.layer:
+            dirty = None
+        else:
+            dirty = {i for i in range(ROWS * COLS) if squares[i] != self.squares[i]}
+            if drag_rect != self.drag_rect:
+                for rect in (self.drag_rect, drag_rect):
+                    if rect is not None:
+                        dirty.update(self._covered(rect))
+            # the popup is translucent, so anything under it means a full repaint
+            if dirty and game.show_popup:
+                dirty = None
+
+        self.squares = squares
+        self.layer = layer
+        self.drag_rect = drag_rect
+
+        if dirty is None:
+            self._paint(None)
+            return [self.surface.get_rect()]
+        if not dirty:
+            return []
+
+        rects = [pygame.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+                 for row, col in (divmod(i, COLS) for i in sorted(dirty))]
+        for rect in rects:
+            self._paint(rect)
+        return rects
+
+    def _paint(self, clip):
+        game = self.game
+        surface = self.surface
+        surface.set_clip(clip)
+        self.show_bg(surface)
+        self.show_last_move(surface)
+        self.show_moves(surface)
+        self.show_pieces(surface)
+        self.show_hover(surface)
+        self.show_hint(surface)
+        self.show_check_indicator(surface)
+        self.show_game_info(surface)
+        if game.dragger.dragging:
+            game.dragger.update_blit(surface)
+        surface.set_clip(None)
+        if clip is None:
+            self.show_game_over(surface)
+
+    # layers (blit methods)
+
+    def show_bg(self, surface):
+        surface.blit(self.background(), (0, 0))
+
+    def background(self):
+        """Board squares and coordinate labels pre-composited for the current theme and flip state"""
+        game = self.game
+        key = (game.config.index, game.board_flipped)
+        background = self.backgrounds.get(key)
+        if background is None:
+            background = self._render_bg()
+            self.backgrounds[key] = background
+        return background
+
+    def _render_bg(self):
+        game = self.game
+        theme = game.config.theme
+        surface = pygame.Surface((WIDTH, HEIGHT))
+
+        for row in range(ROWS):
+            for col in range(COLS):
+                # Calculate display coordinates (flipped if board is flipped)
+                if game.board_flipped:
+                    display_row = ROWS - 1 - row
+                    display_col = COLS - 1 - col
+                else:
+                    display_row = row
+                    display_col = col
+                
+                # color
+                color = theme.bg.light if (row + col) % 2 == 0 else theme.bg.dark
+                # rect
+                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+                # blit
+                pygame.draw.rect(surface, color, rect)
+
+                # row coordinates
+                if col == 0:
+                    # color
+                    color = theme.bg.dark if row % 2 == 0 else theme.bg.light
+                    # label
+                    lbl = game.config.font.render(str(ROWS - row), 1, color)
+                    lbl_pos = (5, 5 + display_row * SQSIZE)
+                    # blit
+                    surface.blit(lbl, lbl_pos)
+
+                # col coordinates
+                if row == 7:
+                    # color
+                    color = theme.bg.dark if (row + col) % 2 == 0 else theme.bg.light
+                    # label
+                    lbl = game.config.font.render(Square.get_alphacol(col), 1, color)
+                    lbl_pos = (display_col * SQSIZE + SQSIZE - 20, HEIGHT - 20)
+                    # blit
+                    surface.blit(lbl, lbl_pos)
+
+        # match the display pixel format so the per-frame blit is a plain copy
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def show_pieces(self, surface):
+        game = self.game
+        for color in ('white', 'black'):
+            for (row, col), piece in game.board.pieces(color):
+                # show all pieces except piece being dragged
+                if piece is not game.dragger.piece:
+                    # keeps piece at size 80
+                    img = game.config.get_texture(piece, size=80)
+                    
+                    # Calculate display coordinates (flipped if board is flipped)
+                    if game.board_flipped:
+                        display_row = ROWS - 1 - row
+                        display_col = COLS - 1 - col
+                    else:
+                        display_row = row
+                        display_col = col
+                    
+                    img_center = display_col * SQSIZE + SQSIZE // 2, display_row * SQSIZE + SQSIZE // 2
+                    # centers the piece
+                    texture_rect = img.get_rect(center=img_center)
+                    # tells pygame to display centered image
+                    surface.blit(img, texture_rect)
+
+    def show_moves(self, surface):
+        game = self.game
+        theme = game.config.theme
+
+        if game.dragger.dragging:
+            # loop through all valid moves
+            for move in game.dragger.moves:
+                # Calculate display coordinates (flipped if board is flipped)
+                if game.board_flipped:
+                    display_row = ROWS - 1 - move.final.row
+                    display_col = COLS - 1 - move.final.col
+                else:
+                    display_row = move.final.row
+                    display_col = move.final.col
+                
+                # color
+                color = theme.moves.light if (move.final.row + move.final.col) % 2 == 0 else theme.moves.dark
+                # rect
+                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+                # blit
+                pygame.draw.rect(surface, color, rect)
+
+    def show_last_move(self, surface):
+        game = self.game
+        theme = game.config.theme
+
+        if game.board.last_move:
+            initial = game.board.last_move.initial
+            final = game.board.last_move.final
+
+            for pos in [initial, final]:
+                # Calculate display coordinates (flipped if board is flipped)
+                if game.board_flipped:
+                    display_row = ROWS - 1 - pos.row
+                    display_col = COLS - 1 - pos.col
+                else:
+                    display_row = pos.row
+                    display_col = pos.col
+                
+                # color
+                color = theme.trace.light if (pos.row + pos.col) % 2 == 0 else theme.trace.dark
+                # rect
+                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+                # blit
+                pygame.draw.rect(surface, color, rect)
+
+    def show_hover(self, surface):
+        game = self.game
+        if game.hovered_square:
+            # Calculate display coordinates (flipped if board is flipped)
+            if game.board_flipped:
+                display_row = ROWS - 1 - game.hovered_square.row
+                display_col = COLS - 1 - game.hovered_square.col
+            else:
+                display_row = game.hovered_square.row
+                display_col = game.hovered_square.col
+            
+            # color
+            color = (180, 180, 180)
+            # rect
+            rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+            # blit
+            pygame.draw.rect(surface, color, rect, width=3)
+    
+    def show_check_indicator(self, surface):
+        """Show red border around king if in check"""
+        game = self.game
+        if not game.game_over:
+            # Check if current player is in check
+            king_pos = game.board.king_squares[game.next_player]
+            if king_pos and game.board.position_info(game.next_player).in_check:
+                row, col = king_pos
+                # Calculate display coordinates (flipped if board is flipped)
+                if game.board_flipped:
+                    display_row = ROWS - 1 - row
+                    display_col = COLS - 1 - col
+                else:
+                    display_row = row
+                    display_col = col
+                
+                # Draw red border around king
+                color = (255, 0, 0)  # Red
+                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+                pygame.draw.rect(surface, color, rect, width=3)
+
+    def show_hint(self, surface):
+        """Outline the squares of the suggested move"""
+        game = self.game
+        if game.hint:
+            for pos in (game.hint.initial, game.hint.final):
+                # Calculate display coordinates (flipped if board is flipped)
+                if game.board_flipped:
+                    display_row = ROWS - 1 - pos.row
+                    display_col = COLS - 1 - pos.col
+                else:
+                    display_row = pos.row
+                    display_col = pos.col
+                
+                color = (70, 130, 230)  # Blue
+                rect = (display_col * SQSIZE, display_row * SQSIZE, SQSIZE, SQSIZE)
+                pygame.draw.rect(surface, color, rect, width=4)
+
+    def show_game_over(self, surface):
+        """Display game over popup"""
+        game = self.game
+        if game.show_popup:
+            # Create semi-transparent overlay
+            overlay = pygame.Surface((WIDTH, HEIGHT))
+            overlay.set_alpha(180)  # More opaque
+            overlay.fill((0, 0, 0))
+            surface.blit(overlay, (0, 0))
+            
+            # Popup dimensions
+            popup_width = 400
+            popup_height = 200
+            popup_x = (WIDTH - popup_width) // 2
+            popup_y = (HEIGHT - popup_height) // 2
+            
+            # Create popup background
+            popup_surface = pygame.Surface((popup_width, popup_height))
+            popup_surface.fill((100, 100, 100))  # Lighter gray background
+            popup_surface.set_alpha(255)
+            
+            # Draw popup border
+            pygame.draw.rect(popup_surface, (255, 255, 255), (0, 0, popup_width, popup_height), 3)
+            
+            # Game over text
+            if game.winner == 'draw':
+                text = "STALEMATE!"
+                color = (255, 255, 0)  # Yellow
+            else:
+                text = f"{game.winner.upper()} WINS!"
+                color = (255, 255, 255)  # White
+            
+            font = pygame.font.SysFont('monospace', 36, bold=True)
+            text_surface = font.render(text, True, color)
+            text_rect = text_surface.get_rect(center=(popup_width//2, 60))
+            popup_surface.blit(text_surface, text_rect)
+            
+            # New Game button
+            button_width = 150
+            button_height = 40
+            button_x = (popup_width - button_width) // 2
+            button_y = 120
+            
+            # Button background
+            pygame.draw.rect(popup_surface, (100, 100, 100), (button_x, button_y, button_width, button_height))
+            pygame.draw.rect(popup_surface, (255, 255, 255), (button_x, button_y, button_width, button_height), 2)
+            
+            # Button text
+            button_font = pygame.font.SysFont('monospace', 20, bold=True)
+            button_text = button_font.render("New Game", True, (255, 255, 255))
+            button_text_rect = button_text.get_rect(center=(popup_width//2, button_y + button_height//2))
+            popup_surface.blit(button_text, button_text_rect)
+            
+            # Store button rect for click detection
+            game.new_game_button_rect = pygame.Rect(popup_x + button_x, popup_y + button_y, button_width, button_height)
+            
+            # Draw popup on main surface
+            surface.blit(popup_surface, (popup_x, popup_y))
+    
+    def show_game_info(self, surface):
+        """Display nothing - clean interface"""
+        pass
+
+    # dirty square tracking
+
+    def _display_index(self, row, col):
+        if self.game.board_flipped:
+            row, col = ROWS - 1 - row, COLS - 1 - col
+        return row * COLS + col
+
+    def _square_states(self):
+        """What is drawn on every display square, indexed by display row * 8 + col"""
+        game = self.game
+        board = game.board
+        dragger = game.dragger
+        states = [[None, False, False, False, False, False] for _ in range(ROWS * COLS)]
+
+        for color in ('white', 'black'):
+            for (row, col), piece in board.pieces(color):
+                if piece is not dragger.piece:
+                    states[self._display_index(row, col)][0] = piece
+        if board.last_move:
+            for pos in (board.last_move.initial, board.last_move.final):
+                states[self._display_index(pos.row, pos.col)][1] = True
+        if dragger.dragging:
+            for move in dragger.moves:
+                states[self._display_index(move.final.row, move.final.col)][2] = True
+        if game.hovered_square:
+            states[self._display_index(game.hovered_square.row, game.hovered_square.col)][3] = True
+        if not game.game_over:
+            king_pos = board.king_squares[game.next_player]
+            if king_pos and board.position_info(game.next_player).in_check:
+                states[self._display_index(*king_pos)][4] = True
+        if game.hint:
+            for pos in (game.hint.initial, game.hint.final):
+                states[self._display_index(pos.row, pos.col)][5] = True
+        return [tuple(state) for state in states]
+
+    def _drag_rect(self):
+        dragger = self.game.dragger
+        if not dragger.dragging:
+            return None
+        texture = self.game.config.get_texture(dragger.piece, size=128)
+        return texture.get_rect(center=(dragger.mouseX, dragger.mouseY))
+
+    def _covered(self, rect):
+        """Display square indexes overlapped by rect"""
+        rect = rect.clip(self.surface.get_rect())
+        if not rect.width or not rect.height:
+            return []
+        rows = range(rect.top // SQSIZE, (rect.bottom - 1) // SQSIZE + 1)
+        cols = range(rect.left // SQSIZE, (rect.right - 1) // SQSIZE + 1)
+        return [row * COLS + col for row in rows for col in cols]
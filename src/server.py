@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Server - host many player vs player games over TCP
+An asyncio server on the headless rules core. Every game is a Session between two
+connections; moves are validated by the rules engine and broadcast to both players.
+Games nobody has moved in for a while are kept only as a FEN string until the next move.
+
+Protocol (one line of ASCII per message, coordinates as in e2e4):
+    client                  server
+    NEW                     GAME <id> white
+    JOIN <id>               GAME <id> black, then START <fen> to both players
+    MOVE <from><to>         MOVED <from><to> <fen> to both players, then OVER <winner> if it ended
+    STATE                   STATE <fen>
+    STATS                   STATS games=<n> live=<n> hibernated=<n> moves=<n>
+    QUIT                    (closes the connection, the opponent gets LEFT)
+    anything rejected       ERROR <reason>
+
+Usage:
+    python src/server.py                         # listen on 127.0.0.1:8765
+    python src/server.py --port 9000 --idle 60 --bitboard
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+from const import *
+from game import Game
+
+# seconds without a move before a game is hibernated to its FEN
+IDLE_SECONDS = 30
+
+# position cache entries kept by a session's board: the players only ever ask about
+# the position on the board, the default cache would keep every position of the game
+SESSION_CACHE_SIZE = 2
+
+class Session:
+
+    '''
+        One game between two connections. A live Game holds about 18KiB of squares,
+        pieces and caches when it starts and about 28KiB after 80 plies: its board keeps
+        SESSION_CACHE_SIZE cached positions and no undo records, as nothing is taken
+        back. While hibernated the Game is dropped and only its FEN string is kept; the
+        next move rebuilds the Game from it.
+    '''
+
+    def __init__(self, game_id, bitboard=False):
+        self.id = game_id
+        self.bitboard = bitboard
+        self.game = self._new_game()
+        self.fen = None
+        # color -> StreamWriter of the player's connection
+        self.players = {'white': None, 'black': None}
+        self.last_active = time.monotonic()
+
+    @property
+    def hibernated(self):
+        return self.game is None
+
+    def hibernate(self):
+        self.fen = self.game.board.to_fen()
+        self.game = None
+
+    def wake(self):
+        """The Game, rebuilt from the FEN if the session was hibernated"""
+        if self.game is None:
+            self.game = self._new_game(self.fen)
+            self.fen = None
+        self.last_active = time.monotonic()
+        return self.game
+
+    def _new_game(self, fen=None):
+        game = Game(self.bitboard, fen)
+        game.board.cache.maxsize = SESSION_CACHE_SIZE
+        return game
+
+    def play_move(self, piece, move):
+        """Play a validated move without keeping its undo record"""
+        self.game.play_move(piece, move)
+        self.game.board.undo_stack.clear()
+
+    def to_fen(self):
+        return self.fen if self.game is None else self.game.board.to_fen()
+
+    def broadcast(self, line):
+        data = (line + '\n').encode()
+        for writer in self.players.values():
+            if writer is not None:
+                writer.write(data)
+
+def parse_move(text):
+    """(initial row, initial col, final row, final col) of coordinate notation like e2e4 (or e7e8q)"""
+    if len(text) not in (4, 5) or (len(text) == 5 and text[4] != 'q'):
+        raise ValueError('unreadable move')
+    files, ranks = 'abcdefgh', '12345678'
+    if text[0] not in files or text[2] not in files or text[1] not in ranks or text[3] not in ranks:
+        raise ValueError('unreadable move')
+    return (ROWS - int(text[1]), files.index(text[0]), ROWS - int(text[3]), files.index(text[2]))
+
+class GameServer:
+
+    '''
+        Hosts any number of Sessions in one event loop. Each connection plays in at
+        most one game at a time; a sweep every few seconds hibernates idle games.
+    '''
+
+    def __init__(self, idle_seconds=IDLE_SECONDS, bitboard=False):
+        self.idle_seconds = idle_seconds
+        self.bitboard = bitboard
+        self.sessions = {}
+        self.next_id = 0
+        self.moves = 0
+        self.server = None
+        self.sweeper = None
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.sweeper = asyncio.ensure_future(self._sweep_forever())
+        return self.server
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.sweeper.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    # idle games
+
+    def sweep(self, now=None):
+        """Hibernate every live game with no move for idle_seconds, returning how many"""
+        now = time.monotonic() if now is None else now
+        hibernated = 0
+        for session in self.sessions.values():
+            if not session.hibernated and now - session.last_active >= self.idle_seconds:
+                session.hibernate()
+                hibernated += 1
+        return hibernated
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(max(self.idle_seconds / 2, 0.5))
+            self.sweep()
+
+    # connections
+
+    async def handle(self, reader, writer):
+        # [session, color] of the game this connection plays in
+        seat = [None, None]
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode('ascii', 'replace').split()
+                if not words:
+                    continue
+                if words[0] == 'QUIT':
+                    break
+                reply = self.command(seat, writer, words)
+                if reply is not None:
+                    writer.write((reply + '\n').encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._leave(seat)
+            writer.close()
+
+    def command(self, seat, writer, words):
+        """Apply one client command, returning the reply for that client only (or None)"""
+        name, args = words[0], words[1:]
+        session, color = seat
+        if name == 'NEW':
+            self._leave(seat)
+            self.next_id += 1
+            session = Session(self.next_id, self.bitboard)
+            session.players['white'] = writer
+            self.sessions[session.id] = session
+            seat[:] = [session, 'white']
+            return f'GAME {session.id} white'
+        if name == 'JOIN':
+            joined = self.sessions.get(int(args[0])) if args and args[0].isdigit() else None
+            if joined is None or joined.players['black'] is not None or joined is session:
+                return 'ERROR no such game waiting for a player'
+            self._leave(seat)
+            joined.players['black'] = writer
+            seat[:] = [joined, 'black']
+            writer.write(f'GAME {joined.id} black\n'.encode())
+            joined.broadcast(f'START {joined.to_fen()}')
+            return None
+        if name == 'MOVE':
+            if session is None:
+                return 'ERROR not in a game'
+            if not args:
+                return 'ERROR unreadable move'
+            return self._move(session, color, args[0])
+        if name == 'STATE':
+            if session is None:
+                return 'ERROR not in a game'
+            return f'STATE {session.to_fen()}'
+        if name == 'STATS':
+            hibernated = sum(session.hibernated for session in self.sessions.values())
+            return (f'STATS games={len(self.sessions)} live={len(self.sessions) - hibernated} '
+                    f'hibernated={hibernated} moves={self.moves}')
+        return f'ERROR unknown command {name}'
+
+    def _move(self, session, color, text):
+        if session.players['black'] is None:
+            return 'ERROR waiting for an opponent'
+        try:
+            initial_row, initial_col, final_row, final_col = parse_move(text)
+        except ValueError as error:
+            return f'ERROR {error}'
+        game = session.wake()
+        if game.game_over:
+            return 'ERROR game over'
+        if game.next_player != color:
+            return 'ERROR not your turn'
+        for move in game.legal_moves(initial_row, initial_col):
+            if move.final.row == final_row and move.final.col == final_col:
+                break
+        else:
+            return 'ERROR illegal move'
+        session.play_move(game.board.squares[initial_row][initial_col].piece, move)
+        self.moves += 1
+        session.broadcast(f'MOVED {text} {game.board.to_fen()}')
+        if game.game_over:
+            session.broadcast(f'OVER {game.winner}')
+        return None
+
+    def _leave(self, seat):
+        session, color = seat
+        if session is None:
+            return
+        session.players[color] = None
+        session.broadcast('LEFT')
+        # the game ends with its last player
+        if session.players['white'] is None and session.players['black'] is None:
+            self.sessions.pop(session.id, None)
+        seat[:] = [None, None]
+
+async def serve(host, port, idle_seconds, bitboard):
+    server = GameServer(idle_seconds, bitboard)
+    await server.start(host, port)
+    # the load generator waits for this line
+    print(f'listening on {host}:{server.port}', flush=True)
+    await server.server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host player vs player games over TCP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help='0 picks a free port')
+    parser.add_argument('--idle', type=float, default=IDLE_SECONDS, help='seconds before an idle game is hibernated')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard engine')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.idle, args.bitboard))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
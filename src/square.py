@@ -10,16 +10,49 @@ class Square:
                  6 : 'g', 
                  7 : 'h'}
 
+    __slots__ = ('row', 'col', 'board', '_piece')
+
     # square has its row & col along with designated piece
-    def __init__(self, row, col, piece=None):
+    # board squares also keep a reference to their board so it can follow piece changes
+    def __init__(self, row, col, piece=None, board=None):
         self.row = row
         self.col = col
-        self.piece = piece
-        self.alphacol = self.ALPHACOLS[col]
+        self.board = board
+        self._piece = None
+        # an empty square has nothing to report to the board
+        if piece is not None:
+            self.piece = piece
+
+    @property
+    def alphacol(self):
+        return self.ALPHACOLS[self.col]
+
+    @property
+    def piece(self):
+        return self._piece
+
+    @piece.setter
+    def piece(self, piece):
+        # let the owning board update any state derived from the squares
+        if self.board is not None:
+            self.board._piece_changed(self, self._piece, piece)
+        self._piece = piece
+
+    def place(self, piece):
+        """Put piece on the square without telling the board (bulk loads rebuild its state after)"""
+        self._piece = piece
 
     def __eq__(self, other):
         return self.row == other.row and self.col == other.col
 
+    def __hash__(self):
+        return self.row * 8 + self.col
+
+    @staticmethod
+    def at(row, col):
+        """The shared, read-only square for (row, col)"""
+        return SQUARES[row * 8 + col]
+
     def has_piece(self):
         return self.piece != None
     
@@ -54,4 +87,15 @@ class Square:
                  5 : 'f', 
                  6 : 'g', 
                  7 : 'h'}
-        return ALPHACOLS[col]
\ No newline at end of file
+        return ALPHACOLS[col]
+
+class FixedSquare(Square):
+
+    __slots__ = ()
+
+    # a coordinate-only square shared by every Move that starts or ends on it:
+    # it belongs to no board and can never hold a piece
+    piece = property(Square.piece.fget)
+
+# the 64 interned squares, indexed by row * 8 + col
+SQUARES = tuple(FixedSquare(row, col) for row in range(8) for col in range(8))
@@ -0,0 +1,105 @@
+import multiprocessing
+import queue
+
+from board import Board
+from engine import Engine
+
+# request kinds: the computer's move, a hint for the player, an evaluation of the position
+MOVE, HINT, ANALYSIS = 'move', 'hint', 'analysis'
+
+class EngineResult:
+
+    # answer to one request; move is (initial row, initial col, final row, final col) or None
+    def __init__(self, request_id, kind, move, score, depth, nodes, nps):
+        self.request_id = request_id
+        self.kind = kind
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.nps = nps
+
+def _serve(requests, results, generation):
+    '''
+        Worker process loop: search each request and put an EngineResult on results.
+        A request is dropped, or its search stopped, as soon as the generation moves on.
+    '''
+    engine = Engine()
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, request_generation, kind, fen, time_ms = request
+        if request_generation != generation.value:
+            continue
+
+        board = Board.from_fen(fen)
+        stale = lambda: generation.value != request_generation
+        result = engine.search(board, board.next_player, time_ms, stop=stale)
+        if stale():
+            continue
+        if result is None:
+            results.put(EngineResult(request_id, kind, None, None, 0, 0, 0))
+        else:
+            move = result.move
+            results.put(EngineResult(request_id, kind,
+                                     (move.initial.row, move.initial.col, move.final.row, move.final.col),
+                                     result.score, result.depth, result.nodes, result.nps))
+
+class EngineWorker:
+
+    '''
+        Runs engine searches in a separate process so the main loop never blocks.
+        Positions are sent as FEN strings and results come back through a queue
+        that the main loop polls once per frame.
+        cancel() makes every outstanding request stale: the worker skips queued
+        ones, stops the running search, and poll() never returns their results.
+    '''
+
+    def __init__(self):
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.generation = multiprocessing.Value('i', 0)
+        self.process = multiprocessing.Process(
+            target=_serve, args=(self.requests, self.results, self.generation), daemon=True)
+        self.process.start()
+        self.next_id = 0
+        # request id -> kind, for requests still waiting for an answer
+        self.pending = {}
+
+    @property
+    def busy(self):
+        return bool(self.pending)
+
+    def submit(self, kind, fen, time_ms=1000):
+        """Queue a search for the side to move in the FEN position, returning the request id"""
+        self.next_id += 1
+        self.pending[self.next_id] = kind
+        self.requests.put((self.next_id, self.generation.value, kind, fen, time_ms))
+        return self.next_id
+
+    def cancel(self):
+        """Drop every outstanding request, e.g. because the position changed"""
+        with self.generation.get_lock():
+            self.generation.value += 1
+        self.pending.clear()
+
+    def poll(self):
+        """Results that arrived since the last call, without blocking"""
+        arrived = []
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # answers to cancelled requests may still be in flight
+            if self.pending.pop(result.request_id, None) is not None:
+                arrived.append(result)
+        return arrived
+
+    def close(self):
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
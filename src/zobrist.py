@@ -0,0 +1,73 @@
+import random
+
+from const import *
+
+# fixed seed so position keys are stable between runs (stored keys stay valid)
+_random = random.Random(0x5EED)
+
+def _key():
+    return _random.getrandbits(64)
+
+# one key per piece type, color and square (square index = row * 8 + col)
+PIECE_KEYS = {
+    (name, color): [_key() for sq in range(ROWS * COLS)]
+    for color in ('white', 'black')
+    for name in ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+}
+
+# xor'd in while black is to move
+SIDE_KEY = _key()
+
+# castling right bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# one key per combination of castling rights
+CASTLING_KEYS = [_key() for rights in range(16)]
+
+# one key per en passant file
+EN_PASSANT_KEYS = [_key() for col in range(COLS)]
+
+# rights kept when a move starts or ends on a square -
+# moving a king or rook from (or capturing on) its home square loses the matching rights
+CASTLING_MASKS = [15] * (ROWS * COLS)
+CASTLING_MASKS[7 * COLS + 4] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[7 * COLS + 7] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASKS[7 * COLS + 0] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASKS[0 * COLS + 4] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASKS[0 * COLS + 7] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASKS[0 * COLS + 0] = 15 & ~BLACK_QUEENSIDE
+
+def piece_key(piece, row, col):
+    return PIECE_KEYS[(piece.name, piece.color)][row * COLS + col]
+
+def castling_rights(board):
+    """Castling rights implied by the moved flags of the kings and rooks on their home squares"""
+    rights = 0
+    for row, color, kingside, queenside in ((7, 'white', WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                            (0, 'black', BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+        king = board.squares[row][4].piece
+        if king is None or king.name != 'king' or king.color != color or king.moved:
+            continue
+        for col, right in ((7, kingside), (0, queenside)):
+            rook = board.squares[row][col].piece
+            if rook is not None and rook.name == 'rook' and rook.color == color and not rook.moved:
+                rights |= right
+    return rights
+
+def hash_board(board):
+    """Compute the Zobrist key of a board from scratch"""
+    key = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = board.squares[row][col].piece
+            if piece is not None:
+                key ^= piece_key(piece, row, col)
+    if board.next_player == 'black':
+        key ^= SIDE_KEY
+    key ^= CASTLING_KEYS[board.castling_rights]
+    if board.en_passant_target is not None:
+        key ^= EN_PASSANT_KEYS[board.en_passant_target.col]
+    return key
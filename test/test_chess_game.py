@@ -6,19 +6,38 @@ Tests various scenarios including moves, checks, checkmate, castling, and invali
 
 import sys
 import os
+import time
+import subprocess
+import asyncio
+import random
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 import pygame
 from game import Game
-from board import Board
+from board import Board, START_FEN
+from bitboard import BitBoard
 from square import Square
-from move import Move
+from move import *
+from zobrist import hash_board
+from renderer import Renderer, coalesce_motion
+from latency import LatencyProbe
+from engine import Engine, MATE, CHECK_INTERVAL
+from worker import EngineWorker, HINT, ANALYSIS
+from parallel import ParallelSearch
+from server import GameServer, Session, SESSION_CACHE_SIZE
+import pgn
+import perft
 from piece import King, Queen, Rook, Bishop, Knight, Pawn
 
 class ChessGameTester:
-    def __init__(self):
+    def __init__(self, bitboard=False):
         pygame.init()
         self.test_results = []
+        self.bitboard = bitboard
+    
+    def new_game(self):
+        """Create a fresh game on the board engine under test"""
+        return Game(bitboard=self.bitboard)
         
     def log_test(self, test_name, passed, details=""):
         """Log test results"""
@@ -33,7 +52,7 @@ class ChessGameTester:
         """Test basic pawn movements"""
         print("\n=== Testing Basic Pawn Moves ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Test white pawn double move (white's turn)
         piece = game.board.squares[6][0].piece
@@ -51,7 +70,7 @@ class ChessGameTester:
         self.log_test("Black Pawn Double Move", is_valid, f"Valid: {is_valid}")
         
         # Test invalid pawn move (blocked by piece)
-        game = Game()  # Reset for clean test
+        game = self.new_game()  # Reset for clean test
         game.board.squares[5][1].piece = Pawn('black')  # Block the path
         piece = game.board.squares[6][1].piece
         game.board.calc_moves(piece, 6, 1)
@@ -63,7 +82,7 @@ class ChessGameTester:
         """Test knight movements"""
         print("\n=== Testing Knight Moves ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Test valid knight move
         piece = game.board.squares[7][1].piece
@@ -83,7 +102,7 @@ class ChessGameTester:
         """Test bishop movements"""
         print("\n=== Testing Bishop Moves ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Test invalid bishop move (blocked by pawn)
         piece = game.board.squares[7][2].piece
@@ -104,7 +123,7 @@ class ChessGameTester:
         """Test check detection"""
         print("\n=== Testing Check Detection ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Set up a check scenario
         # Clear some pieces to create check
@@ -128,7 +147,7 @@ class ChessGameTester:
         """Test checkmate detection"""
         print("\n=== Testing Checkmate Detection ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Set up Fool's Mate scenario
         # Clear pieces for Fool's Mate
@@ -154,7 +173,7 @@ class ChessGameTester:
         """Test castling moves"""
         print("\n=== Testing Castling ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Clear path for king-side castling
         game.board.squares[7][1].piece = None  # Remove white knight
@@ -181,7 +200,7 @@ class ChessGameTester:
         """Test castling restrictions"""
         print("\n=== Testing Castling Restrictions ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Clear path for castling
         game.board.squares[7][1].piece = None
@@ -199,7 +218,7 @@ class ChessGameTester:
         self.log_test("Castling After King Moved", not is_valid, f"Should be invalid: {is_valid}")
         
         # Reset for next test
-        game = Game()
+        game = self.new_game()
         game.board.squares[7][1].piece = None
         game.board.squares[7][2].piece = None
         game.board.squares[7][5].piece = None
@@ -215,7 +234,7 @@ class ChessGameTester:
         self.log_test("Castling After Rook Moved", not is_valid, f"Should be invalid: {is_valid}")
         
         # Reset for next test
-        game = Game()
+        game = self.new_game()
         game.board.squares[7][1].piece = None
         game.board.squares[7][2].piece = None
         game.board.squares[7][6].piece = None
@@ -231,7 +250,7 @@ class ChessGameTester:
         """Test en passant capture"""
         print("\n=== Testing En Passant ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Set up en passant scenario
         game.board.squares[6][0].piece = None  # Remove white pawn
@@ -255,7 +274,7 @@ class ChessGameTester:
         """Test move validation rules"""
         print("\n=== Testing Move Validation ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Test moving through pieces
         piece = game.board.squares[7][0].piece  # White rook
@@ -277,7 +296,7 @@ class ChessGameTester:
         """Test game over detection"""
         print("\n=== Testing Game Over Detection ===")
         
-        game = Game()
+        game = self.new_game()
         
         # Set up checkmate position
         game.board.squares[6][5].piece = None
@@ -298,6 +317,771 @@ class ChessGameTester:
         self.log_test("Winner Detection", winner == 'black', f"Winner should be black: {winner}")
         self.log_test("Popup Display", show_popup, f"Popup should be shown: {show_popup}")
     
+    def test_bitboard_parity(self):
+        """Test that the bitboard engine agrees with the square-based board"""
+        print("\n=== Testing Bitboard Parity ===")
+        
+        # Italian opening into a check on the white king
+        moves = [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)),
+                 ((7, 5), (4, 2)), ((0, 5), (3, 2)), ((4, 2), (1, 5)), ((0, 4), (1, 5)),
+                 ((6, 3), (4, 3)), ((3, 2), (6, 5))]
+        boards = [Board(), BitBoard()]
+        same_moves = True
+        same_status = True
+        color = 'white'
+        for (from_row, from_col), (to_row, to_col) in moves:
+            for board in boards:
+                piece = board.squares[from_row][from_col].piece
+                board.move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+            color = 'black' if color == 'white' else 'white'
+            
+            # compare legal moves of every piece of the side to move
+            for row in range(8):
+                for col in range(8):
+                    targets = []
+                    for board in boards:
+                        piece = board.squares[row][col].piece
+                        if piece is None or piece.color != color:
+                            continue
+                        piece.clear_moves()
+                        board.calc_moves(piece, row, col)
+                        targets.append(sorted((m.final.row, m.final.col) for m in piece.moves))
+                    if targets and targets[0] != targets[1]:
+                        same_moves = False
+            
+            status = [(b.in_check(color), b.is_checkmate(color), b.is_stalemate(color)) for b in boards]
+            if status[0] != status[1]:
+                same_status = False
+        
+        self.log_test("Bitboard Move Parity", same_moves, f"Same legal moves: {same_moves}")
+        self.log_test("Bitboard Status Parity", same_status, f"Same check status: {same_status}")
+        self.log_test("Bitboard Check After Bxf2+", boards[1].in_check('white'),
+                      f"White should be in check: {boards[1].in_check('white')}")
+    
+    def test_bitboard_codes(self):
+        """Test that the bitboard engine generates the same codes as the board (speed is bench_board.py --gate)"""
+        print("\n=== Testing Bitboard Codes ===")
+        
+        engines = []
+        for board_class in (Board, BitBoard):
+            engines.append([board_class.from_fen(fen) for name, fen, counts in perft.POSITIONS])
+        same = all(set(a.legal_codes(a.next_player)) == set(b.legal_codes(b.next_player))
+                   for a, b in zip(*engines))
+        self.log_test("Bitboard Code Parity", same, f"Same codes on the perft positions: {same}")
+    
+    def test_zobrist_hashing(self):
+        """Test incremental position hashing"""
+        print("\n=== Testing Zobrist Hashing ===")
+        
+        def play(board, moves):
+            for (from_row, from_col), (to_row, to_col) in moves:
+                piece = board.squares[from_row][from_col].piece
+                board.move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+        
+        # same position reached through two move orders
+        game1 = self.new_game()
+        game2 = self.new_game()
+        play(game1.board, [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((7, 1), (5, 2)), ((0, 1), (2, 2))])
+        play(game2.board, [((7, 1), (5, 2)), ((0, 1), (2, 2)), ((7, 6), (5, 5)), ((0, 6), (2, 5))])
+        same = game1.board.hash == game2.board.hash
+        self.log_test("Transposition Same Key", same, f"Keys equal: {same}")
+        
+        # incremental key matches a full rescan after castling, en passant and promotion
+        game = self.new_game()
+        board = game.board
+        play(board, [((6, 4), (4, 4)), ((1, 0), (3, 0)), ((7, 5), (4, 2)), ((3, 0), (4, 0)),
+                     ((7, 6), (5, 5)), ((1, 7), (2, 7)), ((7, 4), (7, 6)), ((2, 7), (3, 7)),
+                     ((6, 1), (4, 1)), ((4, 0), (5, 1)), ((6, 7), (5, 7)), ((5, 1), (6, 0)),
+                     ((5, 7), (4, 7)), ((6, 0), (7, 1))])
+        promoted = isinstance(board.squares[7][1].piece, Queen) and board.squares[4][1].isempty()
+        matches = promoted and board.hash == hash_board(board)
+        self.log_test("Incremental Key Matches Rescan", matches, f"Keys equal: {matches}")
+        
+        # losing castling rights changes the key even with identical placement
+        game1 = self.new_game()
+        game2 = self.new_game()
+        knights = [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))]
+        play(game1.board, knights + knights)
+        play(game2.board, [((7, 6), (5, 5)), ((0, 6), (2, 5)), ((7, 7), (7, 6)), ((2, 5), (0, 6)),
+                           ((7, 6), (7, 7)), ((0, 6), (2, 5)), ((5, 5), (7, 6)), ((2, 5), (0, 6))])
+        lost = game1.board.hash != game2.board.hash and game2.board.castling_rights == 0b1110
+        self.log_test("Castling Rights In Key", lost, f"Keys differ: {lost}")
+    
+    def test_position_cache(self):
+        """Test the legal move and game status cache"""
+        print("\n=== Testing Position Cache ===")
+        
+        game = self.new_game()
+        cache = game.board.cache
+        
+        # repeated frames read the same entry
+        misses = cache.misses
+        for _ in range(60):
+            game.check_game_over()
+        cached = cache.misses == misses and cache.hits >= 60
+        self.log_test("Game Over Check Cached", cached, f"Hits: {cache.hits}, misses: {cache.misses}")
+        
+        # legal moves of the starting position
+        count = len(game.board.position_info('white').moves)
+        self.log_test("Cached Legal Moves", count == 20, f"White should have 20 moves: {count}")
+        moves = game.legal_moves(7, 6)
+        self.log_test("Cached Moves From Square", len(moves) == 2, f"Knight should have 2 moves: {len(moves)}")
+        
+        # the cache stays bounded
+        cache.maxsize = 2
+        game.board.position_info('black')
+        game.board.squares[6][4].piece = None
+        game.board.position_info('white')
+        self.log_test("Cache Bounded", len(cache) == 2, f"Entries: {len(cache)}")
+    
+    def test_make_unmake(self):
+        """Test that unmake_move restores the position exactly"""
+        print("\n=== Testing Make/Unmake Move ===")
+        
+        game = self.new_game()
+        board = game.board
+        before = [[(sq.piece, sq.piece.moved if sq.piece else None) for sq in row] for row in board.squares]
+        key = board.hash
+        
+        # castling, en passant and a capturing promotion
+        moves = [((6, 4), (4, 4)), ((1, 0), (3, 0)), ((7, 5), (4, 2)), ((3, 0), (4, 0)),
+                 ((7, 6), (5, 5)), ((1, 7), (2, 7)), ((7, 4), (7, 6)), ((2, 7), (3, 7)),
+                 ((6, 1), (4, 1)), ((4, 0), (5, 1)), ((6, 7), (5, 7)), ((5, 1), (6, 0)),
+                 ((5, 7), (4, 7)), ((6, 0), (7, 1))]
+        for (from_row, from_col), (to_row, to_col) in moves:
+            piece = board.squares[from_row][from_col].piece
+            board.make_move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+        promoted = isinstance(board.squares[7][1].piece, Queen)
+        self.log_test("Make Move Promotion", promoted, f"Queen on b1: {promoted}")
+        
+        for _ in moves:
+            board.unmake_move()
+        after = [[(sq.piece, sq.piece.moved if sq.piece else None) for sq in row] for row in board.squares]
+        restored = before == after and board.hash == key and board.en_passant_target is None
+        self.log_test("Unmake Restores Position", restored, f"Restored: {restored}")
+        
+        # en passant that exposes the king is rejected
+        game = self.new_game()
+        board = game.board
+        for row in range(8):
+            for col in range(8):
+                board.squares[row][col].piece = None
+        board.squares[3][0].piece = King('white')
+        board.squares[3][1].piece = Pawn('white')
+        board.squares[3][2].piece = Pawn('black')
+        board.squares[3][7].piece = Rook('black')
+        board.squares[0][4].piece = King('black')
+        board.en_passant_target = Square(2, 2)
+        piece = board.squares[3][1].piece
+        piece.moved = True
+        board.calc_moves(piece, 3, 1)
+        is_valid = Move(Square(3, 1), Square(2, 2)) in piece.moves
+        self.log_test("En Passant Exposing King", not is_valid, f"Should be invalid: {is_valid}")
+    
+    def test_move_codes(self):
+        """Test move codes, interned squares and constant-time legality checks"""
+        print("\n=== Testing Move Codes ===")
+        
+        board = (BitBoard if self.bitboard else Board).from_fen(
+            'r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1')
+        codes = board.legal_codes('white')
+        moves = [Move.from_code(code) for code in codes]
+        self.log_test("Move Codes Decode", sorted(codes) == sorted(m.code for m in board.position_info('white').moves)
+                     and all(move_from(m.code) == m.initial.row * 8 + m.initial.col for m in moves),
+                     f"Codes: {len(codes)}")
+        
+        flags = {(m.initial.row, m.initial.col, m.final.row, m.final.col): m.code for m in moves}
+        special = (flags[(3, 4, 2, 3)] & EN_PASSANT and flags[(3, 4, 2, 3)] & CAPTURE and
+                   flags[(7, 4, 7, 6)] & CASTLING and flags[(7, 4, 7, 2)] & CASTLING and
+                   flags[(1, 1, 0, 1)] & PROMOTE_QUEEN and flags[(1, 1, 0, 0)] & CAPTURE and
+                   flags[(7, 0, 0, 0)] & CAPTURE and not flags[(3, 4, 2, 4)] & ~ROUTE_MASK)
+        self.log_test("Move Code Flags", bool(special), f"Moves: {len(flags)}")
+        
+        shared = all(move.initial is Square.at(move.initial.row, move.initial.col) for move in moves)
+        try:
+            Square.at(0, 0).piece = Queen('white')
+            frozen = False
+        except AttributeError:
+            frozen = Square.at(0, 0).piece is None
+        self.log_test("Squares Interned And Read-Only", shared and frozen, f"Shared: {shared}, frozen: {frozen}")
+        
+        king = board.squares[7][4].piece
+        legal = (board.valid_move(king, Move(Square(7, 4), Square(7, 6))) and
+                 not board.valid_move(king, Move(Square(7, 4), Square(5, 4))) and
+                 not board.valid_move(board.squares[7][0].piece, Move(Square(7, 4), Square(7, 5))) and
+                 Move(Square(3, 4), Square(2, 3)) in set(moves))
+        self.log_test("Constant-Time Legality", legal, f"Legal: {legal}")
+    
+    def test_slotted_objects(self):
+        """Test that the rules objects are slotted and hold no rendering data"""
+        print("\n=== Testing Slotted Objects ===")
+        
+        game = self.new_game()
+        square = game.board.squares[7][3]
+        piece = square.piece
+        move = game.board.position_info('white').moves[0]
+        slotted = not any(hasattr(obj, '__dict__') for obj in (square, piece, move, game.board.squares[6][0].piece))
+        self.log_test("Square, Move And Piece Slotted", slotted, f"Slotted: {slotted}")
+        
+        # the type and color are class data shared by every piece of that type and color,
+        # moved is the piece's own
+        other = game.board.squares[0][3].piece
+        twin = Queen('white')
+        shared = (type(piece) is type(twin) is Queen.colored['white'] and type(other) is Queen.colored['black'] and
+                  piece.kind is other.kind is Queen and piece.value == -other.value == 9.0 and
+                  piece.color == 'white' and other.color == 'black' and
+                  all('color' not in slots and 'value' not in slots
+                      for slots in (getattr(cls, '__slots__', ()) for cls in type(piece).__mro__)) and
+                  not hasattr(piece, 'texture') and not hasattr(piece, 'texture_rect') and square.alphacol == 'd')
+        piece.moved = True
+        self.log_test("Piece Identity Shared", shared and not other.moved and not twin.moved,
+                     f"Shared: {shared}, classes: {type(piece).__name__}, {type(other).__name__}")
+    
+    def test_attack_maps(self):
+        """Test that the incremental attack maps match a full recomputation"""
+        print("\n=== Testing Attack Maps ===")
+        
+        # en passant, castling, a capturing promotion, then all taken back
+        board = (BitBoard if self.bitboard else Board).from_fen('r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1')
+        moves = [((3, 4), (2, 3)), ((0, 4), (0, 6)), ((1, 1), (0, 0))]
+        in_step = board.attacks == board.recompute_attacks()
+        for (from_row, from_col), (to_row, to_col) in moves:
+            piece = board.squares[from_row][from_col].piece
+            board.make_move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+            in_step = in_step and board.attacks == board.recompute_attacks()
+        # the new queen on a8 and the rook on f8 both attack b8 through the empty c8-e8
+        counts = (board.attack_count(0, 1, 'white'), board.attack_count(0, 1, 'black'))
+        for _ in moves:
+            board.unmake_move()
+            in_step = in_step and board.attacks == board.recompute_attacks()
+        self.log_test("Attack Maps In Step", in_step, f"In step: {in_step}")
+        self.log_test("Attack Counts", counts == (1, 1), f"b8 white: {counts[0]}, black: {counts[1]}")
+    
+    def test_lazy_legal_moves(self):
+        """Test the legal move generator, the early-out move test and the game status"""
+        print("\n=== Testing Lazy Legal Moves ===")
+        
+        board_class = BitBoard if self.bitboard else Board
+        board = board_class()
+        generated = list(board.iter_legal_moves('white'))
+        same = set(generated) == set(board.position_info('white').moves) and len(generated) == 20
+        self.log_test("Generator Yields Legal Moves", same, f"Moves: {len(generated)}")
+        
+        # fool's mate, a stalemate and an ordinary position
+        statuses = [board_class.from_fen(fen).game_status(color) for fen, color in (
+            ('rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3', 'white'),
+            ('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', 'black'),
+            ('4k3/8/8/8/8/8/8/4K2R w K - 0 1', 'white'))]
+        self.log_test("Game Status", statuses == ['checkmate', 'stalemate', None], f"Statuses: {statuses}")
+        self.log_test("Any Legal Move", board.any_legal_move('black') and not board_class.from_fen(
+            '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1').any_legal_move('black'), "First move found / none")
+    
+    def test_pure_queries(self):
+        """Test that move and status queries leave the pieces and the dragged moves alone"""
+        print("\n=== Testing Pure Queries ===")
+        
+        game = self.new_game()
+        board = game.board
+        piece = board.squares[7][6].piece
+        game.dragger.drag_piece(piece, game.legal_moves(7, 6))
+        highlighted = list(game.dragger.moves)
+        
+        board.is_checkmate('white')
+        board.is_stalemate('white')
+        board.has_valid_moves('black')
+        game.has_any_valid_moves()
+        moves = board.piece_moves(piece, 7, 6)
+        untouched = all(p.moves == () for color in ('white', 'black') for _, p in board.pieces(color))
+        self.log_test("Queries Leave Pieces Alone", untouched, f"Untouched: {untouched}")
+        self.log_test("Dragged Moves Kept", game.dragger.moves == highlighted and len(highlighted) == 2 and
+                      set(moves) == set(highlighted), f"Highlighted: {len(game.dragger.moves)}")
+    
+    def test_turn_move_table(self):
+        """Test that each turn generates its legal moves once and picks pieces up by lookup"""
+        print("\n=== Testing Turn Move Table ===")
+        
+        game = self.new_game()
+        cache = game.board.cache
+        misses = cache.misses
+        game.play_move(game.board.squares[6][4].piece, Move(Square(6, 4), Square(4, 4)))
+        knight = game.legal_moves(0, 6)
+        looked_up = knight is game.legal_moves(0, 6) and len(knight) == 2 and game.legal_moves(4, 4) == ()
+        self.log_test("One Generation Per Turn", cache.misses == misses + 1, f"Misses: {cache.misses - misses}")
+        self.log_test("Moves Looked Up By Origin", looked_up, f"Knight moves: {len(knight)}")
+    
+    def test_piece_lists(self):
+        """Test the per-color piece lists and tracked king squares"""
+        print("\n=== Testing Piece Lists ===")
+        
+        game = self.new_game()
+        board = game.board
+        moves = [((6, 4), (4, 4)), ((1, 3), (3, 3)), ((4, 4), (3, 3)), ((0, 3), (3, 3)),
+                 ((7, 6), (5, 5)), ((3, 3), (6, 3)), ((7, 5), (6, 4)), ((6, 3), (6, 4)),
+                 ((7, 4), (6, 4))]
+        for (from_row, from_col), (to_row, to_col) in moves:
+            piece = board.squares[from_row][from_col].piece
+            board.move(piece, Move(Square(from_row, from_col), Square(to_row, to_col)))
+        
+        # piece lists match a scan of the squares
+        in_sync = True
+        for color in ('white', 'black'):
+            scanned = {(row, col): sq.piece for row in range(8) for col, sq in enumerate(board.squares[row])
+                       if sq.has_piece() and sq.piece.color == color}
+            if scanned != dict(board.pieces(color)):
+                in_sync = False
+        self.log_test("Piece Lists In Sync", in_sync, f"In sync: {in_sync}")
+        self.log_test("Piece Count After Captures", len(board.pieces('white')) == 13 and len(board.pieces('black')) == 14,
+                      f"White: {len(board.pieces('white'))}, black: {len(board.pieces('black'))}")
+        
+        # king square follows the king
+        king_pos = board.king_squares['white']
+        self.log_test("King Square Tracked", king_pos == (6, 4), f"White king at: {king_pos}")
+    
+    def test_perft(self):
+        """Test move generation against reference perft counts"""
+        print("\n=== Testing Perft ===")
+        
+        failures = perft.run_suite(BitBoard if self.bitboard else Board, 2)
+        self.log_test("Perft Reference Counts", not failures, f"Mismatches: {failures}")
+    
+    def test_texture_cache(self):
+        """Test that drawing pieces and dragging reuse the cached textures"""
+        print("\n=== Testing Texture Cache ===")
+        
+        game = self.new_game()
+        surface = pygame.Surface((800, 800))
+        renderer = Renderer(game, surface)
+        # attaching the presentation loads the textures, once
+        game.config
+        loads = []
+        original_load = pygame.image.load
+        pygame.image.load = lambda *args: loads.append(args) or original_load(*args)
+        try:
+            renderer.show_pieces(surface)
+            game.dragger.drag_piece(game.board.squares[6][4].piece)
+            game.dragger.update_mouse((400, 400))
+            game.dragger.update_blit(surface)
+            game.reset()
+            renderer.show_pieces(surface)
+        finally:
+            pygame.image.load = original_load
+        self.log_test("No Image Loads While Rendering", not loads, f"Loads: {len(loads)}")
+        
+        piece = game.board.squares[7][3].piece
+        shared = game.config.get_texture(piece, 80) is game.config.get_texture(piece, 80)
+        self.log_test("Textures Shared Per Piece And Size", shared, f"Shared: {shared}")
+    
+    def test_background_cache(self):
+        """Test that the board background is composited once per theme and flip state"""
+        print("\n=== Testing Background Cache ===")
+        
+        game = self.new_game()
+        surface = pygame.Surface((800, 800))
+        renderer = Renderer(game, surface)
+        renderer.show_bg(surface)
+        first = renderer.background()
+        renderer.show_bg(surface)
+        reused = renderer.background() is first and len(renderer.backgrounds) == 1
+        self.log_test("Background Reused Between Frames", reused, f"Backgrounds built: {len(renderer.backgrounds)}")
+        
+        game.toggle_board_flip()
+        flipped = renderer.background()
+        game.toggle_board_flip()
+        unflipped = renderer.background()
+        self.log_test("Background Per Flip State", flipped is not first and unflipped is first,
+                     f"Flipped rebuilt: {flipped is not first}, unflipped reused: {unflipped is first}")
+        
+        game.change_theme()
+        themed = renderer.background()
+        self.log_test("Background Per Theme", themed is not first and len(renderer.backgrounds) == 3,
+                     f"Backgrounds built: {len(renderer.backgrounds)}")
+    
+    def test_headless_game(self):
+        """Test that the rules and game flow run without importing pygame"""
+        print("\n=== Testing Headless Game ===")
+        
+        src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+        script = (
+            "import sys\n"
+            f"sys.path.insert(0, {src!r})\n"
+            "from game import Game\n"
+            f"game = Game(bitboard={self.bitboard})\n"
+            "for row, col, final_row in ((6, 5, 5), (1, 4, 3), (6, 6, 4), (0, 3, 4)):\n"
+            "    move = next(m for m in game.legal_moves(row, col) if m.final.row == final_row)\n"
+            "    game.play_move(game.board.squares[row][col].piece, move)\n"
+            "print(game.winner, game._config is None, 'pygame' in sys.modules)\n"
+        )
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True).stdout.split()
+        self.log_test("Fool's Mate Played Headless", output[:1] == ['black'], f"Output: {output}")
+        self.log_test("No Presentation Attached", output[1:] == ['True', 'False'], f"Output: {output}")
+        
+        game = self.new_game()
+        self.log_test("Presentation Attached On Use", game._config is None and game.dragger.config is game.config,
+                     f"Config: {game._config}")
+    
+    def test_dirty_rendering(self):
+        """Test that the renderer repaints only changed squares and matches a full repaint"""
+        print("\n=== Testing Dirty Rendering ===")
+        
+        game = self.new_game()
+        surface = pygame.Surface((800, 800))
+        renderer = Renderer(game, surface)
+        
+        full = renderer.draw()
+        idle = renderer.draw()
+        self.log_test("First Frame Full Repaint", full == [surface.get_rect()], f"Rects: {len(full)}")
+        self.log_test("Unchanged Frame Draws Nothing", idle == [], f"Rects: {len(idle)}")
+        
+        game.set_hover(4, 4)
+        renderer.draw()
+        game.set_hover(4, 5)
+        hover = renderer.draw()
+        self.log_test("Hover Repaints Two Squares", len(hover) == 2, f"Rects: {len(hover)}")
+        
+        piece = game.board.squares[6][4].piece
+        game.dragger.drag_piece(piece, game.legal_moves(6, 4))
+        game.dragger.update_mouse((440, 640))
+        renderer.draw()
+        game.dragger.update_mouse((450, 520))
+        drag = renderer.draw()
+        self.log_test("Drag Repaints Trail Only", 0 < len(drag) < 16, f"Rects: {len(drag)}")
+        
+        game.dragger.undrag_piece()
+        game.board.move(piece, Move(Square(6, 4), Square(4, 4)))
+        game.next_turn()
+        renderer.draw()
+        
+        expected = pygame.Surface((800, 800))
+        Renderer(game, expected).draw()
+        same = pygame.image.tostring(surface, 'RGB') == pygame.image.tostring(expected, 'RGB')
+        self.log_test("Incremental Frame Matches Full Repaint", same, f"Identical: {same}")
+    
+    def test_input_latency(self):
+        """Test mouse motion coalescing and the input latency probe"""
+        print("\n=== Testing Input Latency ===")
+        
+        def motion(x):
+            return pygame.event.Event(pygame.MOUSEMOTION, pos=(x, 0), rel=(0, 0), buttons=(1, 0, 0))
+        events = [motion(1), motion(2), pygame.event.Event(pygame.MOUSEBUTTONUP, pos=(3, 0), button=1),
+                  motion(4), motion(5), motion(6)]
+        kept = [(event.type, event.pos[0]) for event in coalesce_motion(events)]
+        self.log_test("Motion Coalesced To Latest", kept == [(pygame.MOUSEMOTION, 2), (pygame.MOUSEBUTTONUP, 3),
+                                                             (pygame.MOUSEMOTION, 6)], f"Kept: {kept}")
+        
+        # six inputs shown by one frame, then one that changed nothing on screen
+        probe = LatencyProbe()
+        probe.received(events, time.perf_counter() - 0.01)
+        probe.presented([pygame.Rect(0, 0, 100, 100)])
+        probe.received([motion(7)], time.perf_counter())
+        probe.presented([])
+        timed = len(probe.samples) == 6 and probe.dropped == 1 and 0.01 <= probe.percentile(99) < 1
+        self.log_test("Latency Probe Percentiles", timed, probe.report())
+    
+    def test_engine(self):
+        """Test the alpha-beta search on tactical positions"""
+        print("\n=== Testing Engine ===")
+        
+        board_class = BitBoard if self.bitboard else Board
+        engine = Engine()
+        
+        # back rank mate in one
+        board = board_class.from_fen('6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1')
+        color = board.next_player
+        hash_before = board.hash
+        result = engine.search(board, color, time_ms=5000, max_depth=3)
+        mate = perft.move_name(result.move) == 'a1a8' and result.score >= MATE - 64
+        self.log_test("Engine Finds Mate In One", mate, f"Move: {perft.move_name(result.move)}, score: {result.score}")
+        self.log_test("Engine Leaves Board Unchanged", board.hash == hash_before and not board.undo_stack,
+                     f"Undo stack: {len(board.undo_stack)}")
+        
+        # undefended queen
+        board = board_class.from_fen('4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1')
+        color = board.next_player
+        result = engine.search(board, color, time_ms=5000, max_depth=2)
+        self.log_test("Engine Wins Hanging Queen", perft.move_name(result.move) == 'd2d5',
+                     f"Move: {perft.move_name(result.move)}, score: {result.score}")
+        
+        # search statistics
+        reported = []
+        board = board_class()
+        color = board.next_player
+        result = engine.search(board, color, time_ms=5000, max_depth=3, info=reported.append)
+        stats = [r.depth for r in reported] == [1, 2, 3] and result.nodes > 0 and result.nps > 0
+        self.log_test("Engine Reports Depth And NPS", stats, f"Depths: {[r.depth for r in reported]}, nps: {result.nps}")
+        
+        # the clock and stop() are polled every CHECK_INTERVAL nodes, quiescence included,
+        # and no node is searched once stop() has said so
+        polls = []
+        def stop():
+            polls.append(engine.nodes)
+            return len(polls) >= 20
+        result = engine.search(board, color, time_ms=float('inf'), stop=stop)
+        gaps = [later - earlier for earlier, later in zip(polls, polls[1:])]
+        polled = (result is not None and len(polls) == 20 and max(gaps) <= CHECK_INTERVAL and
+                  engine.nodes == polls[-1])
+        self.log_test("Engine Polls Clock Every Few Nodes", polled,
+                     f"Gaps: {sorted(set(gaps))}, nodes after stop: {engine.nodes - polls[-1]}")
+        
+        # with no time at all the first root move is still searched, so there is a move
+        result = engine.search(board, color, time_ms=0)
+        legal = result is not None and board.position_info(color).is_legal(result.move)
+        self.log_test("Engine Moves Without Time", legal, f"Result: {result}")
+    
+    def test_engine_worker(self):
+        """Test background searches, non-blocking polling and cancellation"""
+        print("\n=== Testing Engine Worker ===")
+        
+        worker = EngineWorker()
+        try:
+            game = self.new_game()
+            game.play_move(game.board.squares[6][4].piece, Move(Square(6, 4), Square(4, 4)))
+            request = worker.submit(HINT, game.board.to_fen(), 300)
+            
+            start = time.perf_counter()
+            results = worker.poll()
+            poll_time = time.perf_counter() - start
+            self.log_test("Poll Does Not Block", poll_time < 0.05 and worker.busy, f"Poll: {poll_time * 1000:.1f}ms")
+            
+            deadline = time.perf_counter() + 10
+            while not results and time.perf_counter() < deadline:
+                time.sleep(0.01)
+                results = worker.poll()
+            hint = results[0] if results else None
+            valid = (hint is not None and hint.request_id == request and hint.move is not None and
+                     hint.move[:2] in [pos for pos, piece in game.board.pieces('black')])
+            self.log_test("Worker Returns Hint", valid, f"Result: {hint.move if hint else None}")
+            
+            # a long search made stale by a new position is stopped and never reported
+            worker.submit(ANALYSIS, game.board.to_fen(), 20000)
+            worker.cancel()
+            request = worker.submit(ANALYSIS, START_FEN, 200)
+            start = time.perf_counter()
+            results = []
+            while not results and time.perf_counter() - start < 10:
+                time.sleep(0.01)
+                results += worker.poll()
+            elapsed = time.perf_counter() - start
+            cancelled = len(results) == 1 and results[0].request_id == request and elapsed < 5
+            self.log_test("Stale Search Cancelled", cancelled,
+                         f"Results: {[r.request_id for r in results]}, waited {elapsed:.1f}s")
+        finally:
+            worker.close()
+    
+    def test_parallel_search(self):
+        """Test that the root-split search is reproducible across worker counts"""
+        print("\n=== Testing Parallel Search ===")
+        
+        # 1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 - white mates with Qxf7
+        fen = 'r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4'
+        results = []
+        for workers in (1, 2):
+            search = ParallelSearch(workers)
+            try:
+                results.append(search.search(fen, 2))
+                if workers == 1:
+                    quiet = search.search(START_FEN, 3)
+            finally:
+                search.close()
+        
+        names = [perft.move_name(result.move) for result in results]
+        self.log_test("Parallel Search Finds Mate", names[0] == 'h5f7' and results[0].score >= MATE - 64,
+                     f"Move: {names[0]}, score: {results[0].score}")
+        same = names[0] == names[1] and results[0].score == results[1].score and results[0].nodes == results[1].nodes
+        self.log_test("Parallel Search Reproducible", same, f"Moves: {names}, nodes: {[r.nodes for r in results]}")
+        
+        # the first root move's score bounds the others: about the work of the sequential search
+        board = Board.from_fen(START_FEN)
+        sequential = Engine().search(board, board.next_player, time_ms=float('inf'), max_depth=3)
+        bounded = abs(quiet.score - sequential.score) < 1e-6 and quiet.nodes < 2 * sequential.nodes
+        self.log_test("Parallel Search Shares Alpha", bounded,
+                     f"Nodes: {quiet.nodes} vs {sequential.nodes} sequential, scores {quiet.score} / {sequential.score}")
+    
+    def test_fen(self):
+        """Test FEN import and export"""
+        print("\n=== Testing FEN ===")
+        
+        board_class = BitBoard if self.bitboard else Board
+        mismatches = [fen for _, fen, _ in perft.POSITIONS if board_class.from_fen(fen).to_fen() != fen]
+        self.log_test("FEN Round Trip", not mismatches, f"Mismatches: {mismatches}")
+        
+        board = board_class.from_fen('r3k2r/8/8/3pP3/8/8/8/R3K2R w Kq d6 3 20')
+        flags = (not board.squares[7][4].piece.moved and not board.squares[7][7].piece.moved and
+                 board.squares[7][0].piece.moved and not board.squares[0][4].piece.moved and
+                 not board.squares[0][0].piece.moved and board.squares[0][7].piece.moved)
+        self.log_test("FEN Castling Rights To Moved Flags", flags, f"Rights: {board.castling_rights}")
+        target = board.en_passant_target
+        self.log_test("FEN En Passant Target", target is not None and (target.row, target.col) == (2, 3),
+                     f"Target: {(target.row, target.col) if target else None}")
+        self.log_test("FEN Hash Matches Full Recompute", board.hash == hash_board(board), "")
+        
+        # a bulk load builds the derived state once: it must equal what per-square updates produce
+        loaded = board_class.from_fen(perft.POSITIONS[1][1])
+        built = board_class.from_fen('8/8/8/8/8/8/8/8 w - - 0 1')
+        # reading the maps builds them, from then on every placement updates them
+        built.attacks
+        for row in range(8):
+            for col in range(8):
+                built.squares[row][col].piece = loaded.squares[row][col].piece
+        same_state = (loaded.attacks == built.attacks and loaded.attack_sets == built.attack_sets and
+                      loaded.piece_squares == built.piece_squares and loaded.king_squares == built.king_squares and
+                      loaded.hash == hash_board(loaded))
+        if self.bitboard:
+            same_state = same_state and loaded.bitboards == built.bitboards and loaded.occupied == built.occupied
+        self.log_test("FEN Bulk Load State", same_state, "")
+        
+        # one board reused through every position, after moves left an undo stack behind
+        reused = board_class()
+        reused.make_move(reused.squares[6][4].piece, Move(Square(6, 4), Square(4, 4)))
+        differences = []
+        # the pieces are new objects on each board: compare their squares and classes
+        layout = lambda board: {color: {pos: type(piece) for pos, piece in pieces.items()}
+                                for color, pieces in board.piece_squares.items()}
+        for name, fen, _ in perft.POSITIONS:
+            fresh = board_class.from_fen(fen)
+            reused.load_fen(fen)
+            same = (reused.to_fen() == fen and reused.hash == fresh.hash and
+                    reused.castling_rights == fresh.castling_rights and not reused.undo_stack and
+                    layout(reused) == layout(fresh) and reused.king_squares == fresh.king_squares and
+                    reused.attacks == reused.recompute_attacks() and reused.attack_sets == fresh.attack_sets)
+            if self.bitboard:
+                same = same and reused.bitboards == fresh.bitboards and reused.occupied == fresh.occupied
+            if not same:
+                differences.append(name)
+        self.log_test("FEN Load In Place", not differences, f"Differences: {differences}")
+        
+        pawn = board.squares[3][4].piece
+        board.make_move(pawn, Move(Square(3, 4), Square(2, 3)))
+        after = board.to_fen()
+        board.unmake_move()
+        counters = after == 'r3k2r/8/3P4/8/8/8/8/R3K2R b Kq - 0 20' and board.to_fen().endswith(' 3 20')
+        self.log_test("FEN Move Counters Follow Moves", counters, f"After exd6: {after}")
+        
+        game = Game.from_fen('4k3/8/8/8/8/8/4P3/4K3 b - - 0 42', bitboard=self.bitboard)
+        loaded = game.next_player == 'black' and game.move_count == 42
+        self.log_test("Game From FEN", loaded, f"Next: {game.next_player}, move: {game.move_count}")
+    
+    def test_pgn(self):
+        """Test streaming PGN reading and SAN replay"""
+        print("\n=== Testing PGN Replay ===")
+        
+        text = """[Event "Scholar's mate"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 {developing} Nc6 (2... Nf6 3. d3) 3. Qh5 Nf6?? 4. Qxf7# 1-0
+
+[Event "Illegal king move"]
+[Result "*"]
+
+1. e4 e5 2. Ke3 *
+
+[Event "En passant and castling"]
+[Result "*"]
+
+1. e4 Nf6 2. e5 d5 3. exd6 ; en passant
+cxd6 4. Nf3 Nc6 5. Bb5 a6 6. O-O axb5 $1 7. Re1 *
+
+[Event "Annotations"]
+[Result "*"]
+
+1. e4 !? Nf6 2. e5 ! d5 3. exd6 e.p. cxd6 4. d4 ?! *
+"""
+        games = pgn.read_games(iter(text.splitlines()))
+        first = next(games)
+        lazy = first.number == 1 and first.moves == ['e4', 'e5', 'Bc4', 'Nc6', 'Qh5', 'Nf6??', 'Qxf7#']
+        self.log_test("PGN Games Read Lazily", lazy, f"First game moves: {first.moves}")
+        
+        board_class = BitBoard if self.bitboard else Board
+        results = [pgn.replay(game, board_class) for game in [first] + list(games)]
+        self.log_test("PGN Replay Legal Game", results[0].legal and results[0].status == 'checkmate',
+                     str(results[0]))
+        self.log_test("PGN First Illegal Move", not results[1].legal and results[1].error_ply == 2 and
+                     results[1].error_move == 'Ke3', str(results[1]))
+        self.log_test("PGN Special Moves", results[2].legal and results[2].plies == 13, str(results[2]))
+        glyphs = (results[3].legal and results[3].plies == 7 and
+                  pgn.san_moves('3. exd6e.p. cxd6') == ['exd6', 'cxd6'])
+        self.log_test("PGN Skips Glyphs And e.p.", glyphs, str(results[3]))
+        
+        # whatever the text, a move that cannot be read is reported, not raised
+        try:
+            pgn.parse_san(board_class(), 'white', '!?')
+            raised = None
+        except ValueError as error:
+            raised = error
+        self.log_test("PGN Empty Move Unreadable", raised is not None, f"Raised: {raised!r}")
+        
+        pooled = list(pgn.validate(pgn.read_games(iter(text.splitlines())), workers=2, batch_size=1,
+                                   bitboard=self.bitboard))
+        same = [str(r) for r in pooled] == [str(r) for r in results]
+        self.log_test("PGN Pool Keeps File Order", same, f"Games: {len(pooled)}")
+    
+    def test_server(self):
+        """Test the game server: joining, move validation, broadcasts and hibernation"""
+        print("\n=== Testing Game Server ===")
+        
+        async def scenario():
+            server = GameServer(idle_seconds=60, bitboard=self.bitboard)
+            await server.start(port=0)
+            white_reader, white_writer = await asyncio.open_connection('127.0.0.1', server.port)
+            black_reader, black_writer = await asyncio.open_connection('127.0.0.1', server.port)
+            
+            async def send(writer, reader, line):
+                writer.write((line + '\n').encode())
+                return (await reader.readline()).decode().strip()
+            
+            replies = {}
+            replies['new'] = await send(white_writer, white_reader, 'NEW')
+            replies['join'] = await send(black_writer, black_reader, f"JOIN {replies['new'].split()[1]}")
+            replies['start'] = (await black_reader.readline()).decode().strip()
+            await white_reader.readline()
+            replies['turn'] = await send(black_writer, black_reader, 'MOVE e7e5')
+            replies['illegal'] = await send(white_writer, white_reader, 'MOVE e2e5')
+            replies['moved'] = await send(white_writer, white_reader, 'MOVE f2f3')
+            replies['opponent'] = (await black_reader.readline()).decode().strip()
+            # idle games keep only their FEN until the next move
+            replies['hibernated'] = server.sweep(time.monotonic() + 60)
+            replies['state'] = await send(black_writer, black_reader, 'STATE')
+            players = ((white_writer, white_reader), (black_writer, black_reader))
+            for ply, move in enumerate(('e7e5', 'g2g4', 'd8h4')):
+                writer, reader = players[(ply + 1) % 2]
+                await send(writer, reader, f'MOVE {move}')
+                await players[ply % 2][1].readline()
+            replies['over'] = (await black_reader.readline()).decode().strip()
+            await white_reader.readline()
+            replies['stats'] = await send(white_writer, white_reader, 'STATS')
+            for writer, reader in players:
+                writer.write(b'QUIT\n')
+                await reader.read()
+                writer.close()
+            await server.close()
+            return replies
+        
+        replies = asyncio.run(scenario())
+        self.log_test("Server Pairs Players", replies['new'].endswith('white') and replies['join'].endswith('black')
+                     and replies['start'] == f'START {START_FEN}', f"Replies: {replies['new']}, {replies['join']}")
+        self.log_test("Server Rejects Invalid Moves",
+                     replies['turn'] == 'ERROR not your turn' and replies['illegal'] == 'ERROR illegal move',
+                     f"Replies: {replies['turn']}, {replies['illegal']}")
+        fen = 'rnbqkbnr/pppppppp/8/8/8/5P2/PPPPP1PP/RNBQKBNR b KQkq - 0 1'
+        self.log_test("Server Broadcasts Moves", replies['moved'] == replies['opponent'] == f'MOVED f2f3 {fen}',
+                     f"Replies: {replies['moved']}, {replies['opponent']}")
+        self.log_test("Server Hibernates Idle Games", replies['hibernated'] == 1 and replies['state'] == f'STATE {fen}',
+                     f"Hibernated: {replies['hibernated']}, {replies['state']}")
+        self.log_test("Server Game Over After Wake", replies['over'] == 'OVER black' and 'live=1' in replies['stats'],
+                     f"Replies: {replies['over']}, {replies['stats']}")
+        
+        # a served game keeps a few cached positions and no undo records however long it runs
+        session = Session('memory', self.bitboard)
+        rng = random.Random(3)
+        for ply in range(60):
+            game = session.game
+            if game.game_over:
+                break
+            move = rng.choice(game.board.position_info(game.next_player).moves)
+            session.play_move(game.board.squares[move.initial.row][move.initial.col].piece, move)
+        board = session.game.board
+        self.log_test("Server Session Memory Bounded", len(board.cache) <= SESSION_CACHE_SIZE and not board.undo_stack,
+                     f"Cached: {len(board.cache)}, undo records: {len(board.undo_stack)}")
+    
     def run_all_tests(self):
         """Run all test scenarios"""
         print("Starting Comprehensive Chess Game Tests")
@@ -313,6 +1097,30 @@ class ChessGameTester:
         self.test_en_passant()
         self.test_move_validation()
         self.test_game_over_detection()
+        self.test_bitboard_parity()
+        self.test_bitboard_codes()
+        self.test_zobrist_hashing()
+        self.test_position_cache()
+        self.test_make_unmake()
+        self.test_move_codes()
+        self.test_slotted_objects()
+        self.test_attack_maps()
+        self.test_lazy_legal_moves()
+        self.test_pure_queries()
+        self.test_turn_move_table()
+        self.test_piece_lists()
+        self.test_perft()
+        self.test_fen()
+        self.test_pgn()
+        self.test_server()
+        self.test_texture_cache()
+        self.test_background_cache()
+        self.test_headless_game()
+        self.test_dirty_rendering()
+        self.test_input_latency()
+        self.test_engine()
+        self.test_engine_worker()
+        self.test_parallel_search()
         
         # Summary
         print("\n" + "=" * 50)
@@ -337,8 +1145,8 @@ class ChessGameTester:
         return failed_tests == 0
 
 def main():
-    """Main test runner"""
-    tester = ChessGameTester()
+    """Main test runner (pass --bitboard to run the suite on the bitboard engine)"""
+    tester = ChessGameTester(bitboard='--bitboard' in sys.argv)
     success = tester.run_all_tests()
     
     if success: